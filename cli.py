@@ -0,0 +1,390 @@
+"""
+Runs IMARR without the graphical interface
+
+Usage:
+  python cli.py render session.imarr [session.imarr ...] [-f pdf] [-o dir]
+  python cli.py run session.imarr [session.imarr ...] [-m Lundquist] [-o dir]
+  python cli.py batch catalog.csv -m Lundquist [-m ...] -o dir
+"""
+import matplotlib
+import os
+
+# no Tk, has to be set before anything imports pyplot
+matplotlib.use("Agg")
+
+# like the graphical interface, IMARR finds its models, assets and cache
+# relative to its folder. The paths of the arguments are relative to the
+# folder the command is started in, see resolvePaths
+workingDir = os.getcwd()
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
+import os.path as path
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.dates import date2num
+from typing import Dict, Iterable, List, Tuple
+
+from src.models.ExportData import getFileType
+from src.utils.batch import runBatch
+from src.utils.headless import (
+  ensureCDFFiles,
+  getModels,
+  getResultBasePath,
+  runModel,
+  saveModelResults
+)
+from src.utils.PlotFigureBuilder import (
+  buildPlotFigure, getPlottedVars, loadYaxisLabels
+)
+from src.utils.State import Model, State
+
+outputFormats = ["png", "pdf", "svg"]
+exportFormats = ["cdf", "text", "hdf5", "netcdf", "parquet"]
+
+
+def loadSession(sessionPath: str) -> State:
+  with open(sessionPath, "r") as file:
+    return State(json.load(file))
+
+
+def getOutputPath(sessionPath: str, outputDir: str, format: str) -> str:
+  name = path.splitext(path.basename(sessionPath))[0] + "." + format
+  return path.join(outputDir or path.dirname(sessionPath), name)
+
+
+def renderSession(
+  sessionPath: str, outputDir: str, format: str, dpi: float
+) -> str:
+  """
+  Renders the plot of the session like it is shown on the plot page with
+  the selection marked and returns the path of the written file
+  """
+  state = loadSession(sessionPath)
+  try:
+    if not state.has("selectedVars") or not state.has("datasetCDFInstances"):
+      raise ValueError("The session has no data files or selected variables")
+    plotFigure = buildPlotFigure(
+      state, getPlottedVars(state), loadYaxisLabels()
+    )
+    for time in [state.selectionStart, state.selectionEnd]:
+      if time is None:
+        continue
+      for ax in plotFigure.allPlotAxes:
+        ax.axvline(x=date2num(time.datetime64), color="b", lw=1, ls="-")
+
+    outputPath = getOutputPath(sessionPath, outputDir, format)
+    plotFigure.fig.savefig(outputPath, format=format, dpi=dpi)
+    return outputPath
+  finally:
+    state.closeCDFFiles()
+
+
+def renderSessions(
+  sessionPaths: List[str], outputDir: str, format: str, dpi: float
+) -> List[Tuple[str, str, str]]:
+  """
+  Renders the sessions one after another in the same process, so that the
+  decoded data of shared CDF files is reused. Returns (session, output path,
+  error) for each session.
+  """
+  results = []
+  for sessionPath in sessionPaths:
+    try:
+      results.append(
+        (sessionPath, renderSession(sessionPath, outputDir, format, dpi), None)
+      )
+    except Exception as e:
+      results.append((sessionPath, None, str(e)))
+  return results
+
+
+def groupSessionsByFiles(sessionPaths: List[str]) -> List[List[str]]:
+  """Groups the sessions that use the same CDF files"""
+  groups: Dict[Tuple[str, ...], List[str]] = {}
+  for sessionPath in sessionPaths:
+    try:
+      with open(sessionPath, "r") as file:
+        files = json.load(file).get("datasetCDFInstances") or {}
+      key = tuple(sorted(files.values()))
+    except (OSError, ValueError, AttributeError):
+      # reported when rendering
+      key = (sessionPath, )
+    groups.setdefault(key, []).append(sessionPath)
+  return list(groups.values())
+
+
+def render(args: argparse.Namespace) -> int:
+  if args.output and not path.isdir(args.output):
+    print("Output folder {} does not exist".format(args.output))
+    return 1
+  groups = groupSessionsByFiles(args.sessions)
+  tasks = [(group, args.output, args.format, args.dpi) for group in groups]
+
+  if args.jobs == 1 or len(groups) == 1:
+    return printResults(renderSessions(*task) for task in tasks)
+  with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+    return printResults(executor.map(renderSessions, *zip(*tasks)))
+
+
+def configureModel(
+  instance: Model, basePath: str, exportFormat: str = None
+):
+  """Lets Export Data write its file next to the results"""
+  settings = getattr(instance, "settings", None)
+  if settings is None or not hasattr(settings, "exportPath"):
+    return
+  if exportFormat is not None:
+    settings.fileFormat = exportFormat
+  settings.exportPath = basePath + getFileType(settings)[1].replace("*", "")
+
+
+def runSession(
+  sessionPath: str,
+  modelNames: List[str],
+  outputDir: str,
+  exportFormat: str = None
+) -> List[Tuple[str, str, str]]:
+  """
+  Runs the models (default: the ones of the session) on the session and
+  writes their results. Returns (session and model, result path, error) for
+  each model.
+  """
+  state = loadSession(sessionPath)
+
+  def onStatus(name: str, progress: float, status: str):
+    progressText = "" if progress is None else f" {progress:.0%}"
+    print(f"{sessionPath} [{name}]{progressText} {status}", flush=True)
+
+  try:
+    ensureCDFFiles(state, lambda status: onStatus("data", None, status))
+    if modelNames is not None:
+      modelTypes = getModels(modelNames)
+    else:
+      modelTypes = state.models or []
+    if len(modelTypes) == 0:
+      raise ValueError("The session contains no models, select them with -m")
+  except Exception as e:
+    state.closeCDFFiles()
+    return [(sessionPath, None, str(e))]
+
+  results = []
+  try:
+    for modelType in modelTypes:
+      basePath = getResultBasePath(sessionPath, outputDir, modelType)
+      instance, error = runModel(
+        modelType,
+        state,
+        lambda progress, status: onStatus(modelType.name, progress, status),
+        lambda instance: configureModel(instance, basePath, exportFormat)
+      )
+      name = f"{sessionPath} [{modelType.name}]"
+      if error is None:
+        results.append((name, saveModelResults(instance, basePath)[0], None))
+      else:
+        results.append((name, None, error))
+  finally:
+    state.closeCDFFiles()
+  return results
+
+
+def runSessions(
+  sessionPaths: List[str],
+  modelNames: List[str],
+  outputDir: str,
+  exportFormat: str = None
+) -> List[Tuple[str, str, str]]:
+  return [
+    result for sessionPath in sessionPaths
+    for result in runSession(sessionPath, modelNames, outputDir, exportFormat)
+  ]
+
+
+def run(args: argparse.Namespace) -> int:
+  if args.output and not path.isdir(args.output):
+    print("Output folder {} does not exist".format(args.output))
+    return 1
+  try:
+    # fail early on unknown model names
+    if args.model is not None:
+      getModels(args.model)
+  except ValueError as e:
+    print(e)
+    return 1
+  groups = groupSessionsByFiles(args.sessions)
+  tasks = [
+    (group, args.model, args.output, args.export_format) for group in groups
+  ]
+
+  if args.jobs == 1 or len(groups) == 1:
+    return printResults(runSessions(*task) for task in tasks)
+  with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+    return printResults(executor.map(runSessions, *zip(*tasks)))
+
+
+def batch(args: argparse.Namespace) -> int:
+  if not path.isdir(args.output):
+    print("Output folder {} does not exist".format(args.output))
+    return 1
+  checkpointPath = args.checkpoint or path.join(
+    args.output,
+    path.splitext(path.basename(args.catalog))[0] + ".checkpoint.json"
+  )
+  try:
+    modelTypes = getModels(args.model)
+    results = runBatch(
+      args.catalog,
+      modelTypes,
+      args.output,
+      checkpointPath,
+      args.retry_failed,
+      lambda status: print(status, flush=True),
+      lambda instance, basePath:
+      configureModel(instance, basePath, args.export_format)
+    )
+  except (OSError, ValueError) as e:
+    print(e)
+    return 1
+  return printResults([results])
+
+
+def printResults(results: Iterable[List[Tuple[str, str, str]]]) -> int:
+  """Prints the results as they arrive and returns the exit code"""
+  failed = 0
+  for groupResults in results:
+    for sessionPath, outputPath, error in groupResults:
+      if error is None:
+        print("{} -> {}".format(sessionPath, outputPath))
+      else:
+        failed += 1
+        print("{}: {}".format(sessionPath, error))
+  return 1 if failed else 0
+
+
+def createParser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(
+    description="Runs IMARR without the graphical interface"
+  )
+  subparsers = parser.add_subparsers(dest="command", required=True)
+
+  renderParser = subparsers.add_parser(
+    "render",
+    help="Renders the plot of sessions with the selection marked",
+    description="Renders the plot of sessions with the selection marked. "
+    "Sessions that use the same data files are rendered by the same process"
+  )
+  renderParser.add_argument("sessions", nargs="+", help="IMARR session files")
+  renderParser.add_argument(
+    "-f",
+    "--format",
+    choices=outputFormats,
+    default="png",
+    help="Format of the rendered files. Default: png"
+  )
+  renderParser.add_argument(
+    "-o",
+    "--output",
+    help="Folder for the rendered files. Default: next to the session"
+  )
+  renderParser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=None,
+    help="Number of processes. Default: number of CPUs"
+  )
+  renderParser.add_argument(
+    "--dpi", type=float, default=150, help="Resolution of PNGs. Default: 150"
+  )
+  renderParser.set_defaults(run=render)
+
+  runParser = subparsers.add_parser(
+    "run",
+    help="Runs reconstruction models on sessions",
+    description="Runs reconstruction models on sessions and writes the "
+    "results of each model to SESSION.MODEL.json and its arrays to "
+    "SESSION.MODEL.npz. Missing data files are downloaded. Sessions that use "
+    "the same data files are run by the same process"
+  )
+  runParser.add_argument("sessions", nargs="+", help="IMARR session files")
+  runParser.add_argument(
+    "-m",
+    "--model",
+    action="append",
+    help="Name of a model to run, can be repeated. Default: the models "
+    "selected in the session"
+  )
+  runParser.add_argument(
+    "-o",
+    "--output",
+    help="Folder for the results. Default: next to the session"
+  )
+  runParser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=None,
+    help="Number of processes. Default: number of CPUs"
+  )
+  runParser.add_argument(
+    "--export-format",
+    choices=exportFormats,
+    help="File format of Export Data. Default: cdf"
+  )
+  runParser.set_defaults(run=run)
+
+  batchParser = subparsers.add_parser(
+    "batch",
+    help="Runs reconstruction models on the events of a catalog",
+    description="Runs reconstruction models on the events of a CSV catalog "
+    "(see src/utils/batch.py for the columns) and writes the results of each "
+    "model to EVENT.MODEL.json and EVENT.MODEL.npz. The data of the next "
+    "events is downloaded while the current one is fitted. Finished events "
+    "are recorded in a checkpoint, so that an interrupted batch continues "
+    "where it stopped"
+  )
+  batchParser.add_argument("catalog", help="CSV file with the events")
+  batchParser.add_argument(
+    "-m",
+    "--model",
+    action="append",
+    required=True,
+    help="Name of a model to run, can be repeated"
+  )
+  batchParser.add_argument(
+    "-o", "--output", required=True, help="Folder for the results"
+  )
+  batchParser.add_argument(
+    "--checkpoint",
+    help="Checkpoint file. Default: CATALOG.checkpoint.json in the output "
+    "folder"
+  )
+  batchParser.add_argument(
+    "--retry-failed",
+    action="store_true",
+    help="Runs the events again that failed according to the checkpoint"
+  )
+  batchParser.add_argument(
+    "--export-format",
+    choices=exportFormats,
+    help="File format of Export Data. Default: cdf"
+  )
+  batchParser.set_defaults(run=batch)
+
+  return parser
+
+
+def resolvePaths(args: argparse.Namespace):
+  """Makes the paths of the arguments relative to the working directory"""
+  for key in ["sessions", "catalog", "output", "checkpoint"]:
+    value = getattr(args, key, None)
+    if isinstance(value, list):
+      setattr(args, key, [path.join(workingDir, i) for i in value])
+    elif value is not None:
+      setattr(args, key, path.join(workingDir, value))
+
+
+if __name__ == "__main__":
+  args = createParser().parse_args()
+  resolvePaths(args)
+  exit(args.run(args))
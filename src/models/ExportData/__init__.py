@@ -1,12 +1,9 @@
-from datetime import datetime
 from gzip import compress
-from src.utils.utils import openLink, setFillValuesToNan
+from src.utils.utils import openLink
 from time import sleep
-from typing import Any, Callable, Dict, List, Set, Union
+from typing import Any, Callable, Dict, List, Set, Tuple, Union
 from tkinter import Frame, Toplevel
-from cdflib.cdfread import CDF as CDFRead
 from cdflib.cdfwrite import CDF
-from cdflib import cdfastropy, cdfepoch
 from astropy.time import Time, TimeDelta
 import tkinter as tk
 import tkinter.ttk as ttk
@@ -17,8 +14,15 @@ import numpy as np
 import re
 from functools import partial
 
-from src.utils.State import State
+from src.utils import decodedData
+from src.utils.State import State, StateSelectedVar
 from src.utils.constants import padding
+from src.utils import resampling
+from .compressedCDF import CompressedCDF
+from .plan import ExportPlan
+from .writers import (
+  getMissingPackage, writeHDF5, writeNetCDF, writeParquet, writeText
+)
 
 varnames = [
   "magField",
@@ -38,6 +42,8 @@ selectedVarNameLookup = {
   "speed": "Particle Speed",
   "temperature": "Temperature"
 }
+# level at which cdfwrite compresses the variables of a CDF file by default
+cdfDefaultCompressionLevel = 6
 
 
 @dataclass
@@ -60,11 +66,39 @@ class Settings:
   rangeVariable: str = "selected"
   additionalPoints: int = 0
   exportMagAsVector: bool = False
-  # cdf | text
+  # cdf | text | hdf5 | netcdf | parquet
   fileFormat: str = "cdf"
   compress: bool = False
   compressionLevel: int = 0
   fieldDelimiter: str = " "
+  # none | mean | nearest | linear
+  resampling: str = "none"
+  # seconds between the resampled records
+  resamplingCadence: float = 60
+  # id of the dataset whose epoch is used instead of the cadence
+  resamplingReference: str = None
+  # file to export to without asking, e.g. when running without the GUI
+  exportPath: str = None
+
+
+def getFileType(settings: Settings) -> Tuple[str, str]:
+  """Returns the description and pattern of the exported file"""
+  if settings.fileFormat == "cdf":
+    return ("CDF File", "*.cdf")
+  if settings.fileFormat == "hdf5":
+    return ("HDF5 File", "*.h5")
+  if settings.fileFormat == "netcdf":
+    return ("NetCDF File", "*.nc")
+  if settings.fileFormat == "parquet":
+    return ("Parquet File", "*.parquet")
+  if settings.compress:
+    return ("Compressed Text File", "*.txt.gz")
+  return ("Text File", "*.txt")
+
+
+# label, file format
+columnarFileFormats = [("HDF5", "hdf5"), ("NetCDF4", "netcdf"),
+                       ("Parquet", "parquet")]
 
 
 class Model:
@@ -122,14 +156,10 @@ class Model:
     self.settingsState = state
     variable = state.selectedVars.Magnetic_Field[0]
     cdf = state.datasetCDFInstances[variable.dataset]
-    cdfInfo = cdf.cdf_info()
-    depend0 = next((
-      i["DEPEND_0"]
-      for i in (cdf.varattsget(i) for i in cdfInfo["zVariables"])
-      if "DEPEND_0" in i and i["DEPEND_0"] is not None
-    ),
-                   None)
-    xData = cdfastropy.convert_to_astropy(cdf.varget(depend0 or "epoch"))
+    depend0 = cdf.varattsget(variable.variable).get("DEPEND_0")
+    epoch = decodedData.datetime64s(cdf, depend0 or "epoch")
+    # only the first, second and last record are needed
+    xData = Time(epoch[[0, 1, -1]], format="datetime64")
     xData.format = "iso"
     xData.precision = 3
     self.settingsDataStart = start = xData[0]
@@ -323,23 +353,34 @@ Time interval of data:"""
     frame3 = ttk.Frame(frame2)
     frame3.grid(column=3, row=1, padx=padding, sticky="w")
     rb = ttk.Radiobutton(
-      frame3, text="Text (using ", value="text", variable=var
+      frame3, text="Text (readable with ", value="text", variable=var
     )
     rb.grid(column=1, row=1, sticky="w")
     lb = tk.Message(
-      frame3, text="numpy.savetxt", fg="blue", cursor="hand2", width=500
+      frame3, text="numpy.loadtxt", fg="blue", cursor="hand2", width=500
     )
     lb.bind(
       "<Button-1>",
       lambda e: openLink(
         url=
-        "https://numpy.org/doc/stable/reference/generated/numpy.savetxt.html"
+        "https://numpy.org/doc/stable/reference/generated/numpy.loadtxt.html"
       )
     )
     lb.grid(column=2, row=1, sticky="w")
     lb = ttk.Label(frame3, text=")")
     lb.bind("<Button-1>", lambda e: var.set("text"))
     lb.grid(column=3, row=1, sticky="w")
+    for column, (text, value) in enumerate(columnarFileFormats, start=4):
+      missingPackage = getMissingPackage(value)
+      rb = ttk.Radiobutton(
+        frame2,
+        text=text if missingPackage is None else
+        f"{text} (requires {missingPackage})",
+        value=value,
+        variable=var,
+        state="normal" if missingPackage is None else "disabled"
+      )
+      rb.grid(column=column, row=1, padx=padding, sticky="w")
 
     var = tk.IntVar(window, 1 if self.settings.compress else 0)
     self.settingsCompressTkVariable = var
@@ -347,7 +388,11 @@ Time interval of data:"""
     cb = ttk.Checkbutton(frame, text="Compress", variable=var)
     cb.grid(column=1, row=2, pady=padding / 2, sticky="w")
 
-    lb = ttk.Label(frame, text="Compression level (only CDF files)")
+    lb = ttk.Label(
+      frame,
+      text="Compression level (not for text files)\nCDF files compress each "
+      f"variable, at level {cdfDefaultCompressionLevel} without Compress"
+    )
     lb.grid(column=1, row=3, pady=padding / 2, sticky="w")
     var = tk.StringVar(window, str(self.settings.compressionLevel))
     self.settingsCompressionLevelTkVariable = var
@@ -394,6 +439,71 @@ Time interval of data:"""
     self.settingsFileFormatChanged(None, None, None)
     self.settingsValidateFieldDelimiter("focus", self.settings.fieldDelimiter)
 
+    # resampling ===============================================================
+    sep = ttk.Separator(window, orient="horizontal")
+    sep.grid(
+      column=1, row=6, columnspan=2, padx=padding, pady=padding, sticky="we"
+    )
+    frame = ttk.Frame(window)
+    frame.grid(column=1, row=7, columnspan=2, padx=padding, sticky="w")
+
+    lb = ttk.Label(frame, text="Resampling:")
+    lb.grid(column=1, row=1, sticky="w")
+    var = tk.StringVar(window, self.settings.resampling)
+    self.settingsResamplingTkVariable = var
+    var.trace_add("write", self.settingsResamplingChanged)
+    rb = ttk.Radiobutton(
+      frame, text="none (align by timestamp)", value="none", variable=var
+    )
+    rb.grid(column=2, row=1, padx=padding, sticky="w")
+    for column, method in enumerate(resampling.methods, start=3):
+      rb = ttk.Radiobutton(frame, text=method, value=method, variable=var)
+      rb.grid(column=column, row=1, padx=padding, sticky="w")
+    self.settingsResamplingDescriptionWidget = ttk.Label(frame, text="")
+    self.settingsResamplingDescriptionWidget.grid(
+      column=2, row=2, columnspan=4, padx=padding, sticky="w"
+    )
+
+    lb = ttk.Label(frame, text="onto the epoch of")
+    lb.grid(column=1, row=3, pady=padding / 2, sticky="w")
+    self.settingsResamplingReferences = {"Cadence": None}
+    for dataset in state.datasets:
+      self.settingsResamplingReferences[dataset.label] = dataset.id
+    var = tk.StringVar(
+      window,
+      next((
+        label for label, id in self.settingsResamplingReferences.items()
+        if id == self.settings.resamplingReference
+      ),
+           "Cadence")
+    )
+    self.settingsResamplingReferenceTkVariable = var
+    var.trace_add("write", self.settingsResamplingReferenceChanged)
+    cb = ttk.Combobox(
+      frame,
+      textvariable=var,
+      state="readonly",
+      values=list(self.settingsResamplingReferences),
+      width=30
+    )
+    cb.grid(column=2, row=3, columnspan=2, padx=padding, sticky="w")
+    self.settingsResamplingReferenceWidget = cb
+
+    lb = ttk.Label(frame, text="Cadence in seconds")
+    lb.grid(column=1, row=4, pady=padding / 2, sticky="w")
+    validator = (window.register(self.settingsValidateCadence), "%P")
+    var = tk.StringVar(window, f"{self.settings.resamplingCadence:g}")
+    entry = ttk.Entry(
+      frame,
+      validate="key",
+      validatecommand=validator,
+      width=10,
+      textvariable=var
+    )
+    entry.grid(column=2, row=4, padx=padding, sticky="w")
+    self.settingsResamplingCadenceWidget = entry
+    self.settingsResamplingChanged(None, None, None)
+
     btn = ttk.Button(window, text="OK", command=lambda: window.destroy())
     btn.grid(
       column=1, row=10, columnspan=2, padx=padding, pady=padding, sticky="we"
@@ -442,77 +552,57 @@ Time interval of data:"""
       )
       return
 
-    cdfFileType = ("CDF File", "*.cdf")
-    textFileType = ("Text File", "*.txt")
-    compressedTextFileType = ("Compressed Text File", "*.txt.gz")
-
-    fileType = ""
-    if self.settings.fileFormat == "cdf":
-      fileType = cdfFileType
-    elif self.settings.compress:
-      fileType = compressedTextFileType
-    else:
-      fileType = textFileType
+    missingPackage = getMissingPackage(self.settings.fileFormat)
+    if missingPackage is not None:
+      errorCallback(
+        f"Missing python package {missingPackage}. Please install it or "
+        "choose another file format in the settings"
+      )
+      return
 
-    path = asksaveasfilename(
-      confirmoverwrite=True,
-      initialdir=".",
-      title="Export Data to",
-      filetypes=(fileType, ("All files", "*")),
-      defaultextension=fileType[1].replace("*", "")
-    )
+    path = self.settings.exportPath
+    if path is None:
+      fileType = getFileType(self.settings)
+      path = asksaveasfilename(
+        confirmoverwrite=True,
+        initialdir=".",
+        title="Export Data to",
+        filetypes=(fileType, ("All files", "*")),
+        defaultextension=fileType[1].replace("*", "")
+      )
     if len(path) == 0:
       errorCallback("Canceled by user")
       return
 
-    epochs: Set[datetime] = set()
-    epochatts: dict = None
-    datasets = set(
-      var.dataset
-      for i in self.settings.exportVars
-      for var in state.selectedVars[selectedVarNameLookup[i]]
-    )
-    for dataset in datasets:
-      cdf = state.datasetCDFInstances[dataset]
-      cdfInfo = cdf.cdf_info()
-      depend0 = next((
-        i["DEPEND_0"]
-        for i in (cdf.varattsget(i) for i in cdfInfo["zVariables"])
-        if "DEPEND_0" in i and i["DEPEND_0"] is not None
-      ),
-                     None)
-      atts = cdf.varattsget(depend0 or "epoch", expand=True)
-      epoch = cdfastropy.convert_to_astropy(cdf.varget(depend0 or "epoch"))
-      epoch.format = "datetime"
-
-      if self.settings.rangeVariable == "all":
-        pass
-      elif self.settings.rangeVariable == "selected":
-        epoch = epoch[epoch >= state.selectionStart]
-        epoch = epoch[epoch <= state.selectionEnd]
-      elif self.settings.rangeVariable == "more":
-        i1 = np.nonzero(epoch.value >= state.selectionStart.datetime)[0][0]
-        i2 = np.nonzero(epoch.value <= state.selectionEnd.datetime)[0][-1]
-        epoch = (
-          epoch[i1 - self.settings.additionalPoints:i2
-                + self.settings.additionalPoints + 1]
-        )
-      if epoch is not None:
-        epochs.update(epoch.datetime)
-      if atts is not None and epochatts is None:
-        epochatts = atts
-    # sort epochs
-    epochs = list(epochs)
-    epochs.sort()
-    # save as astropy time
-    epochs = Time(epochs, format="datetime")
-    epochs.format = "iso"
+    try:
+      plan = ExportPlan(
+        state,
+        (
+          selected for _, selectedByDir in self.forEachSelectedVar(state)
+          for selected in selectedByDir.values()
+        ),
+        partial(self.getRecordRange, state),
+        resampling=self.settings.resampling,
+        cadence=np.timedelta64(
+          int(round(self.settings.resamplingCadence * 1e9)), "ns"
+        ),
+        reference=self.settings.resamplingReference
+      )
+    except ValueError as e:
+      errorCallback(str(e))
+      return
+    epochs = plan.epochs
 
     if self.settings.fileFormat == "cdf":
-      cdf_spec = {}
-      if self.settings.compress:
-        cdf_spec["Compressed"] = self.settings.compressionLevel
-      with CDF(path, cdf_spec=cdf_spec, delete=True) as cdf:
+      # the variables are compressed instead of the whole file, so that the
+      # blocks can be compressed in parallel. Without the setting, they are
+      # compressed like cdfwrite does by default
+      compression = (
+        self.settings.compressionLevel
+        if self.settings.compress else cdfDefaultCompressionLevel
+      )
+      varCount = self.countVarsToSave(state) + 1
+      with CompressedCDF(path, cdf_spec={}, delete=True) as cdf:
         spec = {
           "Variable": "epoch",
           "Data_Type": CDF.CDF_EPOCH,
@@ -520,26 +610,19 @@ Time interval of data:"""
           "Rec_Vary": True,
           "Var_Type": "zVariable",
           "Dim_Sizes": [1],
-          "Sparse": "no_sparse"
+          "Sparse": "no_sparse",
+          "Compress": compression
         }
-        # convert astropy time to epoch list
-        epochs.format = "ymdhms"
-        dates = np.zeros((len(epochs), 6))
-        dates[:, 0] = epochs.value["year"]
-        dates[:, 1] = epochs.value["month"]
-        dates[:, 2] = epochs.value["day"]
-        dates[:, 3] = epochs.value["hour"]
-        dates[:, 4] = epochs.value["minute"]
-        dates[:, 5] = epochs.value["second"]
         cdf.write_var(
           spec,
-          var_attrs=epochatts,
-          var_data=cdfepoch.compute_epoch(dates.tolist(), to_np=True)
+          var_attrs=plan.epochAtts,
+          var_data=decodedData.datetime64ToCdfEpoch(epochs)
         )
-        epochs.format = "datetime"
+
+        self.reportCDFProgress(statusCallback, cdf, 1, varCount)
 
         item: Dict[str, Any]
-        for item in self.forEachVarToSave(state, epochs):
+        for i, item in enumerate(self.forEachVarToSave(plan), start=2):
           spec = {
             "Variable": item["name"],
             "Data_Type": CDF.CDF_FLOAT,
@@ -548,6 +631,7 @@ Time interval of data:"""
             "Var_Type": "zVariable",
             "Dim_Sizes": item["dim"],
             "Sparse": "no_sparse",
+            "Compress": compression
           }
           if "FILLVAL" not in item["atts"]:
             maxVal = max(item["data"])
@@ -581,43 +665,70 @@ Time interval of data:"""
           if "DEPEND_3" in item["atts"]:
             del item["atts"]["DEPEND_3"]
           cdf.write_var(spec, var_attrs=item["atts"], var_data=item["data"])
+          self.reportCDFProgress(statusCallback, cdf, i, varCount)
     elif self.settings.fileFormat == "text":
-      names = (([name + "X", name + "Y", name
-                 + "Z"] if i == "magField" else [name])
-               for (name, i) in ((getattr(self.settings.varNames, i), i)
-                                 for i in varnames
-                                 if i in self.settings.exportVars))
-      names = [i for sublist in names for i in sublist]
-      dtype = [(i, "float") for i in names]
-      dtype.insert(0, ("date", "U23"))
-      numberFormat = ["%.18e" for _ in range(len(names))]
-      numberFormat.insert(0, "%s")
-
-      arr = np.zeros(len(epochs), dtype=dtype)
-      arr["date"] = epochs.isot
+      names = ["date"]
       units = ["UTC"]
       descriptions = []
+      columns = []
       item: Dict[str, Any]
-      for item in self.forEachVarToSave(state, epochs):
-        arr[item["name"]] = item["data"]
+      for item in self.forEachVarToSave(plan):
+        names.append(item["name"])
+        columns.append(item["data"])
         units.append(item["atts"]["UNITS"][0])
         if "CATDESC" in item["atts"]:
           descriptions.append(item["atts"]["CATDESC"][0])
         elif "FIELDNAM" in item["atts"]:
           descriptions.append(item["atts"]["FIELDNAM"][0])
-      delimiter = self.settings.fieldDelimiter
-      np.savetxt(
+      writeText(
         path,
-        arr,
-        fmt=numberFormat,
-        delimiter=delimiter,
-        header=delimiter.join(i[0]
-                              for i in dtype) + "\n" + delimiter.join(units),
-        footer="Variable descriptions:\n" + "\n".join(descriptions)
+        epochs,
+        columns,
+        names,
+        units,
+        descriptions,
+        delimiter=self.settings.fieldDelimiter,
+        compress=self.settings.compress
+      )
+    else:
+      write = {
+        "hdf5": writeHDF5, "netcdf": writeNetCDF, "parquet": writeParquet
+      }[self.settings.fileFormat]
+      # the variables are written one after another as they are read
+      write(
+        path,
+        epochs,
+        self.forEachVarToSave(plan),
+        compressionLevel=self.settings.compressionLevel
+        if self.settings.compress else None
       )
 
     doneCallback()
 
+  def countVarsToSave(self, state: State) -> int:
+    """Returns the number of variables that forEachVarToSave yields"""
+    saveVector = (
+      self.settings.fileFormat == "cdf" and self.settings.exportMagAsVector
+    )
+    return sum(
+      min(1, len(selectedByDir))
+      if saveVector and name == "magField" else len(selectedByDir)
+      for name, selectedByDir in self.forEachSelectedVar(state)
+    )
+
+  def reportCDFProgress(
+    self,
+    statusCallback: Callable[[float, str], None],
+    cdf: CompressedCDF,
+    done: int,
+    total: int
+  ):
+    statusCallback(
+      done / total,
+      f"Written {done} of {total} variables "
+      f"({cdf.bytesWritten / 1024**2:.1f} MB uncompressed)"
+    )
+
   def cancel(self):
     self.canceled = True
 
@@ -700,7 +811,7 @@ Time interval of data:"""
   def settingsFileFormatChanged(self, a, b, c):
     self.settings.fileFormat = self.settingsFileFormatTkVariable.get()
     self.settingsCompressionLevelWidget["state"] = (
-      "readonly" if self.settings.fileFormat == "cdf" else "disabled"
+      "disabled" if self.settings.fileFormat == "text" else "readonly"
     )
     self.settingsFieldDelimiterEntryWidget["state"] = (
       "normal" if self.settings.fileFormat == "text" else "disabled"
@@ -709,6 +820,35 @@ Time interval of data:"""
       "normal" if self.settings.fileFormat == "text" else "disabled"
     )
 
+  def settingsResamplingChanged(self, a, b, c):
+    self.settings.resampling = self.settingsResamplingTkVariable.get()
+    self.settingsResamplingDescriptionWidget["text"] = resampling.methods.get(
+      self.settings.resampling, ""
+    )
+    self.settingsResamplingReferenceWidget["state"] = (
+      "disabled" if self.settings.resampling == "none" else "readonly"
+    )
+    self.settingsResamplingCadenceWidget["state"] = (
+      "normal" if self.settings.resampling != "none"
+      and self.settings.resamplingReference is None else "disabled"
+    )
+
+  def settingsResamplingReferenceChanged(self, a, b, c):
+    self.settings.resamplingReference = self.settingsResamplingReferences[
+      self.settingsResamplingReferenceTkVariable.get()]
+    self.settingsResamplingChanged(None, None, None)
+
+  def settingsValidateCadence(self, newVal: str):
+    if len(newVal) == 0:
+      return True
+    try:
+      cadence = float(newVal)
+    except ValueError:
+      return False
+    if cadence > 0:
+      self.settings.resamplingCadence = cadence
+    return True
+
   def settingsCompressChanged(self, a, b, c):
     self.settings.compress = self.settingsCompressTkVariable.get() == 1
 
@@ -754,106 +894,88 @@ Time interval of data:"""
       return False
     return True
 
-  def getData(self, state: State, cdf: CDFRead, epochs: Time, name: str):
-    atts = cdf.varattsget(name, expand=True)
-    epoch = cdfastropy.convert_to_astropy(
-      cdf.varget((atts["DEPEND_0"] or ["epoch"])[0])
-    )
-    epoch.format = "datetime"
-
+  def getRecordRange(self, state: State, epoch: np.ndarray) -> slice:
+    """Returns the records of the sorted epoch in the exported range"""
     if self.settings.rangeVariable == "all":
-      start, end = None, None
-    elif self.settings.rangeVariable == "selected":
-      start = TimeToList(state.selectionStart)
-      end = TimeToList(state.selectionEnd)
-    elif self.settings.rangeVariable == "more":
-      i1 = np.nonzero(epoch.value >= state.selectionStart.datetime)[0][0]
-      i2 = np.nonzero(epoch.value <= state.selectionEnd.datetime)[0][-1]
-      start = TimeToList(epoch[i1 - self.settings.additionalPoints])
-      end = TimeToList(epoch[i2 + self.settings.additionalPoints])
-
-    data = np.array(cdf.varget(name, starttime=start, endtime=end))
-    setFillValuesToNan(data, atts)
-    if data.shape[0] == len(epochs):
-      return data, atts
-
-    shape = (len(epochs), )
-    if len(data.shape) > 1:
-      shape += (data.shape[1], )
-    retData = np.full(shape, np.nan)
-    retData[np.isin(epochs.datetime, epoch.value), :] = data
-    return retData, atts
-
-  def forEachVarToSave(self, state: State, epochs: Time):
+      return slice(None)
+    start = np.searchsorted(epoch, state.selectionStart.datetime64, "left")
+    end = np.searchsorted(epoch, state.selectionEnd.datetime64, "right")
+    if self.settings.rangeVariable == "more":
+      start = max(0, start - self.settings.additionalPoints)
+      end = end + self.settings.additionalPoints
+    return slice(start, end)
+
+  def forEachSelectedVar(self, state: State):
+    """
+    Yields the name and the selected variables of each exported variable. The
+    selected variables are a dict with the direction x, y and z as key for the
+    magnetic field components and None for all other variables.
+    """
     for name in varnames:
       if name not in self.settings.exportVars:
         continue
 
       selectedVar = state.selectedVars[selectedVarNameLookup[name]]
       if name == "magField":
-        vectorData = None
-        vectorAtts = None
-        for index, dir in enumerate(["x", "y", "z"]):
+        selectedByDir: Dict[str, StateSelectedVar] = {}
+        for dir in ["x", "y", "z"]:
           selected = next((i for i in selectedVar if i.Bfield == dir), None)
           if selected is None:
             selected = next((i for i in selectedVar if i.Bfield == "vector"),
                             None)
-          if selected is None:
-            continue
-
-          cdfReader = state.datasetCDFInstances[selected.dataset]
-          data, atts = self.getData(state, cdfReader, epochs, selected.variable)
-          if len(data.shape) > 1:
-            data = data[:, index]
-
-          if (self.settings.fileFormat == "cdf"
-              and self.settings.exportMagAsVector):
-            if vectorData is None:
-              vectorData = np.full((len(data), 3), np.nan)
-              vectorAtts = atts
-            vectorData[:, index] = data
-          else:
-            yield {
-              "name": getattr(self.settings.varNames, name) + dir.upper(),
-              "dim": [1],
-              "atts": atts,
-              "data": data
-            }
-
-        # save vector
-        if (self.settings.fileFormat == "cdf"
-            and self.settings.exportMagAsVector):
-          yield {
-            "name": getattr(self.settings.varNames, name),
-            "dim": [3],
-            "atts": vectorAtts,
-            "data": vectorData
-          }
+          if selected is not None:
+            selectedByDir[dir] = selected
+        yield name, selectedByDir
       else:
         if name == "magFieldTotal":
           selected = next((i for i in selectedVar if i.Bfield == "total"), None)
         else:
           selected = next((i for i in selectedVar), None)
-        if selected is None:
-          continue
-
-        cdfReader = state.datasetCDFInstances[selected.dataset]
-        data, atts = self.getData(state, cdfReader, epochs, selected.variable)
+        if selected is not None:
+          yield name, {None: selected}
 
+  def forEachVarToSave(self, plan: ExportPlan):
+    saveVector = (
+      self.settings.fileFormat == "cdf" and self.settings.exportMagAsVector
+    )
+    for name, selectedByDir in self.forEachSelectedVar(plan.state):
+      if name != "magField":
+        data, atts = plan.getData(selectedByDir[None])
         yield {
           "name": getattr(self.settings.varNames, name),
           "dim": [1],
           "atts": atts,
           "data": data
         }
+        continue
 
+      vectorData = None
+      vectorAtts = None
+      for index, dir in enumerate(["x", "y", "z"]):
+        if dir not in selectedByDir:
+          continue
+        data, atts = plan.getData(selectedByDir[dir])
+        if len(data.shape) > 1:
+          data = data[:, index]
+
+        if saveVector:
+          if vectorData is None:
+            vectorData = np.full((len(data), 3), np.nan)
+            vectorAtts = atts
+          vectorData[:, index] = data
+        else:
+          yield {
+            "name": getattr(self.settings.varNames, name) + dir.upper(),
+            "dim": [1],
+            "atts": atts,
+            "data": data
+          }
 
-def TimeToList(time: Time):
-  return [
-    time.ymdhms["year"],
-    time.ymdhms["month"],
-    time.ymdhms["day"],
-    time.ymdhms["hour"],
-    time.ymdhms["minute"],
-    time.ymdhms["second"]
-  ]
+      # save vector
+      if saveVector and vectorData is not None:
+        yield {
+          "name": getattr(self.settings.varNames, name),
+          "dim": [3],
+          "atts": vectorAtts,
+          "data": vectorData
+        }
@@ -0,0 +1,128 @@
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
+import math
+import os
+from threading import Lock
+from typing import Dict
+
+from cdflib import cdfwrite
+from cdflib.cdfwrite import CDF
+
+
+def getDeflate():
+  """Returns the gzip function that cdfwrite uses for the blocks"""
+  if hasattr(cdfwrite, "gzip_deflate"):
+    return cdfwrite.gzip_deflate
+  return cdfwrite.gzip.compress
+
+
+# the function cdfwrite uses, before any CompressedCDF replaces it
+_originalDeflate = getDeflate()
+# the replacement is global, so only one CompressedCDF writes a variable at a
+# time
+_replaceLock = Lock()
+
+
+@contextmanager
+def replaceDeflate(deflate):
+  with _replaceLock:
+    if hasattr(cdfwrite, "gzip_deflate"):
+      cdfwrite.gzip_deflate = deflate
+      try:
+        yield
+      finally:
+        cdfwrite.gzip_deflate = _originalDeflate
+    else:
+      original = cdfwrite.gzip
+      cdfwrite.gzip = type("gzip", (), {"compress": staticmethod(deflate)})
+      try:
+        yield
+      finally:
+        cdfwrite.gzip = original
+
+
+class CompressedCDF(CDF):
+  """
+  cdfwrite.CDF that compresses the blocks of a variable in a thread pool
+  (zlib releases the GIL) before cdfwrite writes them one after another.
+  The result is the same file that cdfwrite writes on its own.
+
+  Use the `Compress` entry of the variable spec to set the compression level.
+  """
+  def __init__(self, *args, executor: Executor = None, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.executor = executor
+    self._ownExecutor = executor is None
+    if executor is None:
+      self.executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    self._level = 0
+    self._blockingFactor = 1
+    self._deflate = _originalDeflate
+    self._blocks: Dict[bytes, Future] = {}
+    # True while cdfwrite converts the data of a variable, it converts the
+    # entries of attributes in the same way
+    self._writingData = False
+    # uncompressed bytes of the variables written so far
+    self.bytesWritten = 0
+
+  def write_var(self, var_spec, var_attrs=None, var_data=None):
+    self._level = var_spec.get("Compress", 6)
+    self._blockingFactor = var_spec.get("Block_Factor", 1)
+    try:
+      with replaceDeflate(self._compressedBlock):
+        return super().write_var(var_spec, var_attrs, var_data)
+    finally:
+      self._level = 0
+      self._blocks = {}
+
+  def _write_var_data_nonsparse(self, *args, **kwargs):
+    self._writingData = True
+    try:
+      return super()._write_var_data_nonsparse(*args, **kwargs)
+    finally:
+      self._writingData = False
+
+  def _write_var_data_sparse(self, *args, **kwargs):
+    self._writingData = True
+    try:
+      return super()._write_var_data_sparse(*args, **kwargs)
+    finally:
+      self._writingData = False
+
+  def _convert_data(self, data_type, num_elems, num_values, indata):
+    recs, data = super()._convert_data(data_type, num_elems, num_values, indata)
+    if self._writingData:
+      self.bytesWritten += len(data)
+      if self._level > 0 and recs > 0 and len(data) > 0:
+        self._compressBlocks(data, recs)
+    return recs, data
+
+  def _compressBlocks(self, data: bytes, recs: int):
+    """
+    Starts the compression of the blocks in the same way cdfwrite splits the
+    data of a variable
+    """
+    recordSize = len(data) // recs
+    blockingFactor = max(
+      1, self._blockingFactor, math.ceil(self.BLOCKING_BYTES / recordSize)
+    )
+    blockSize = min(blockingFactor, recs) * recordSize
+    for start in range(0, len(data), blockSize):
+      block = data[start:start + blockSize]
+      if block not in self._blocks:
+        self._blocks[block] = self.executor.submit(
+          self._deflate, block, self._level
+        )
+
+  def _compressedBlock(self, data: bytes, level: int) -> bytes:
+    future = self._blocks.get(data)
+    if future is None or level != self._level:
+      return self._deflate(data, level)
+    return future.result()
+
+  def close(self):
+    try:
+      super().close()
+    finally:
+      if self._ownExecutor:
+        self.executor.shutdown()
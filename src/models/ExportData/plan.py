@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+import numpy as np
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from src.utils import decodedData
+from src.utils.resampling import cadenceEpochs, resample
+from src.utils.State import State, StateSelectedVar
+from src.utils.utils import setFillValuesToNan
+
+
+@dataclass
+class EpochRecords:
+  """The exported records of an epoch variable"""
+  # datetime64 of the exported records
+  epoch: np.ndarray
+  records: slice
+  # index of each record in the merged epochs, None if they are the same
+  positions: np.ndarray = None
+
+
+class ExportPlan:
+  """
+  Reads everything that is shared by the exported variables once: the
+  attributes and DEPEND_0 of each variable and the decoded epoch and exported
+  records of each epoch variable. The exported epochs are the union of all
+  epochs the variables depend on, unless the data is resampled.
+  """
+  def __init__(
+    self,
+    state: State,
+    variables: Iterable[StateSelectedVar],
+    getRecordRange: Callable[[np.ndarray], slice],
+    resampling: str = "none",
+    cadence: np.timedelta64 = None,
+    reference: str = None
+  ):
+    """
+    Parameters
+    ----------
+    variables : Iterable[StateSelectedVar]
+        The variables that are exported
+    getRecordRange : Callable[[np.ndarray], slice]
+        Returns the exported records of a sorted datetime64 epoch
+    resampling : str
+        "none" or one of `src.utils.resampling.methods`
+    cadence : np.timedelta64
+        Resample onto epochs with this cadence, aligned to multiples of it
+    reference : str
+        Resample onto the exported epoch of this dataset instead
+    """
+    self.state = state
+    self.resampling = resampling
+    # (dataset, variable): attributes
+    self.atts: Dict[Tuple[str, str], dict] = {}
+    # (dataset, variable): name of the epoch variable
+    self.depend0: Dict[Tuple[str, str], str] = {}
+    # (dataset, epoch variable): exported records
+    self.records: Dict[Tuple[str, str], EpochRecords] = {}
+    self.epochAtts: dict = None
+    # the components of a vector variable are exported one after another
+    self._lastVector: Tuple[Tuple[str, str], np.ndarray] = (None, None)
+
+    for var in variables:
+      key = (var.dataset, var.variable)
+      if key in self.atts:
+        continue
+      cdf = state.datasetCDFInstances[var.dataset]
+      atts = cdf.varattsget(var.variable, expand=True)
+      self.atts[key] = atts
+      epochName = (atts.get("DEPEND_0") or ["epoch"])[0]
+      self.depend0[key] = epochName
+
+      epochKey = (var.dataset, epochName)
+      if epochKey in self.records:
+        continue
+      epoch = decodedData.datetime64s(cdf, epochName)
+      records = getRecordRange(epoch)
+      self.records[epochKey] = EpochRecords(epoch[records], records)
+      if self.epochAtts is None:
+        self.epochAtts = cdf.varattsget(epochName, expand=True)
+
+    self.epochs = mergeSortedEpochs([i.epoch for i in self.records.values()])
+    if resampling != "none":
+      self.epochs = self.getResampledEpochs(cadence, reference)
+      return
+    for epochRecords in self.records.values():
+      epoch = epochRecords.epoch
+      if len(epoch) != len(self.epochs) or not np.array_equal(
+        epoch, self.epochs
+      ):
+        epochRecords.positions = np.searchsorted(self.epochs, epoch)
+
+  def getResampledEpochs(
+    self, cadence: np.timedelta64, reference: str
+  ) -> np.ndarray:
+    if reference is not None:
+      for (dataset, _), epochRecords in self.records.items():
+        if dataset == reference:
+          return epochRecords.epoch.astype("datetime64[ns]")
+      raise ValueError(
+        "The reference dataset of the resampling contains no exported variable"
+      )
+    if len(self.epochs) == 0:
+      return self.epochs
+    # start at a multiple of the cadence, e.g. at a full minute
+    start = self.epochs[0].astype(np.int64)
+    start -= start % np.timedelta64(cadence, "ns").astype(np.int64)
+    return cadenceEpochs(
+      np.datetime64(int(start), "ns"), self.epochs[-1], cadence
+    )
+
+  def getData(self, var: StateSelectedVar) -> Tuple[np.ndarray, dict]:
+    """
+    Returns the data of the variable aligned to the exported epochs and a copy
+    of its attributes. Records without data are NaN.
+    """
+    key = (var.dataset, var.variable)
+    atts = dict(self.atts[key])
+    if self._lastVector[0] == key:
+      return self._lastVector[1], atts
+    epochRecords = self.records[(var.dataset, self.depend0[key])]
+
+    cdf = self.state.datasetCDFInstances[var.dataset]
+    data = np.array(
+      decodedData.varget(cdf, var.variable)[epochRecords.records], dtype=float
+    )
+    setFillValuesToNan(data, atts)
+    if self.resampling != "none":
+      data = resample(epochRecords.epoch, data, self.epochs, self.resampling)
+    elif epochRecords.positions is not None:
+      alignedData = np.full((len(self.epochs), ) + data.shape[1:], np.nan)
+      alignedData[epochRecords.positions] = data
+      data = alignedData
+    if len(data.shape) > 1:
+      self._lastVector = (key, data)
+    return data, atts
+
+
+def mergeSortedEpochs(epochs: List[np.ndarray]) -> np.ndarray:
+  """
+  Merges the sorted datetime64 arrays into one sorted array without
+  duplicates
+  """
+  if len(epochs) == 0:
+    return np.array([], dtype="datetime64[ns]")
+  merged = epochs[0].astype("datetime64[ns]")
+  for epoch in epochs[1:]:
+    epoch = epoch.astype("datetime64[ns]")
+    # insert the values of epoch at their sorted position in merged
+    merged = np.insert(merged, np.searchsorted(merged, epoch), epoch)
+  if len(merged) > 1:
+    merged = merged[np.concatenate(([True], merged[1:] != merged[:-1]))]
+  return merged
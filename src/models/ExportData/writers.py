@@ -0,0 +1,237 @@
+import gzip
+from importlib import import_module
+import numpy as np
+from typing import Any, Dict, Iterable, List, Union
+
+# number of records formatted at once by the text writer
+textChunkSize = 50000
+# number of records in a chunk or row group of the columnar formats
+columnChunkSize = 65536
+# file format: package required to write it
+columnarFormatPackages = {
+  "hdf5": "h5py", "netcdf": "netCDF4", "parquet": "pyarrow"
+}
+# CDF attributes that are stored with the variables in the columnar formats
+metadataAttributes = ["UNITS", "CATDESC", "FIELDNAM", "FILLVAL"]
+epochUnits = "nanoseconds since 1970-01-01 00:00:00 UTC"
+
+
+def writeText(
+  path: str,
+  epochs: np.ndarray,
+  columns: List[np.ndarray],
+  names: List[str],
+  units: List[str],
+  descriptions: List[str],
+  delimiter: str = " ",
+  compress: bool = False,
+  numberFormat: str = "%.18e"
+):
+  """
+  Writes the columns as text file in the same format as `numpy.savetxt`, so
+  it can be read with `numpy.loadtxt`. The records are formatted and written
+  in chunks of textChunkSize.
+
+  Parameters
+  ----------
+  epochs : np.ndarray
+      The time of each record as datetime64, written in ISO format with
+      millisecond precision
+  columns : List[np.ndarray]
+      One 1D array for each column after the time, all with the length of
+      epochs
+  names, units : List[str]
+      The column names and units, including the one of the time column
+  descriptions : List[str]
+      Written after the data
+  compress : bool
+      Write a gzip compressed file
+  """
+  file = (
+    gzip.open(path, "wt", encoding="utf-8", newline="\n")
+    if compress else open(path, "w", encoding="utf-8", newline="\n")
+  )
+  with file:
+    for line in [delimiter.join(names), delimiter.join(units)]:
+      file.write("# " + line + "\n")
+
+    rowFormat = delimiter.join(["%s"] + [numberFormat] * len(columns)) + "\n"
+    for start in range(0, len(epochs), textChunkSize):
+      end = min(start + textChunkSize, len(epochs))
+      table = np.empty((end - start, len(columns) + 1), dtype=object)
+      table[:, 0] = np.datetime_as_string(
+        epochs[start:end].astype("datetime64[ms]"), unit="ms"
+      )
+      for i, column in enumerate(columns):
+        table[:, i + 1] = column[start:end]
+      # one format operation for the whole chunk instead of one per record
+      file.write((rowFormat * (end - start)) % tuple(table.ravel()))
+
+    for line in ["Variable descriptions:"] + descriptions:
+      file.write("# " + line + "\n")
+
+
+def getMissingPackage(fileFormat: str) -> Union[str, None]:
+  """
+  Returns the name of the python package that is required for the file
+  format but not installed or None
+  """
+  package = columnarFormatPackages.get(fileFormat)
+  if package is None:
+    return None
+  try:
+    import_module(package)
+  except ImportError:
+    return package
+  return None
+
+
+def getMetadata(atts: Dict[str, Any]) -> Dict[str, Union[str, float]]:
+  """Returns the CDF attributes that are kept in the columnar formats"""
+  metadata = {}
+  for key in metadataAttributes:
+    if key not in atts or atts[key] is None:
+      continue
+    value = atts[key]
+    if isinstance(value, list):
+      # varattsget with expand=True returns [value, data type]
+      value = value[0]
+    value = np.asarray(value)
+    metadata[key] = (
+      value.item() if value.size == 1 and value.dtype.kind in "fiu" else
+      str(value.item() if value.size == 1 else value.tolist())
+    )
+  return metadata
+
+
+def epochsToNanoseconds(epochs: np.ndarray) -> np.ndarray:
+  return epochs.astype("datetime64[ns]").astype(np.int64)
+
+
+def writeHDF5(
+  path: str,
+  epochs: np.ndarray,
+  items: Iterable[Dict[str, Any]],
+  compressionLevel: int = None
+):
+  """
+  Writes the epoch and each item of `Model.forEachVarToSave` as chunked
+  HDF5 dataset. The items are written as they are produced.
+
+  Parameters
+  ----------
+  epochs : np.ndarray
+      datetime64 values, written as nanoseconds since 1970-01-01
+  compressionLevel : int
+      gzip level, None to write uncompressed
+  """
+  import h5py
+
+  def createDataset(file, name: str, data: np.ndarray, metadata: dict):
+    dataset = file.create_dataset(
+      name,
+      data=data,
+      chunks=(min(len(data), columnChunkSize), ) + data.shape[1:]
+      if len(data) else None,
+      compression="gzip" if compressionLevel is not None else None,
+      compression_opts=compressionLevel
+    )
+    dataset.attrs.update(metadata)
+
+  with h5py.File(path, "w") as file:
+    createDataset(
+      file,
+      "epoch",
+      epochsToNanoseconds(epochs),
+      {"UNITS": epochUnits}
+    )
+    for item in items:
+      createDataset(
+        file, item["name"], item["data"], getMetadata(item["atts"])
+      )
+
+
+def writeNetCDF(
+  path: str,
+  epochs: np.ndarray,
+  items: Iterable[Dict[str, Any]],
+  compressionLevel: int = None
+):
+  """
+  Writes the epoch and each item of `Model.forEachVarToSave` as chunked
+  NetCDF4 variable along the dimension "epoch". The items are written as
+  they are produced.
+  """
+  import netCDF4
+
+  with netCDF4.Dataset(path, "w", format="NETCDF4") as file:
+    file.createDimension("epoch", len(epochs))
+    chunkSize = max(1, min(len(epochs), columnChunkSize))
+
+    def createVariable(name: str, data: np.ndarray, metadata: dict):
+      dimensions = ("epoch", )
+      for i, size in enumerate(data.shape[1:]):
+        dimension = "{}_dim{}".format(name, i + 1)
+        file.createDimension(dimension, size)
+        dimensions += (dimension, )
+      variable = file.createVariable(
+        name,
+        data.dtype,
+        dimensions,
+        zlib=compressionLevel is not None,
+        complevel=compressionLevel or 0,
+        chunksizes=(chunkSize, ) + data.shape[1:]
+      )
+      variable.setncatts(metadata)
+      variable[:] = data
+
+    createVariable(
+      "epoch",
+      epochsToNanoseconds(epochs),
+      {"units": epochUnits, "UNITS": epochUnits}
+    )
+    for item in items:
+      createVariable(item["name"], item["data"], getMetadata(item["atts"]))
+
+
+def writeParquet(
+  path: str,
+  epochs: np.ndarray,
+  items: Iterable[Dict[str, Any]],
+  compressionLevel: int = None
+):
+  """
+  Writes the epoch and each item of `Model.forEachVarToSave` as column of a
+  Parquet table. The attributes are stored as field metadata. Vectors are
+  stored as fixed size lists.
+  """
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+
+  def toMetadata(metadata: dict):
+    return {key: str(value) for key, value in metadata.items()}
+
+  fields = [pa.field("epoch", pa.timestamp("ns", tz="UTC"))]
+  columns = [pa.array(epochs.astype("datetime64[ns]"), fields[0].type)]
+  for item in items:
+    data = np.ascontiguousarray(item["data"])
+    column = pa.array(data.reshape(-1))
+    if len(data.shape) > 1:
+      column = pa.FixedSizeListArray.from_arrays(column, data.shape[1])
+    fields.append(
+      pa.field(
+        item["name"],
+        column.type,
+        metadata=toMetadata(getMetadata(item["atts"]))
+      )
+    )
+    columns.append(column)
+
+  table = pa.Table.from_arrays(columns, schema=pa.schema(fields))
+  pq.write_table(
+    table,
+    path,
+    row_group_size=columnChunkSize,
+    compression="gzip" if compressionLevel is not None else "none",
+    compression_level=compressionLevel
+  )
@@ -1,7 +1,9 @@
 import numpy as np
-from typing import Callable, List
+from typing import Callable, List, Tuple
 import matplotlib.pyplot as plt
 from dataclasses import dataclass
+from src.utils.constants import warmStartRangeFraction
+from src.utils.warmStart import getAngleRange, getParameterRange, isOnEdge
 from .utils import rotation, averageB
 
 
@@ -25,6 +27,80 @@ class Result:
 class Settings:
   nIterations: int = 10
   nPoints: int = 1000
+  nPointsAngles: int = 1000
+  # orientation the search starts from and degrees searched around it
+  initialTheta: float = 0.0
+  initialPhi: float = 0.0
+  angleRange: float = 360
+  # values the search of the other parameters starts from (default for B0:
+  # maximum of the total field) and the fraction of their ranges searched
+  # around them
+  initialB0: float = None
+  initialb: float = 0.0
+  initialR0: float = 5.0
+  rangeFraction: float = 1.0
+
+
+def applyPreviousResult(settings: Settings, result: Result):
+  """
+  Starts the search from a previous result and narrows the ranges and points
+  to warmStartRangeFraction of them, which keeps the resolution
+  """
+  settings.initialB0 = result.B0
+  settings.initialb = result.b
+  settings.initialR0 = result.R0
+  settings.initialTheta = result.theta
+  settings.initialPhi = result.phi
+  settings.rangeFraction = warmStartRangeFraction
+  settings.angleRange = 360 * warmStartRangeFraction
+  settings.nPoints = max(2, int(settings.nPoints * warmStartRangeFraction))
+  settings.nPointsAngles = max(
+    2, int(settings.nPointsAngles * warmStartRangeFraction)
+  )
+
+
+# lower and upper bound of the searched B0, b and R0
+B0Bounds = (-16, 16)
+bBounds = (1, 15)
+R0Bounds = (0.01, 50)
+
+
+def getRanges(settings: Settings) -> Tuple[np.ndarray, ...]:
+  """Returns the values of B0, b, R0, theta and phi that are searched"""
+  return (
+    getParameterRange(
+      *B0Bounds, settings.nPoints, settings.initialB0, settings.rangeFraction
+    ),
+    getParameterRange(
+      *bBounds, settings.nPoints, settings.initialb, settings.rangeFraction
+    ),
+    getParameterRange(
+      *R0Bounds, settings.nPoints, settings.initialR0, settings.rangeFraction
+    ),
+    getAngleRange(
+      settings.initialTheta, settings.angleRange, settings.nPointsAngles
+    ),
+    getAngleRange(
+      settings.initialPhi, settings.angleRange, settings.nPointsAngles
+    )
+  )
+
+
+def reachedRangeEdge(settings: Settings, result: Result) -> bool:
+  """
+  True when a parameter of the result is on the edge of a narrowed search
+  range, so that the minimum may lie outside of it
+  """
+  rangeB0, rangeb, rangeR0, rangeTheta, rangePhi = getRanges(settings)
+  return (
+    isOnEdge(result.B0, rangeB0, *B0Bounds)
+    or isOnEdge(result.b, rangeb, *bBounds)
+    or isOnEdge(result.R0, rangeR0, *R0Bounds) or (
+      settings.angleRange < 360 and (
+        isOnEdge(result.theta, rangeTheta) or isOnEdge(result.phi, rangePhi)
+      )
+    )
+  )
 
 
 def fitting_Hoyle(
@@ -39,11 +115,13 @@ def fitting_Hoyle(
 ):
   if Btotal is None:
     Btotal = np.sqrt(Bx**2 + By**2 + Bz**2)
-  minB0: float = np.nanmax(Btotal)
-  minb: float = 0
-  minR0: float = 5
-  minTheta: float = 0.0
-  minPhi: float = 0.0
+  minB0: float = (
+    np.nanmax(Btotal) if settings.initialB0 is None else settings.initialB0
+  )
+  minb: float = settings.initialb
+  minR0: float = settings.initialR0
+  minTheta: float = settings.initialTheta
+  minPhi: float = settings.initialPhi
 
   toRad = np.pi / 180
 
@@ -59,18 +137,16 @@ def fitting_Hoyle(
     )
     # yapf: enable
 
+  rangeB0, rangeb, rangeR0, rangeTheta, rangePhi = getRanges(settings)
   arrayB0 = np.empty(settings.nPoints)
-  rangeB0 = np.linspace(-16, 16, settings.nPoints)
   arrayb = np.empty_like(arrayB0)
-  rangeb = np.linspace(1, 15, settings.nPoints)
   arrayR0 = np.empty_like(arrayB0)
-  rangeR0 = np.linspace(0.01, 50, settings.nPoints)
-  arrayTheta = np.empty_like(arrayB0)
-  rangeTheta = np.linspace(0, 360, settings.nPoints)
-  arrayPhi = np.empty_like(arrayB0)
-  rangePhi = np.linspace(0, 360, settings.nPoints)
+  arrayTheta = np.empty(settings.nPointsAngles)
+  arrayPhi = np.empty_like(arrayTheta)
 
-  totalIterations = float(settings.nPoints * 5 * settings.nIterations)
+  totalIterations = float(
+    (settings.nPoints * 3 + settings.nPointsAngles * 2) * settings.nIterations
+  )
   currentIterations = 0
 
   statusString = ""
@@ -7,9 +7,20 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from src.utils.MatplotlibTkinterIntegration import createPlot
+from src.utils import resultCache
 from src.utils.State import State
 from src.utils.constants import padding
-from .lundquist import Lund_Bphi, Lund_Bz, Lund_tot, Settings, fitting_lundquist
+from src.utils.minimumVariance import applyWarmStart, minimumVariance
+from .lundquist import (
+  Lund_Bphi,
+  Lund_Bz,
+  Lund_tot,
+  Result,
+  Settings,
+  applyPreviousResult,
+  fitting_lundquist,
+  reachedRangeEdge
+)
 from .utils import rotation
 
 
@@ -37,8 +48,13 @@ class Model:
   # set to True when this reconstruction can show some results
   hasResults = False
 
+  # increase it when the results change, so that results of older versions
+  # aren't taken from the cache
+  version = 1
+
   def __init__(self):
     self.canceled = False
+    self.previousResult: Result = None
 
   def canRun(self) -> Union[bool, str]:
     """
@@ -58,6 +74,17 @@ class Model:
     print("showing settings")
     window.title(self.name)
 
+  def hasCachedResult(self, state: State) -> bool:
+    """True when run takes the result from the cache without fitting"""
+    return resultCache.hasResult(resultCache.getKey(state, self, Settings()))
+
+  def setPreviousResult(self, result: Result):
+    """
+    Called before run with the result of the previous run when the selection
+    overlaps it, or None. The search then starts from it.
+    """
+    self.previousResult = result
+
   def run(
     self,
     state: State,
@@ -92,28 +119,56 @@ class Model:
       import scipy
       statusCallback(None, "Reading the data")
       # read the magnetic field
-      Bx = state.getData("mag", "x")
-      By = state.getData("mag", "y")
-      Bz = state.getData("mag", "z")
-      if Bx is None or By is None or Bz is None:
+      Bx = state.getData("mag", "x", includeDate=True)
+      if Bx is None:
+        raise Exception("Not all magnetic field components found")
+      Bx, date = Bx
+      # the other variables can be from datasets with another cadence
+      By, Bz, Btotal = (
+        state.getData("mag", dir, resampleTo=date.datetime64, method="linear")
+        for dir in ["y", "z", "total"]
+      )
+      if By is None or Bz is None:
         raise Exception("Not all magnetic field components found")
-      Btotal = state.getData("mag", "total")
-      # assume that they all have the same length
       self.r = r = np.linspace(-1, 1, len(Bx))
       self.Bx, self.By, self.Bz = Bx, By, Bz
       statusCallback(None, "Calculating")
-      self.result = fitting_lundquist(
-        Bx,
-        By,
-        Bz,
-        Btotal,
-        r,
-        Settings(),
-        statusCallback,
-        lambda: self.canceled
-      )
-      if self.canceled:
-        return
+      self.settings = Settings()
+      self.minimumVariance = minimumVariance(Bx, By, Bz)
+      # only results of the normal start are stored, which don't depend on
+      # previous runs
+      cacheKey = resultCache.getKey(state, self, self.settings)
+      self.result = resultCache.loadResult(cacheKey, Result)
+
+      def fit() -> Result:
+        return fitting_lundquist(
+          Bx,
+          By,
+          Bz,
+          Btotal,
+          r,
+          self.settings,
+          statusCallback,
+          lambda: self.canceled
+        )
+
+      if self.result is None and self.previousResult is not None:
+        applyPreviousResult(self.settings, self.previousResult)
+        self.result = fit()
+        if self.canceled:
+          return
+        if reachedRangeEdge(self.settings, self.result):
+          # the minimum may lie outside of the narrowed search
+          self.result = None
+          self.settings = Settings()
+      if self.result is None:
+        # start from the orientation of the minimum variance analysis, the
+        # axial field of the model is Bz and Bphi changes its sign
+        applyWarmStart(self.settings, self.minimumVariance, 2, 1)
+        self.result = fit()
+        if self.canceled:
+          return
+        resultCache.saveResult(cacheKey, self.result)
 
       import scipy
       # Define Br
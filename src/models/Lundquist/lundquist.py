@@ -1,7 +1,9 @@
-from typing import Callable, List
+from typing import Callable, List, Tuple
 import numpy as np
 import matplotlib.pyplot as plt
 from dataclasses import dataclass
+from src.utils.constants import warmStartRangeFraction
+from src.utils.warmStart import getAngleRange, getParameterRange, isOnEdge
 from .utils import rotation, averageB
 
 
@@ -22,6 +24,64 @@ class Settings:
   nIterations: int = 6
   nPointsB0: int = 1000
   nPointsAngles: int = 1000
+  # orientation the search starts from and degrees searched around it
+  initialTheta: float = 0.0
+  initialPhi: float = 0.0
+  angleRange: float = 360
+  # B0 the search starts from (default: maximum of the total field) and the
+  # fraction of its range searched around it
+  initialB0: float = None
+  rangeFraction: float = 1.0
+
+
+def applyPreviousResult(settings: Settings, result: Result):
+  """
+  Starts the search from a previous result and narrows the ranges and points
+  to warmStartRangeFraction of them, which keeps the resolution
+  """
+  settings.initialB0 = result.B0
+  settings.initialTheta = result.theta
+  settings.initialPhi = result.phi
+  settings.rangeFraction = warmStartRangeFraction
+  settings.angleRange = 360 * warmStartRangeFraction
+  settings.nPointsB0 = max(2, int(settings.nPointsB0 * warmStartRangeFraction))
+  settings.nPointsAngles = max(
+    2, int(settings.nPointsAngles * warmStartRangeFraction)
+  )
+
+
+# lower and upper bound of the searched B0
+B0Bounds = (0, 32)
+
+
+def getRanges(
+  settings: Settings
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Returns the values of B0, theta and phi that are searched"""
+  return (
+    getParameterRange(
+      *B0Bounds, settings.nPointsB0, settings.initialB0, settings.rangeFraction
+    ),
+    getAngleRange(
+      settings.initialTheta, settings.angleRange, settings.nPointsAngles
+    ),
+    getAngleRange(
+      settings.initialPhi, settings.angleRange, settings.nPointsAngles
+    )
+  )
+
+
+def reachedRangeEdge(settings: Settings, result: Result) -> bool:
+  """
+  True when a parameter of the result is on the edge of a narrowed search
+  range, so that the minimum may lie outside of it
+  """
+  rangeB0, rangeTheta, rangePhi = getRanges(settings)
+  return isOnEdge(result.B0, rangeB0, *B0Bounds) or (
+    settings.angleRange < 360 and (
+      isOnEdge(result.theta, rangeTheta) or isOnEdge(result.phi, rangePhi)
+    )
+  )
 
 
 def fitting_lundquist(
@@ -38,14 +98,13 @@ def fitting_lundquist(
   if Btotal is None:
     Btotal = np.sqrt(Bx**2 + By**2 + Bz**2)
 
-  minB0: float = np.nanmax(Btotal)
-  rangeB0 = np.linspace(0, 32, settings.nPointsB0)
+  minB0: float = (
+    np.nanmax(Btotal) if settings.initialB0 is None else settings.initialB0
+  )
   # orientation
-  minTheta = 0.0
-  minPhi = 0.0
-
-  rangeTheta = np.linspace(0, 360, settings.nPointsAngles)
-  rangePhi = np.linspace(0, 360, settings.nPointsAngles)
+  minTheta = settings.initialTheta
+  minPhi = settings.initialPhi
+  rangeB0, rangeTheta, rangePhi = getRanges(settings)
   arrayB0 = np.empty(settings.nPointsB0)
   arrayTheta = np.empty(settings.nPointsAngles)
   arrayPhi = np.empty_like(arrayTheta)
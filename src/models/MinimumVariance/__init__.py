@@ -0,0 +1,139 @@
+from typing import Callable, Union
+from tkinter import Toplevel
+import tkinter as tk
+import tkinter.ttk as ttk
+import numpy as np
+
+from src.utils.State import State
+from src.utils.constants import mvaMinEigenvalueRatio, padding
+from src.utils.minimumVariance import getModelAngles, minimumVariance
+
+
+class Model:
+  """
+  Minimum Variance Analysis
+  ===========
+
+  Eigenvalues and eigenvectors of the covariance matrix of the magnetic field
+  in the selection (Sonnerup and Scheible, 1998). The intermediate variance
+  direction estimates the axis of the flux rope. The Lundquist and Gold-Hoyle
+  models start their search from this orientation when the intermediate to
+  minimum eigenvalue ratio is large enough.
+  """
+
+  # this tells the application which variables are required so that it can
+  # disable the model when some variables are missing
+  # for a list of variables have a look at `src/utils/constants.py`
+  # "requiredVariables" and "optionalVariables"
+  requiredVariables = ["Magnetic Field"]
+
+  # the name of this model
+  name = "Minimum Variance Analysis"
+
+  # set to True when this reconstruction has some options to configure
+  hasSettings = False
+
+  # set to True when this reconstruction can show some results
+  hasResults = False
+
+  def __init__(self):
+    self.canceled = False
+
+  def canRun(self) -> Union[bool, str]:
+    return True
+
+  def showSettings(self, window: Toplevel, state: State):
+    window.title(self.name)
+
+  def run(
+    self,
+    state: State,
+    statusCallback: Callable[[float, str], None],
+    doneCallback: Callable[[], None],
+    errorCallback: Callable[[str], None]
+  ):
+    self.canceled = False
+    try:
+      statusCallback(None, "Reading the data")
+      Bx = state.getData("mag", "x", includeDate=True)
+      if Bx is None:
+        raise Exception("Not all magnetic field components found")
+      Bx, date = Bx
+      By, Bz = (
+        state.getData("mag", dir, resampleTo=date.datetime64, method="linear")
+        for dir in ["y", "z"]
+      )
+      if By is None or Bz is None:
+        raise Exception("Not all magnetic field components found")
+      statusCallback(None, "Calculating")
+      self.result = minimumVariance(Bx, By, Bz)
+      # the initial orientations of the models, see their run
+      self.lundquistAngles = getModelAngles(self.result, 2, 1)
+      self.goldHoyleAngles = getModelAngles(self.result, 1, 2)
+
+      self.hasResults = True
+      doneCallback()
+    except Exception as e:
+      self.hasResults = False
+      errorCallback(e)
+      raise
+
+  def cancel(self):
+    self.canceled = True
+
+  def showResults(self, window: Toplevel):
+    """Called when the user wants to see the results"""
+    window.title(self.name)
+    result = self.result
+    axis = result.axis
+    items = [
+      ("Samples", str(result.samples)),
+      ("λ int / λ min", f"{result.intermediateToMinimum:.2f}"),
+      ("λ max / λ int", f"{result.maximumToIntermediate:.2f}"),
+      (
+        "Axis (intermediate)",
+        "[{:.3f}, {:.3f}, {:.3f}]".format(*axis)
+      ),
+      # in the frame of the data, e.g. GSE
+      ("Axis latitude", f"{np.degrees(np.arcsin(axis[2])):.1f} °"),
+      (
+        "Axis longitude",
+        f"{np.degrees(np.arctan2(axis[1], axis[0])) % 360:.1f} °"
+      ),
+      (
+        "Initial orientation",
+        "used by the models" if result.wellDetermined else
+        f"not used, λ int / λ min is below {mvaMinEigenvalueRatio}"
+      ),
+      (
+        "Lundquist theta, phi",
+        "{:g} °, {:g} °".format(*self.lundquistAngles)
+      ),
+      (
+        "Gold-Hoyle theta, phi",
+        "{:g} °, {:g} °".format(*self.goldHoyleAngles)
+      )
+    ]
+    for i, (title, value) in enumerate(items):
+      label = ttk.Label(window, text=title)
+      label.grid(column=0, row=i, padx=padding, pady=padding, sticky="w")
+      var = tk.StringVar(window, value)
+      entry = ttk.Entry(window, state="readonly", textvariable=var, width=30)
+      entry.var = var
+      entry.grid(column=1, row=i, padx=padding, pady=padding)
+
+    frame = ttk.Frame(window)
+    frame.grid(
+      column=0, row=len(items), columnspan=2, padx=padding, pady=padding
+    )
+    names = ["minimum", "intermediate", "maximum"]
+    for column, text in enumerate(["", "λ", "x", "y", "z"]):
+      label = ttk.Label(frame, text=text)
+      label.grid(column=column, row=0, padx=padding)
+    for row, name in enumerate(names):
+      label = ttk.Label(frame, text=name)
+      label.grid(column=0, row=row + 1, padx=padding, sticky="w")
+      values = [result.eigenvalues[row], *result.eigenvectors[:, row]]
+      for column, value in enumerate(values):
+        label = ttk.Label(frame, text=f"{value:.3f}")
+        label.grid(column=column + 1, row=row + 1, padx=padding, sticky="e")
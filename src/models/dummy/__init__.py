@@ -55,6 +55,18 @@ class Model:
     print("showing settings")
     window.title(self.name)
 
+  # Optional: define `setPreviousResult(self, result)` to start the search
+  # from the result of the previous run. It is called before each run with
+  # that result when the same magnetic field is selected and the selection
+  # overlaps the previous one, otherwise with None.
+
+  # Optional: define `hasCachedResult(self, state) -> bool` when run takes
+  # results from `src/utils/resultCache.py`. Models with a cached result are
+  # run when the reconstruction page opens, so that their results are shown
+  # without starting them. Such models also need a `version` attribute, which
+  # is increased when their results change, so that results of older versions
+  # aren't taken from the cache.
+
   def run(
     self,
     state: State,
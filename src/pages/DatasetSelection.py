@@ -4,7 +4,7 @@ from tkinter import ttk
 from tkinter import messagebox
 from astropy.time import Time
 from datetime import datetime
-from typing import Dict, Union, Callable, Tuple
+from typing import Dict, Set, Union, Callable, Tuple
 from functools import partial, reduce
 
 from src.pages.BasePage import BasePage
@@ -17,7 +17,9 @@ from src.utils.constants import (
   optionalVariables,
   navigationButtonInnerPadding,
   doubleClickTime,
-  imageCheckbox
+  imageCheckbox,
+  variableSuggestionTerms,
+  maxVariableSuggestions
 )
 from src.utils.utils import (
   ensureOnScreen,
@@ -28,6 +30,7 @@ from src.utils.utils import (
   Time2StrCdasArgument
 )
 from src.utils.ScrollableFrame import ScrollableFrame
+from src.utils.SearchIndex import SearchIndex
 from src.utils.State import (
   State, StateSelectedVars, StateSelectedVar, StateDataset
 )
@@ -169,7 +172,9 @@ class DatasetVariableSelection(tk.Frame):
     self.title = title
     self.state = state
 
-    self.tvFrame, self.treeView = scrollableTreeview(self, title=title)
+    self.tvFrame, self.treeView = scrollableTreeview(
+      self, title=title, virtual=True
+    )
     self.tvFrame.pack(side="top", padx=padding, pady=padding)
 
     self.treeView.configure(
@@ -180,15 +185,22 @@ class DatasetVariableSelection(tk.Frame):
     self.treeView.bind("<Up>", self.onArrowKey)
     self.treeView.bind("<<TreeviewSelect>>", self.variableSelected)
     self.treeView.bind("<space>", self.variableSelected)
+    self.treeView.tag_configure("suggested", foreground="#1f5fbf")
 
     self.datasets = []
     self.treeViewItems = {}
+    # tree view items of the variables by dataset id and variable name
+    self.variableItems: Dict[str, Dict[str, str]] = {}
     # look up variable & dataset by tree view items
     self.treeViewLookup = {}
     # look up tree view items by dataset & variable (key = tuple of str)
     self.treeViewReverseLookup = {}
     # the last time an arrow key was pressed
     self.arrowKeyPressed: datetime = None
+    # dataset & variable (key = tuple of str) that are shown, None for all
+    self.visibleVariables: Set[Tuple[str, str]] = None
+    # dataset & variable (key = tuple of str) that are highlighted
+    self.suggestedVariables: Set[Tuple[str, str]] = set()
 
   def onArrowKey(self, event):
     self.arrowKeyPressed = datetime.now()
@@ -255,8 +267,9 @@ class DatasetVariableSelection(tk.Frame):
 
     for item in removeItems:
       tvId = self.treeViewItems[item["Id"]]
-      for child in self.treeView.get_children(tvId):
+      for name, child in self.variableItems.pop(item["Id"], {}).items():
         self.treeViewLookup.pop(child, None)
+        self.treeViewReverseLookup.pop((item["Id"], name), None)
       self.treeView.delete(tvId)
       self.treeViewItems.pop(item["Id"], None)
 
@@ -276,27 +289,85 @@ class DatasetVariableSelection(tk.Frame):
           self.treeView.item(item, open=False)
 
   def updateVariables(self):
+    """
+    Updates the variables in the tree view. Only variables that were added
+    or removed are inserted or deleted, all others are updated in place
+    """
+    ownName = str(self)
     for dataset in self.datasets:
       item = self.treeViewItems[dataset["Id"]]
-      self.treeView.delete(*self.treeView.get_children(item))
-      if ("variables" in dataset and isinstance(dataset["variables"], list)
-          and len(dataset["variables"])):
-        for variable in dataset["variables"]:
+      variables = (
+        dataset["variables"] if
+        ("variables" in dataset and isinstance(dataset["variables"], list))
+        else []
+      )
+      items = self.variableItems.setdefault(dataset["Id"], {})
+
+      names = set(variable["Name"] for variable in variables)
+      for name in [name for name in items if name not in names]:
+        varItem = items.pop(name)
+        self.treeViewLookup.pop(varItem, None)
+        self.treeViewReverseLookup.pop((dataset["Id"], name), None)
+        self.treeView.delete(varItem)
+
+      for variable in variables:
+        key = (dataset["Id"], variable["Name"])
+        options = dict(
+          image=(
+            imageCheckbox.checked
+            if variable["selected"] == ownName else imageCheckbox.empty
+          ),
+          tags=(("suggested", ) if key in self.suggestedVariables else ())
+        )
+        varItem = items.get(variable["Name"])
+        if varItem is None:
           varItem = self.treeView.insert(
-            item,
-            tk.END,
-            text=variable["Name"],
-            image=(
-              imageCheckbox.checked
-              if variable["selected"] == str(self) else imageCheckbox.empty
-            )
+            item, tk.END, text=variable["Name"], **options
           )
-          self.treeViewLookup[varItem] = {
-            "variable": variable,
-            "dataset": dataset,
-          }
-          self.treeViewReverseLookup[(dataset["Id"], variable["Name"])
-                                     ] = varItem
+          items[variable["Name"]] = varItem
+          self.treeViewReverseLookup[key] = varItem
+        else:
+          self.treeView.item(varItem, **options)
+        self.treeViewLookup[varItem] = {
+          "variable": variable,
+          "dataset": dataset,
+        }
+    self.applyFilter()
+
+  def setFilter(
+    self, visibleVariables: Set[Tuple[str, str]] = None, apply: bool = True
+  ):
+    """
+    Only shows the variables whose dataset & variable tuple is in
+    visibleVariables. Pass None to show all variables. When apply is False,
+    it takes effect on the next call to updateVariables
+    """
+    self.visibleVariables = visibleVariables
+    if apply:
+      self.applyFilter()
+
+  def applyFilter(self):
+    for dataset in self.datasets:
+      if not ("variables" in dataset and isinstance(dataset["variables"], list)):
+        continue
+      item = self.treeViewItems[dataset["Id"]]
+      children = [
+        self.treeViewReverseLookup[(dataset["Id"], variable["Name"])]
+        for variable in dataset["variables"]
+        if self.visibleVariables is None
+        or (dataset["Id"], variable["Name"]) in self.visibleVariables
+      ]
+      # detaches all variables that are not in children
+      self.treeView.set_children(item, *children)
+      if self.visibleVariables is not None and len(children) > 0:
+        self.treeView.item(item, open=True)
+
+  def setSuggestions(self, suggestedVariables: Set[Tuple[str, str]]):
+    """
+    Highlights the variables whose dataset & variable tuple is in
+    suggestedVariables. Takes effect on the next call to updateVariables
+    """
+    self.suggestedVariables = set(suggestedVariables)
 
   def getVariables(self):
     ownName = str(self)
@@ -343,6 +414,13 @@ class DatasetSelection(BasePage):
     self.datasets = None
     self.lastSelectedDataset = None
     self.variableSelects: Dict[str, DatasetVariableSelection] = {}
+    # look up datasets by tree view items
+    self.datasetsByItem: Dict[str, dict] = {}
+    # dataset ids by their label, id and instrument
+    self.datasetIndex: SearchIndex[str] = SearchIndex()
+    # dataset & variable (key = tuple of str) by the variable name and
+    # description
+    self.variableIndex: SearchIndex[Tuple[str, str]] = SearchIndex()
 
     self.createStatusLabel()
     self.pack()
@@ -443,7 +521,9 @@ class DatasetSelection(BasePage):
        "Please select the datasets so that they contain the instrument types "
        + languageJoin(instrumentTypes, quoteItems="\"")
        + " (click on checkbox or press space)",
-       button="Select Dataset"
+       button="Select Dataset",
+       search=True,
+       virtual=True
      )
     self.tvDatasets.bind("<<TreeviewSelect>>", self.datasetSelected)
     self.tvDatasets.bind("<Button-1>", self.datasetSelected)
@@ -481,6 +561,15 @@ class DatasetSelection(BasePage):
         )
       )
       dataset["tvItem"] = item
+      self.datasetsByItem[item] = dataset
+      self.datasetIndex.add(
+        dataset["Id"],
+        dataset["Label"],
+        dataset["Id"],
+        dataset.get("Instrument"),
+        dataset.get("InstrumentType")
+      )
+    self.tvDatasets.searchVar.trace_add("write", self.filterDatasets)
 
     self.bSelectDataset["command"] = self.selectDataset
     self.bSelectDataset["state"] = tk.DISABLED
@@ -527,6 +616,16 @@ class DatasetSelection(BasePage):
     )
     self.lbVariableSelection.grid(column=1, row=row, columnspan=2)
 
+    row += 1
+    frameVariableSearch = ttk.Frame(self)
+    frameVariableSearch.grid(column=1, row=row, columnspan=2, padx=padding)
+    ttk.Label(frameVariableSearch, text="Search variables:").pack(side="left")
+    self.variableSearchVar = tk.StringVar(self)
+    self.variableSearchVar.trace_add("write", self.filterVariables)
+    ttk.Entry(
+      frameVariableSearch, textvariable=self.variableSearchVar, width=50
+    ).pack(side="left", padx=padding)
+
     row += 1
     self.fVaraibleSelections = tk.Frame(self)
     self.fVaraibleSelections.grid(column=1, row=row, columnspan=2, sticky="we")
@@ -630,8 +729,7 @@ class DatasetSelection(BasePage):
     if not item:
       clearChildren()
       return
-    index = self.tvDatasets.index(item)
-    dataset = self.datasets[index]
+    dataset = self.datasetsByItem[item]
 
     if toggle:
       self.selectDataset(dataset)
@@ -673,8 +771,7 @@ class DatasetSelection(BasePage):
       selection = self.tvDatasets.selection()
       if len(selection) == 0:
         return
-      index = self.tvDatasets.index(selection[0])
-      dataset = self.datasets[index]
+      dataset = self.datasetsByItem[selection[0]]
     dataset["selected"] = not dataset["selected"]
     self.tvDatasets.item(
       dataset["tvItem"],
@@ -763,9 +860,21 @@ If this error persits, please check for a new version or contact the developer."
     value.sort(key=lambda item: str.lower(item["Name"]))
     dataset["variables"] = value
     self.datasetsLoaded[dataset["Id"]] = True
+    for var in value:
+      self.variableIndex.add(
+        (dataset["Id"], var["Name"]),
+        var["Name"],
+        var.get("CATDESC"),
+        var.get("ShortDescription"),
+        var.get("LongDescription")
+      )
 
     if all(self.datasetsLoaded.values()):
       self.bGetVariables.configure(state=tk.NORMAL, text="Get Variables")
+      self.updateSuggestions()
+      variableFilter = self.getVariableFilter()
+      for widget in self.variableSelects.values():
+        widget.setFilter(variableFilter, apply=False)
       for widget in self.variableSelects.values():
         if fromCache:
           widget.updateVariables()
@@ -785,6 +894,48 @@ If this error persits, please check for a new version or contact the developer."
           + "\n\nPlease check your internet connection and try again."
         )
 
+  def filterDatasets(self, *args):
+    """
+    Only shows the datasets matching the search text
+    """
+    matches = self.datasetIndex.search(self.tvDatasets.searchVar.get())
+    self.tvDatasets.set_children(
+      "",
+      *(dataset["tvItem"] for dataset in self.datasets if dataset["Id"] in matches)
+    )
+
+  def filterVariables(self, *args):
+    """
+    Only shows the variables matching the search text
+    """
+    variableFilter = self.getVariableFilter()
+    for widget in self.variableSelects.values():
+      widget.setFilter(variableFilter)
+
+  def getVariableFilter(self) -> Set[Tuple[str, str]]:
+    query = self.variableSearchVar.get()
+    return self.variableIndex.search(query) if query.strip() else None
+
+  def updateSuggestions(self):
+    """
+    Suggests the best matching variables of the selected datasets for each
+    variable selection
+    """
+    loaded = set(
+      (dataset["Id"], var["Name"])
+      for dataset in self.datasets
+      if dataset["selected"] and isinstance(dataset.get("variables"), list)
+      for var in dataset["variables"]
+    )
+    for key, widget in self.variableSelects.items():
+      widget.setSuggestions(
+        self.variableIndex.suggest(
+          variableSuggestionTerms.get(key, key),
+          maxVariableSuggestions,
+          among=loaded
+        )
+      )
+
   def variableChanged(self, datasetAndVariable):
     for widget in self.variableSelects.values():
       widget.updateVariable(datasetAndVariable)
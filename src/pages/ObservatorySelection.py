@@ -2,7 +2,8 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 import re
-from typing import Callable
+from queue import Queue, Empty
+from typing import Callable, Dict, List
 from astropy.time import Time, TimeDelta
 from functools import partial, reduce
 
@@ -50,6 +51,11 @@ class ObservatorySelection(BasePage):
     self.master.title("Observatory and Date Selection - IMARR")
 
     self.observatoryGroups = None
+    # responses of the single instrument types while they are loading
+    self.partialObservatoryGroups: Queue = Queue()
+    self.loadedInstrumentTypes: Dict[int, List] = {}
+    # observatory group by tree view item
+    self.observatoryGroupsByItem: Dict[str, Dict] = {}
     self.fObservatoryGroups = None
     self.fObservatories = None
     self.tvObservatoryGroups = None
@@ -88,7 +94,8 @@ class ObservatorySelection(BasePage):
   def loadObservatories(self, reload=False):
     """
     Tries to read the cached observatories, otherwise loads them from cdas
-    and schedules self.loadObservatoriesCheckDone to be run.
+    and schedules self.loadObservatoriesCheckDone to be run. The observatory
+    groups of all instrument types are loaded concurrently.
 
     Parameters
     ----------
@@ -97,6 +104,9 @@ class ObservatorySelection(BasePage):
         The default is False.
     """
     self.observatoryGroups = None
+    # a new queue so that responses of a previous load are not shown
+    partialResponses = self.partialObservatoryGroups = Queue()
+    self.loadedInstrumentTypes = {}
 
     def done(fromCache, value):
       self.observatoryGroups = value
@@ -109,6 +119,7 @@ class ObservatorySelection(BasePage):
           *self.tvObservatoryGroups.get_children()
         )
         self.tvObservatories.delete(*self.tvObservatories.get_children())
+        self.observatoryGroupsByItem = {}
         if self.btnReloadObservatories is not None:
           self.btnReloadObservatories["state"] = tk.DISABLED
 
@@ -120,18 +131,23 @@ class ObservatorySelection(BasePage):
         for it in instrumentTypes
       ],
       done,
-      onError=lambda: done(False, False),
+      onError=lambda err: done(False, False),
       beforeRequest=beforeRequest,
       processResponse=lambda x: reduce(lambda a, b: intersection(a, b), x),
-      reload=reload
+      reload=reload,
+      parallel=True,
+      onPartialResponse=lambda i, res: partialResponses.put((i, res))
     )
 
   def loadObservatoriesCheckDone(self):
     """
     Schedules itself until the download started with
-    self.loadObservatories has finished, then fills the widgets.
+    self.loadObservatories has finished, then fills the widgets. While
+    loading, it shows the observatory groups of the instrument types that
+    have already been loaded, which can't be selected yet.
     """
     if self.observatoryGroups is None:
+      self.showPartialObservatoryGroups()
       self.after(requestCheckInterval, self.loadObservatoriesCheckDone)
     else:
       if self.observatoryGroups is False:
@@ -148,21 +164,85 @@ If this error persists, please check for a new version of this program or contac
       if self.fObservatoryGroups is None:
         self.createObservatoryWidgets()
       self.btnReloadObservatories["state"] = tk.NORMAL
-      selectGroup = None
-      for obs in self.observatoryGroups:
-        if obs["Name"] == "(null)":
-          continue
-        newItem = self.tvObservatoryGroups.insert(
-          "",
-          tk.END,
-          text=obs["Name"],
-          values=(", ".join(obs["ObservatoryId"]), )
+      self.btnReloadObservatories["text"] = "Reload"
+      self.tvObservatoryGroups["selectmode"] = tk.BROWSE
+      self.updateObservatoryGroups(self.observatoryGroups)
+
+  def showPartialObservatoryGroups(self):
+    """
+    Shows the intersection of the observatory groups of all instrument types
+    that have been loaded so far. Groups shown now may not provide the types
+    that are still loading, so they can't be selected until all are loaded.
+    """
+    changed = False
+    while True:
+      try:
+        index, groups = self.partialObservatoryGroups.get_nowait()
+      except Empty:
+        break
+      self.loadedInstrumentTypes[index] = groups
+      changed = True
+    if not changed or not all(
+        isinstance(groups, list)
+        for groups in self.loadedInstrumentTypes.values()):
+      return
+
+    if self.fObservatoryGroups is None:
+      self.createObservatoryWidgets()
+    self.btnReloadObservatories["state"] = tk.DISABLED
+    self.btnReloadObservatories["text"] = (
+      "Loading remaining instrument types ({}/{})...".format(
+        len(self.loadedInstrumentTypes), len(instrumentTypes)
+      )
+    )
+    self.tvObservatoryGroups["selectmode"] = tk.NONE
+    self.updateObservatoryGroups(
+      reduce(
+        lambda a, b: intersection(a, b), self.loadedInstrumentTypes.values()
+      ),
+      selectable=False
+    )
+
+  def updateObservatoryGroups(
+    self, observatoryGroups: List[Dict], selectable: bool = True
+  ):
+    """
+    Updates the observatory groups in the tree view. Only the groups that
+    have been added or removed are inserted or deleted. The group of the
+    observatory in the state is selected if selectable.
+    """
+    items = {
+      group["Name"]: item
+      for item, group in self.observatoryGroupsByItem.items()
+    }
+    groups = [obs for obs in observatoryGroups if obs["Name"] != "(null)"]
+    names = set(obs["Name"] for obs in groups)
+    for name, item in items.items():
+      if name not in names:
+        self.tvObservatoryGroups.delete(item)
+        self.observatoryGroupsByItem.pop(item)
+
+    selectGroup = None
+    children = []
+    for obs in groups:
+      values = (", ".join(obs["ObservatoryId"]), )
+      item = items.get(obs["Name"])
+      if item is None:
+        item = self.tvObservatoryGroups.insert(
+          "", tk.END, text=obs["Name"], values=values
         )
-        if self.state.observatory in obs["ObservatoryId"]:
-          selectGroup = newItem
-      if selectGroup:
-        self.tvObservatoryGroups.selection("set", selectGroup)
-        self.tvObservatoryGroups.see(selectGroup)
+      else:
+        self.tvObservatoryGroups.item(item, values=values)
+      self.observatoryGroupsByItem[item] = obs
+      children.append(item)
+      if self.state.observatory in obs["ObservatoryId"]:
+        selectGroup = item
+    self.tvObservatoryGroups.set_children("", *children)
+
+    if (selectable and selectGroup
+        and not self.tvObservatoryGroups.selection()):
+      self.tvObservatoryGroups.selection("set", selectGroup)
+      self.tvObservatoryGroups.see(selectGroup)
 
   def createObservatoryWidgets(self):
     """
@@ -411,12 +491,13 @@ If this error persists, please check for a new version of this program or contac
     Event handler when an observatory group was selected to fill the second
     TreeView with the observatories from the selected group.
     """
-    index = self.tvObservatoryGroups.index(
-      self.tvObservatoryGroups.selection()[0]
-    )
+    selection = self.tvObservatoryGroups.selection()
+    if len(selection) == 0:
+      return
+    group = self.observatoryGroupsByItem[selection[0]]
     self.tvObservatories.delete(*self.tvObservatories.get_children())
     selectItem = None
-    for id in self.observatoryGroups[index]["ObservatoryId"]:
+    for id in group["ObservatoryId"]:
       newItem = self.tvObservatories.insert("", tk.END, text=id)
       if self.state.observatory == id:
         selectItem = newItem
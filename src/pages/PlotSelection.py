@@ -1,36 +1,67 @@
-from matplotlib.lines import Line2D
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 from astropy.time import Time
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
-from matplotlib.ticker import AutoMinorLocator
-from matplotlib.dates import DateFormatter
+from matplotlib.dates import date2num, num2date
 from matplotlib.backend_bases import MouseEvent
-from matplotlib.axes import Axes
 import numpy as np
 from typing import Callable, Dict, Tuple, Union, List
 from functools import partial
-import cdflib
+from queue import Queue, Empty
+from threading import Thread
 
 from src.pages.BasePage import BasePage
 from src.utils.ScrollableFrame import ScrollableFrame
-from src.utils.MatplotlibTkinterIntegration import createPlot
+from src.utils.MatplotlibTkinterIntegration import createPlot, detachPlot
 from src.utils.cache import Cache
-from src.utils.constants import (padding, requiredVariables, optionalVariables)
-from src.utils.utils import (
-  TimeRange2USDateStr, ensureOnScreen, isMacOS, setFillValuesToNan
+from src.utils import FigureCache
+from src.utils.constants import (
+  padding,
+  requestCheckInterval,
+  cursorUpdateInterval,
+  scanDefaultStride,
+  scanDefaultWindow,
+  scanMaxCandidates,
+  statisticsDefaultWindow
+)
+from src.utils.fluxRopeScan import ScanResult, scanState
+from src.utils.utils import ensureOnScreen, isMacOS
+from src.utils.PlotFigureBuilder import (
+  PlotFigure,
+  buildPlotFigure,
+  getPlottedVars,
+  isoDateFormatter,
+  loadYaxisLabels,
+  pathYaxisLabels
 )
 from src.utils.PlotRangeSelection import PlotRangeSelection
 from src.utils.State import State, StateSelectedVar
+from src.utils.TimeSeriesPyramid import getPyramid
+
+
+def nearestIndex(x: np.ndarray, value: float) -> Union[int, None]:
+  """
+  Returns the index of the value in the sorted array x that is closest to
+  value or None if value is outside of x
+  """
+  if len(x) == 0 or value < x[0] or value > x[-1]:
+    return None
+  i = int(np.searchsorted(x, value))
+  if i > 0 and value - x[i - 1] < x[i] - value:
+    return i - 1
+  return i
 
-pathYaxisLabels = "src/assets/possibleYaxisLabels.txt"
-isoDateFormatter = DateFormatter("%Y-%m-%d %H:%M:%S.%f")
+
+def time2num(time: Time) -> Union[float, None]:
+  """Converts a Time to a matplotlib date number"""
+  return float(date2num(time.datetime64)) if time is not None else None
 
 
 class PlotSelection(BasePage):
   disableSaveHotkey = True
+  # window of the rolling statistics panels in hours, None hides them. Kept
+  # for the next visits of the page
+  statisticsWindow: float = None
 
   def __init__(
     self,
@@ -44,17 +75,29 @@ class PlotSelection(BasePage):
     self.state = state
     self.possibleYaxisLabels: List[str] = []
 
+    # the selection as matplotlib date numbers, converted to Time in buildState
     self.selection = {
-      "start": self.state.selectionStart, "end": self.state.selectionEnd
+      "start": time2num(self.state.selectionStart),
+      "end": time2num(self.state.selectionEnd)
     }
-    self.selectionHistory: List[Dict[str, Time]] = []
+    self.selectionHistory: List[Dict[str, float]] = []
     self.selectionHistoryIndex = -1
+    # mouse position in the plot, shown by updateValueLabels
+    self.cursorXData: float = None
+    self.cursorUpdatePending: str = None
+    # set once the plot is built, see showPlot
+    self.xDataTime: Time = None
+    self.xDataTimeNum: np.ndarray = None
+    # artists of the flux rope scan, removed before the next scan
+    self.scanArtists: List = []
+    self.scanCanceled = False
 
     master.title("Plot - Specific Time Range Selection - IMARR")
 
     self.createStatusLabel()
     self.pack(fill="both")
     self.bind("<Visibility>", self.loaded)
+    self.bind("<Destroy>", self.onDestroy)
 
   def loaded(self, event):
     """
@@ -66,11 +109,7 @@ class PlotSelection(BasePage):
     if len(self.possibleYaxisLabels) == 0:
       self.possibleYaxisLabels = self.loadYaxisKeys()
 
-    vars: List[StateSelectedVar] = []
-    for variableGroups in [requiredVariables, optionalVariables]:
-      for variableGroup in variableGroups:
-        if self.state.selectedVars[variableGroup]:
-          vars.extend(self.state.selectedVars[variableGroup])
+    vars = getPlottedVars(self.state)
     self.checkYaxisLabel(vars)
 
   def checkYaxisLabel(self, vars: List[StateSelectedVar]):
@@ -160,263 +199,74 @@ class PlotSelection(BasePage):
   def plotData(self):
     self.update_idletasks()
 
-    # inches
-    axHeight = 1
-    titleHeight = 0.55
-    xLabelHeight = 0.7
-
-    # plot data
-    vars: List[StateSelectedVar] = []
-    for variableGroups in [requiredVariables, optionalVariables]:
-      for variableGroup in variableGroups:
-        if self.state.selectedVars[variableGroup]:
-          vars.extend(self.state.selectedVars[variableGroup])
-
-    datasetOrder = []
-    # height in inches
-    figureSubplotHeight = []
-    for var in vars:
-      if var.dataset not in datasetOrder:
-        datasetOrder.append(var.dataset)
-        figureSubplotHeight.append(0)
-      # add single axis height to last entry
-      figureSubplotHeight[-1] += axHeight
-
-    figureTotalSubplotHeight = sum(figureSubplotHeight)
-    figureAverageSubplotHeight = (
-      figureTotalSubplotHeight / len(figureSubplotHeight)
-    )
-    figureTotalHeight = (
-      figureTotalSubplotHeight + len(figureSubplotHeight) *
-      (titleHeight + xLabelHeight)
-    )
-
-    fig = plt.figure(figsize=(6.4, figureTotalHeight))
-    parentGrid = GridSpec(
-      len(datasetOrder),
-      1,
-      fig,
-      top=1 - (titleHeight / figureTotalHeight),
-      right=0.97,
-      bottom=xLabelHeight / figureTotalHeight,
-      left=0.15,
-      hspace=(titleHeight + xLabelHeight) / figureAverageSubplotHeight,
-      height_ratios=[i / figureTotalSubplotHeight for i in figureSubplotHeight]
-    )
-    firstAx = None
-    self.allPlotAxes: List[Axes] = []
-    allPlotLines: List[List[Line2D]] = []
-    totalXmin = None
-    totalXmax = None
-    self.xDataTime: Time = None
+    vars = getPlottedVars(self.state)
 
-    for i, dataset in enumerate(datasetOrder):
-      varsToPlot = [var for var in vars if var.dataset == dataset]
-      childGridItem = parentGrid[i].subgridspec(len(varsToPlot), 1, hspace=0)
-      axs = None
-      if firstAx is None:
-        axs = childGridItem.subplots(sharex=True)
-        firstAx = axs[0]
-      else:
-        axs = [
-          childGridItem.figure.add_subplot(childGridItem[i, 0], sharex=firstAx)
-          for i in range(len(varsToPlot))
-        ]
-      lastIndex = len(varsToPlot) - 1
-      if not isinstance(axs, (list, np.ndarray)):
-        axs = [axs]
-
-      self.allPlotAxes.extend(axs)
-
-      # set dataset title
-      title = next((d.label for d in self.state.datasets if d.id == dataset),
-                   "Unknown dataset")
-      axs[0].set_title(
-        title,
-        fontdict={
-          "fontsize":
-            "large" if len(title) <= 100 else
-            ("normal" if len(title) <= 150 else "small")
-        },
-        wrap=True
-      )
-
-      cdf = self.state.datasetCDFInstances[dataset]
-      cdfInfo = cdf.cdf_info()
-      firstVar = next((
-        i.variable for i in varsToPlot if i.variable in cdfInfo["rVariables"]
-        or i.variable in cdfInfo["zVariables"]
-      ),
-                      None)
-      firstAttsDepend0 = (
-        cdf.varattsget(firstVar)["DEPEND_0"] if firstVar is not None else None
-      )
-      xData = cdflib.cdfastropy.convert_to_astropy(
-        cdf.varget(firstAttsDepend0 or "epoch")
-      )
-      if self.xDataTime is None:
-        self.xDataTime = xData
-      totalXmin = (
-        xData[0].datetime
-        if totalXmin is None else min(totalXmin, xData[0].datetime)
-      )
-      totalXmax = (
-        xData[-1].datetime
-        if totalXmax is None else max(totalXmax, xData[-1].datetime)
+    # show the figure of the last visit again if nothing has changed
+    statisticsWindow = None
+    if PlotSelection.statisticsWindow is not None:
+      statisticsWindow = np.timedelta64(
+        int(PlotSelection.statisticsWindow * 3600e9), "ns"
       )
+    cacheKey = FigureCache.getKey(
+      self.state, self.possibleYaxisLabels, statisticsWindow
+    )
+    plotFigure = FigureCache.get(cacheKey)
+    if plotFigure is not None:
+      self.showPlot(vars, plotFigure)
+      return
 
-      axs[-1].set_xlabel(
-        "Time (UTC, {})".format(
-          TimeRange2USDateStr(xData[0].datetime, xData[-1].datetime)
+    # reading the data and building the figure takes long for large
+    # datasets, so it is done in a new thread to keep the window responsive
+    progress = Queue()
+
+    def build():
+      try:
+        plotFigure = buildPlotFigure(
+          self.state,
+          vars,
+          self.possibleYaxisLabels,
+          onProgress=lambda text: progress.put(("progress", text)),
+          statisticsWindow=statisticsWindow
         )
-      )
-
-      for i2, (var, ax) in enumerate(zip(varsToPlot, axs)):
-        if (var.variable in cdfInfo["zVariables"]
-            or var.variable in cdfInfo["rVariables"]):
-          yData = cdf.varget(var.variable)
-          yAttrs = cdf.varattsget(var.variable)
-          isVector = len(yData.shape) > 1 and yData.shape[1] > 1
-          setFillValuesToNan(yData, yAttrs)
-          if isVector:
-            fmts = ["-r", "--g", ":b"]
-            labels = ["X", "Y", "Z"]
-            lines = []
-            for dim in range(yData.shape[1]):
-              lines.extend(
-                ax.plot(
-                  xData.datetime,
-                  yData[:, dim],
-                  fmts[dim],
-                  linewidth=1,
-                  label=labels[dim]
-                )
-              )
-            allPlotLines.append(lines)
-            ax.legend(loc="upper right")
-          else:
-            allPlotLines.append(
-              ax.plot(xData.datetime, yData, "-k", linewidth=1)
-            )
-          # yapf: disable
-          ax.set_ylabel(
-            next(
-              (yAttrs[key] for key in self.possibleYaxisLabels if key in yAttrs),
-              "Label not found"
-            )
-            + (
-              " [{}]".format(yAttrs["UNITS"])
-              if "UNITS" in yAttrs and str(yAttrs["UNITS"]).lower() != "na"
-              else ""
-            ),
-            wrap=True
-          )
-          # yapf: enable
-
-          # plot horizontal line at y=axlineY only when data crosses it
-          # at y=1 for plasma beta, else at y=0
-          axlineY = (1 if var in self.state.selectedVars.Plasma_Beta else 0)
-          if np.nanmin(yData) < axlineY and np.nanmax(yData) > axlineY:
-            ax.axhline(y=axlineY, linewidth=1, color="k")
-          if axlineY == 1:
-            ax.set_yscale("log")
-        else:
-          # variable not in data
-          ax.text(
-            0.5,
-            0.5,
-            "Variable '{}' was not found in the data".format(var.variable),
-            verticalalignment='center',
-            horizontalalignment='center',
-            transform=ax.transAxes,
-            wrap=True
-          )
-          allPlotLines.append([])
-
-        ax.fmt_xdata = isoDateFormatter
-        # axes customisation
-        majorLoc = ax.xaxis.get_major_locator()
-        ticks: List[float] = majorLoc()
-        diff = ticks[1] - ticks[0]
-        possibleIntervals = [
-          1 / 24 / 60,    # 1 min
-          1 / 24 / 12,    # 5 min
-          1 / 24 / 6,    # 10 min
-          1 / 24 / 4,    # 15 min
-          1 / 24 / 2,    # 30 min
-          1 / 24,    # 1 h
-          1 / 12,    # 2 h
-          1 / 8,    # 3 h
-          1 / 4,    # 6 h
-          1 / 2,    # 12 h
-          1,    # 1 d
-          2,
-          5,
-          10
-        ]
-        multiple = 5
-        for i in possibleIntervals:
-          m = diff // i
-          if m in [2, 4, 5, 6]:
-            multiple = m
-            break
-        ax.xaxis.set_minor_locator(AutoMinorLocator(multiple))
-        ax.xaxis.set_major_formatter(DateFormatter("%d\n%H%M"))
-        if ax.get_yscale() == "linear":
-          ax.yaxis.set_minor_locator(AutoMinorLocator(5))
-        if i2 == 0 and i2 == lastIndex:
-          ax.tick_params(
-            axis="x",
-            which="major",
-            direction="inout",
-            length=10,
-            bottom=True,
-            labelbottom=True
-          )
-          ax.tick_params(
-            axis="x", which="major", direction="in", length=5, top=True
-          )
-          ax.tick_params(
-            axis="x", which="minor", direction="inout", length=5, bottom=True
-          )
-          ax.tick_params(
-            axis="x", which="minor", direction="in", length=2.5, top=True
-          )
+        progress.put(("done", plotFigure))
+      except Exception as e:
+        print("Could not plot the data:", e)
+        progress.put(("error", e))
+
+    def checkBuilt():
+      if not self.winfo_exists():
+        # the page was left in the meantime
+        return
+      while True:
+        try:
+          kind, value = progress.get_nowait()
+        except Empty:
+          break
+        if kind == "progress":
+          self.lbStatus["text"] = value
+        elif kind == "done":
+          FigureCache.put(cacheKey, value)
+          self.showPlot(vars, value)
+          return
         else:
-          ax.tick_params(
-            axis="x",
-            which="major",
-            direction="inout" if i2 == lastIndex else "in",
-            length=10 if i2 == lastIndex else 5,
-            bottom=True,
-            top=True,
-            labelbottom=i2 == lastIndex
-          )
-          ax.tick_params(
-            axis="x",
-            which="minor",
-            direction="inout" if i2 == lastIndex else "in",
-            length=5 if i2 == lastIndex else 2.5,
-            bottom=True,
-            top=True
-          )
-        ax.tick_params(
-          axis="y",
-          which="major",
-          direction="out",
-          length=10,
-          left=True,
-          right=False,
-          labelleft=True,
-        )
-        ax.tick_params(
-          axis="y",
-          which="minor",
-          direction="out",
-          length=5,
-          left=True,
-          right=False
-        )
+          self.lbStatus["text"] = "Could not plot the data: {}".format(value)
+          return
+      self.after(requestCheckInterval, checkBuilt)
+
+    self.lbStatus["text"] = "Loading..."
+    Thread(target=build, daemon=True).start()
+    self.after(requestCheckInterval, checkBuilt)
+
+  def showPlot(self, vars: List[StateSelectedVar], plotFigure: PlotFigure):
+    """Attaches the built figure to the window and creates the controls"""
+    fig = plotFigure.fig
+    self.allPlotAxes = plotFigure.allPlotAxes
+    self.plotDecimation = plotFigure.plotDecimation
+    self.xDataTime = plotFigure.xDataTime
+    self.xDataTimeNum = plotFigure.xDataTimeNum
+    self.xDataNum = plotFigure.xDataNum
+    allPlotValues = plotFigure.allPlotValues
+    totalXmin, totalXmax = plotFigure.bounds
 
     # display the plot & controls
 
@@ -426,6 +276,10 @@ class PlotSelection(BasePage):
     self.scrollableFrame = ScrollableFrame(self.plotFrame, ttk.Frame)
     self.canvasFrame = self.scrollableFrame.innerFrame
 
+    # only the panels in the visible part of the scrollable frame are drawn
+    fig.visibleArea = lambda: self.scrollableFrame.getVisibleFraction(
+      fig.canvas.get_tk_widget()
+    )
     (self.plotCanvas, self.plotToolbar) = createPlot(
       self.plotFrame, fig, canvasMaster=self.canvasFrame
     )
@@ -436,9 +290,16 @@ class PlotSelection(BasePage):
     )
 
     self.plotRangeSelection = PlotRangeSelection(
-      self.allPlotAxes, self.plotCanvas, (totalXmin, totalXmax)
+      self.allPlotAxes,
+      self.plotCanvas, (totalXmin, totalXmax),
+      visibleArea=partial(
+        self.scrollableFrame.getVisibleFraction,
+        self.plotCanvas.get_tk_widget()
+      )
     )
     self.plotRangeSelection.onSelection.append(self.onSelection)
+    self.scrollableFrame.onScroll.append(self.drawScrolledPanels)
+    self.scrollableFrame.onScroll.append(self.plotRangeSelection.updateFigure)
 
     self.checkMPLToolbarMode()
 
@@ -493,7 +354,7 @@ class PlotSelection(BasePage):
       label.grid(column=1, row=i + 1, padx=padding, pady=padding, sticky="w")
       lbValue = ttk.Label(self.fValueDisplay, text="")
       lbValue.grid(column=2, row=i + 1, pady=padding, sticky="w")
-      lbValue.lines = allPlotLines[i]
+      lbValue.values = allPlotValues[i]
       self.lbValues[(var.dataset, var.variable)] = lbValue
     self.plotCanvas.mpl_connect("motion_notify_event", self.onMouseMove)
 
@@ -518,6 +379,8 @@ class PlotSelection(BasePage):
     self.btnSelectionUndo.pack(side="left", fill="x", expand=True)
     self.btnSelectionRedo.pack(side="left", fill="x", expand=True)
     self.fValueDisplay.grid(column=1, row=6, columnspan=2, sticky="we")
+    self.createScanControls()
+    self.createStatisticsControls()
 
     # self.pack_forget()
     self.bContinue.pack(side="left", fill="x", expand=True, pady=padding)
@@ -527,7 +390,7 @@ class PlotSelection(BasePage):
     self.scrollableFrame.grid(column=1, row=2)
     self.plotCanvas.get_tk_widget().grid(column=1, row=1)
 
-    if self.selection["start"] or self.selection["end"]:
+    if self.selection["start"] is not None or self.selection["end"] is not None:
       self.plotRangeSelection.setSelection(
         self.selection["start"], self.selection["end"]
       )
@@ -535,6 +398,268 @@ class PlotSelection(BasePage):
 
     self.registerHistoryHotkeys()
     ensureOnScreen(self.master)
+    self.buildPyramids(plotFigure)
+
+  def createScanControls(self):
+    """
+    Creates the controls of the flux rope scan, which fits windows over the
+    whole plotted interval and lists the best ones
+    """
+    self.fScan = ttk.LabelFrame(self.contentFrame, text="Flux rope scan")
+    self.fScan.grid(
+      column=1, row=7, columnspan=2, padx=padding, pady=padding, sticky="we"
+    )
+    label = ttk.Label(self.fScan, text="Window [hours]:")
+    label.grid(column=1, row=1, padx=padding, sticky="w")
+    self.scanWindowVar = tk.StringVar(self, f"{scanDefaultWindow:g}")
+    entry = ttk.Entry(self.fScan, width=8, textvariable=self.scanWindowVar)
+    entry.grid(column=2, row=1, padx=padding, sticky="w")
+    label = ttk.Label(self.fScan, text="Stride [minutes]:")
+    label.grid(column=1, row=2, padx=padding, sticky="w")
+    self.scanStrideVar = tk.StringVar(self, f"{scanDefaultStride:g}")
+    entry = ttk.Entry(self.fScan, width=8, textvariable=self.scanStrideVar)
+    entry.grid(column=2, row=2, padx=padding, sticky="w")
+    self.btnScan = ttk.Button(self.fScan, text="Scan", command=self.scan)
+    self.btnScan.grid(column=3, row=1, rowspan=2, padx=padding, sticky="ns")
+    self.lbScanStatus = ttk.Label(self.fScan, text="")
+    self.lbScanStatus.grid(
+      column=1, row=3, columnspan=3, padx=padding, sticky="w"
+    )
+
+    self.scanTreeview = ttk.Treeview(
+      self.fScan,
+      columns=("start", "hours", "misfit", "B0"),
+      show="headings",
+      height=scanMaxCandidates,
+      selectmode="browse"
+    )
+    for column, text, width in [
+      ("start", "Start", 150), ("hours", "Hours", 50),
+      ("misfit", "Misfit", 60), ("B0", "B0 [nT]", 60)
+    ]:
+      self.scanTreeview.heading(column, text=text)
+      self.scanTreeview.column(column, width=width, stretch=False)
+    self.scanTreeview.bind("<<TreeviewSelect>>", self.onScanCandidateSelected)
+    self.scanCandidates: Dict[str, Tuple[float, float]] = {}
+
+  def createStatisticsControls(self):
+    fStatistics = ttk.Frame(self.contentFrame)
+    fStatistics.grid(column=1, row=8, columnspan=2, padx=padding, sticky="we")
+    self.statisticsVar = tk.IntVar(
+      self, int(PlotSelection.statisticsWindow is not None)
+    )
+    checkbutton = ttk.Checkbutton(
+      fStatistics,
+      text="Show rolling statistics over",
+      variable=self.statisticsVar,
+      command=self.updateStatistics
+    )
+    checkbutton.grid(column=1, row=1, sticky="w")
+    self.statisticsWindowVar = tk.StringVar(
+      self, f"{PlotSelection.statisticsWindow or statisticsDefaultWindow:g}"
+    )
+    entry = ttk.Entry(
+      fStatistics, width=6, textvariable=self.statisticsWindowVar
+    )
+    entry.grid(column=2, row=1, padx=padding)
+    entry.bind("<Return>", self.updateStatistics)
+    label = ttk.Label(fStatistics, text="hours")
+    label.grid(column=3, row=1, sticky="w")
+
+  def updateStatistics(self, event=None):
+    """Shows the page again with or without the statistics panels"""
+    window = None
+    if self.statisticsVar.get() == 1:
+      try:
+        window = float(self.statisticsWindowVar.get())
+        if window <= 0:
+          raise ValueError()
+      except ValueError:
+        messagebox.showerror(
+          "Invalid window", "The window has to be a positive number of hours"
+        )
+        return
+    if window == PlotSelection.statisticsWindow:
+      return
+    PlotSelection.statisticsWindow = window
+    self.goDirection("PlotSelection")
+
+  def scan(self):
+    try:
+      window = float(self.scanWindowVar.get())
+      stride = float(self.scanStrideVar.get())
+      if window <= 0 or stride <= 0:
+        raise ValueError()
+    except ValueError:
+      messagebox.showerror(
+        "Invalid scan", "The window and stride have to be positive numbers"
+      )
+      return
+
+    progress = Queue()
+
+    def run():
+      try:
+        result = scanState(
+          self.state,
+          np.timedelta64(int(window * 3600e9), "ns"),
+          np.timedelta64(int(stride * 60e9), "ns"),
+          onProgress=lambda value: progress.put(("progress", value)),
+          isCanceled=lambda: self.scanCanceled
+        )
+        progress.put(("done", result))
+      except ImportError:
+        progress.put(("error", "Missing python package scipy"))
+      except Exception as e:
+        print("Could not scan the data:", e)
+        progress.put(("error", e))
+
+    def checkScanned():
+      if self.scanCanceled or not self.winfo_exists():
+        return
+      while True:
+        try:
+          kind, value = progress.get_nowait()
+        except Empty:
+          break
+        if kind == "progress":
+          self.lbScanStatus["text"] = f"Scanning... {value:.0%}"
+        else:
+          self.btnScan["state"] = tk.NORMAL
+          if kind == "done":
+            self.showScanResult(value)
+          else:
+            self.lbScanStatus["text"] = f"Could not scan the data: {value}"
+          return
+      self.after(requestCheckInterval, checkScanned)
+
+    self.btnScan["state"] = tk.DISABLED
+    self.lbScanStatus["text"] = "Scanning..."
+    Thread(target=run, daemon=True).start()
+    self.after(requestCheckInterval, checkScanned)
+
+  def showScanResult(self, result: ScanResult):
+    """
+    Lists the candidates, shades them in all panels and draws the misfit of
+    all windows over the magnetic field
+    """
+    self.removeScanOverlay()
+    self.scanTreeview.delete(*self.scanTreeview.get_children())
+    self.scanCandidates = {}
+    if len(result.candidates) == 0:
+      self.lbScanStatus["text"] = "No window with enough data found"
+      return
+    self.lbScanStatus["text"] = (
+      f"{len(result.misfit)} windows fitted, best first. Select a candidate "
+      "to select it in the plot"
+    )
+    self.scanTreeview.grid(column=1, row=4, columnspan=3, padx=padding)
+
+    hours = (result.end - result.start) / np.timedelta64(1, "h")
+    for i in result.candidates:
+      start = float(date2num(result.start[i]))
+      end = float(date2num(result.end[i]))
+      item = self.scanTreeview.insert(
+        "",
+        "end",
+        values=(
+          isoDateFormatter.format_data(start)[:-7],
+          f"{hours[i]:g}",
+          f"{result.misfit[i]:.3f}",
+          f"{result.B0[i]:.1f}"
+        )
+      )
+      self.scanCandidates[item] = (start, end)
+      for ax in self.allPlotAxes:
+        self.scanArtists.append(
+          ax.axvspan(start, end, color="g", alpha=0.15, lw=0, zorder=0)
+        )
+
+    # the misfit at the center of each window
+    misfitAx = self.allPlotAxes[0].twinx()
+    center = result.start + (result.end - result.start) // 2
+    misfitAx.plot(date2num(center), result.misfit, color="0.5", lw=1)
+    misfitAx.set_ylim(0, 1)
+    # the figure has no margin on the right for the ticks
+    misfitAx.set_yticks([])
+    misfitAx.text(
+      0.01,
+      0.95,
+      "Scan misfit (0 to 1)",
+      transform=misfitAx.transAxes,
+      va="top",
+      color="0.5",
+      fontsize="small"
+    )
+    self.scanArtists.append(misfitAx)
+    self.plotCanvas.draw_idle()
+
+  def removeScanOverlay(self):
+    for artist in self.scanArtists:
+      artist.remove()
+    self.scanArtists = []
+
+  def onScanCandidateSelected(self, event=None):
+    item = next(iter(self.scanTreeview.selection()), None)
+    if item not in self.scanCandidates:
+      return
+    start, end = self.scanCandidates[item]
+    self.onSelection(start, end, False)
+
+  def buildPyramids(self, plotFigure: PlotFigure):
+    """
+    Loads or builds the pyramids of all plotted variables in a new thread and
+    hands them to the decimation once they are ready
+    """
+    jobs = plotFigure.pyramidJobs
+    if len(jobs) == 0:
+      # already done on a previous visit
+      return
+    pyramids = Queue()
+
+    def build():
+      for cdfPath, variable, x, y, lines in jobs:
+        try:
+          pyramids.put((getPyramid(cdfPath, variable, x, y), lines))
+        except Exception as e:
+          print(
+            "Could not build the pyramid of variable {}: {}".format(
+              variable, e
+            )
+          )
+      pyramids.put(None)
+
+    def checkBuilt():
+      while True:
+        try:
+          res = pyramids.get_nowait()
+        except Empty:
+          break
+        if res is None:
+          plotFigure.pyramidJobs = []
+          return
+        pyramid, lines = res
+        if pyramid is not None:
+          for component, line in enumerate(lines):
+            self.plotDecimation.setPyramid(line, pyramid, component)
+      self.after(requestCheckInterval, checkBuilt)
+
+    Thread(target=build, daemon=True).start()
+    self.after(requestCheckInterval, checkBuilt)
+
+  def drawScrolledPanels(self):
+    if self.plotCanvas.figure.needsDraw():
+      self.plotCanvas.draw_idle()
+
+  def onDestroy(self, event: tk.Event):
+    if event.widget is not self or not hasattr(self, "plotRangeSelection"):
+      return
+    self.scanCanceled = True
+    self.removeScanOverlay()
+    # the figure may be cached and shown again on a new canvas
+    self.plotRangeSelection.destroy()
+    detachPlot(self.plotCanvas)
+    self.plotCanvas.figure.visibleArea = None
 
   def checkMPLToolbarMode(self):
     """Checks every 50 ms if the mode of the toolbar has changed to
@@ -561,36 +686,35 @@ class PlotSelection(BasePage):
   def onMouseMove(self, event: MouseEvent):
     if event.xdata is None:
       return
-    xValue = np.nan
-    time = None
+    # the labels show only the latest position and are updated at most once
+    # per frame
+    self.cursorXData = event.xdata
+    if self.cursorUpdatePending is None:
+      self.cursorUpdatePending = self.after(
+        cursorUpdateInterval, self.updateValueLabels
+      )
+
+  def updateValueLabels(self):
+    """Shows the values of the samples closest to the cursor"""
+    self.cursorUpdatePending = None
+    xValue = None
+    indices: Dict[str, int] = {}
     for vars in self.state.selectedVars.values():
       for var in vars:
         label = self.lbValues[(var.dataset, var.variable)]
-        xyData = [line.get_xydata() for line in label.lines]
-        selector = [np.nonzero(data[:, 0] == event.xdata)[0] for data in xyData]
-        if any(len(i) == 0 and any(data[:, 0] < event.xdata) for i,
-               data in zip(selector, xyData)):
-          lastLess = [
-            np.nonzero(data[:, 0] < event.xdata)[0][-1] for data in xyData
-          ]
-          if any(i + 1 < data.shape[0] for i, data in zip(lastLess, xyData)):
-            selector = [(
-              less if abs(data[less, 0] - event.xdata) <
-              abs(data[less + 1, 0] - event.xdata) else less + 1
-            ) for (data, less) in zip(xyData, lastLess)]
-          else:
-            selector = [[] for i in lastLess]
-        yData = [
-          str(data[i, 1]).replace("[]", "") for data,
-          i in zip(xyData, selector)
-        ]
-        x = next((data[i, 0] for data, i in zip(xyData, selector)), None)
-        if np.isscalar(x) and not np.isnan(x):
-          xValue = x
-        label["text"] = "\n".join(yData)
-    if not np.isnan(xValue):
-      time = isoDateFormatter.format_data(xValue)
-    self.lbValues["x"]["text"] = time if time is not None else ""
+        xData = self.xDataNum[var.dataset]
+        if var.dataset not in indices:
+          indices[var.dataset] = nearestIndex(xData, self.cursorXData)
+        index = indices[var.dataset]
+        text = ""
+        if index is not None and len(label.values) > 0:
+          text = "\n".join(str(values[index]) for values in label.values)
+          xValue = xData[index]
+        if label["text"] != text:
+          label["text"] = text
+    self.lbValues["x"]["text"] = (
+      isoDateFormatter.format_data(xValue) if xValue is not None else ""
+    )
 
   def toggleRangeSelection(self):
     if self.btnToggleRangeSelectionLock.var.get() == 1:
@@ -598,29 +722,19 @@ class PlotSelection(BasePage):
     else:
       self.plotRangeSelection.unlock()
 
-  def onSelection(self, start, end, dragging):
-    def snap(time: Time):
-      if time is None:
+  def onSelection(self, start: float, end: float, dragging: bool):
+    def snap(value: float):
+      if value is None:
         return None
-      if time < self.xDataTime.min():
-        return self.xDataTime.min()
-      if time > self.xDataTime.max():
-        return self.xDataTime.max()
-      lastLess = np.nonzero(self.xDataTime < time)[0][-1]
-      if lastLess + 1 == len(self.xDataTime):
-        return self.xDataTime[lastLess]
-      t1 = self.xDataTime[lastLess]
-      t2 = self.xDataTime[lastLess + 1]
-      return t1 if time - t1 < t2 - time else t2
+      x = self.xDataTimeNum
+      if value <= x[0]:
+        return float(x[0])
+      if value >= x[-1]:
+        return float(x[-1])
+      return float(x[nearestIndex(x, value)])
 
     start = snap(start)
-    if start:
-      start = start.copy()
-      start.format = "iso"
     end = snap(end)
-    if end:
-      end = end.copy()
-      end.format = "iso"
 
     self.updateSelectionLabels(start, end)
     if not dragging:
@@ -628,18 +742,23 @@ class PlotSelection(BasePage):
       self.appendToSelectionHistory()
     self.updateHistoryButtons()
     self.bContinue["state"] = (
-      tk.NORMAL
-      if self.selection["start"] and self.selection["end"] else tk.DISABLED
+      tk.NORMAL if self.selection["start"] is not None
+      and self.selection["end"] is not None else tk.DISABLED
     )
 
-  def updateSelectionLabels(self, start, end):
+  def updateSelectionLabels(self, start: float, end: float):
+    def format(value: float):
+      if value is None:
+        return ""
+      return num2date(value).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
     self.btnToggleRangeSelectionLock["state"] = (
-      tk.NORMAL if start and end else tk.DISABLED
+      tk.NORMAL if start is not None and end is not None else tk.DISABLED
     )
     self.selection["start"] = start
     self.selection["end"] = end
-    self.lbSelectionStartValue["text"] = str(start) if start is not None else ""
-    self.lbSelectionEndValue["text"] = str(end) if end is not None else ""
+    self.lbSelectionStartValue["text"] = format(start)
+    self.lbSelectionEndValue["text"] = format(end)
 
   def appendToSelectionHistory(self):
     if self.selectionHistoryIndex < len(self.selectionHistory) - 1:
@@ -710,13 +829,29 @@ class PlotSelection(BasePage):
 
   def buildState(self):
     state = self.state.copy()
-    state.selectionStart = self.selection["start"]
-    state.selectionEnd = self.selection["end"]
+    state.selectionStart = self.num2time(self.selection["start"])
+    state.selectionEnd = self.num2time(self.selection["end"])
     return state
 
+  def num2time(self, value: float) -> Union[Time, None]:
+    """
+    Converts a selected matplotlib date number back to a Time. The selection
+    is snapped to the samples, so the exact time of the sample is used.
+    """
+    if value is None:
+      return None
+    time = None
+    if self.xDataTimeNum is not None:
+      i = int(np.searchsorted(self.xDataTimeNum, value))
+      if i < len(self.xDataTimeNum) and self.xDataTimeNum[i] == value:
+        time = self.xDataTime[i].copy()
+    if time is None:
+      time = Time(num2date(value))
+    time.format = "iso"
+    return time
+
   def loadYaxisKeys(self):
-    with open(pathYaxisLabels, "r") as file:
-      return [line.strip() for line in file]
+    return loadYaxisLabels()
 
   def saveYaxisKeys(self):
     with open(pathYaxisLabels, "w") as file:
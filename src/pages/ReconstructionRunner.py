@@ -1,7 +1,7 @@
 from functools import partial
 import tkinter as tk
 import tkinter.ttk as ttk
-from typing import Callable, List, Tuple, Type, Union
+from typing import Any, Callable, List, Tuple, Type, Union
 from threading import Thread
 
 from src.pages.BasePage import BasePage
@@ -10,6 +10,7 @@ from src.models.dummy import Model
 from src.utils.State import State
 from src.utils.constants import (padding)
 from src.utils.ReactiveVariable import ReactiveVariable
+from src.utils.warmStart import canWarmStart
 
 runningModels: List["RunningModel"] = []
 reconstructionRunnerVisible = {"value": False}
@@ -25,6 +26,11 @@ class RunningModel:
   ranOnce = False
   error: str = None
   thread: Thread = None
+  # state of the running and of the last successful run with its result,
+  # passed to models that can start from it
+  runState: State = None
+  lastState: State = None
+  lastResult: Any = None
 
   frame: ttk.Labelframe = None
   startCancelButton: ttk.Button = None
@@ -57,10 +63,16 @@ class RunningModel:
     self.finished.set(False)
     self.running.set(True)
     self.statusLabel["text"] = "Starting..."
+    self.runState = state.copy()
+    if hasattr(self.instance, "setPreviousResult"):
+      self.instance.setPreviousResult(
+        self.lastResult if self.lastState is not None
+        and canWarmStart(self.lastState, self.runState) else None
+      )
     self.thread = Thread(
       target=self.instance.run,
       args=(
-        state.copy(),
+        self.runState.copy(),
         partial(self.onStatus, statusCallback),
         partial(self.onDone, doneCallback),
         partial(self.onError, errorCallback)
@@ -89,6 +101,8 @@ class RunningModel:
       statusCallback(self, progress, status)
 
   def onDone(self, doneCallback: Callable[["RunningModel"], None]):
+    self.lastState = self.runState
+    self.lastResult = getattr(self.instance, "result", None)
     self.running.set(False)
     self.finished.set(True)
     doneCallback(self)
@@ -268,6 +282,7 @@ class ReconstructionRunner(BasePage):
     self.updateTitle()
     self.createWidgets()
     self.grid(sticky="nsew")
+    self.runCachedModels()
     reconstructionRunnerVisible["value"] = True
     ensureOnScreen(self.master)
 
@@ -297,6 +312,24 @@ class ReconstructionRunner(BasePage):
     self.bBack = ttk.Button(self, text="Back", command=self.goBack)
     self.bBack.grid(row=row, column=1, sticky="we", padx=padding, pady=padding)
 
+  def runCachedModels(self):
+    """
+    Runs the models that haven't run yet and take their result from the
+    cache, e.g. after reopening a session
+    """
+    for model in runningModels:
+      if (model.ranOnce or model.model not in self.state.models
+          or not hasattr(model.instance, "hasCachedResult")
+          or model.instance.canRun() != True):
+        continue
+      try:
+        cached = model.instance.hasCachedResult(self.state)
+      except Exception as e:
+        print(e)
+        cached = False
+      if cached:
+        model.prepareStart(self.onStartModel)
+
   def onStartModel(self, model: RunningModel):
     self.after(50, self.updateTitle)
     return (self.state, self.onStatus, self.onFinished, self.onModelError)
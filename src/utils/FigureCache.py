@@ -0,0 +1,89 @@
+from collections import OrderedDict
+import numpy as np
+from typing import Hashable, List, Tuple, Union
+
+from .constants import figureCacheMaxBytes, requiredVariables, optionalVariables
+from .PlotFigureBuilder import PlotFigure
+from .State import State
+from .utils import getFileIdentity
+
+# least recently used first
+_figures: "OrderedDict[Hashable, Tuple[PlotFigure, int]]" = OrderedDict()
+
+
+def getKey(
+  state: State,
+  possibleYaxisLabels: List[str],
+  statisticsWindow: np.timedelta64 = None
+) -> Hashable:
+  """
+  Returns the key of the figure for the selected variables. It contains the
+  identity of the CDF files, so that a reloaded file isn't shown from cache.
+  """
+  vars = []
+  files = {}
+  for variableGroups in [requiredVariables, optionalVariables]:
+    for variableGroup in variableGroups:
+      for var in state.selectedVars[variableGroup] or []:
+        vars.append((variableGroup, var.dataset, var.variable))
+        if var.dataset not in files:
+          files[var.dataset] = getFileIdentity(
+            state.datasetCDFInstances[var.dataset]
+          )
+  return (
+    tuple(vars),
+    tuple(sorted(files.items())),
+    tuple(possibleYaxisLabels),
+    statisticsWindow,
+    # the statistics cover the downloaded interval
+    (str(state.startDate), str(state.endDate))
+    if statisticsWindow is not None else None
+  )
+
+
+def get(key: Hashable) -> Union[PlotFigure, None]:
+  """Returns the cached figure or None"""
+  if key not in _figures:
+    return None
+  _figures.move_to_end(key)
+  return _figures[key][0]
+
+
+def put(key: Hashable, plotFigure: PlotFigure):
+  """
+  Caches the figure and removes the least recently used figures until the
+  estimated size of all figures is below figureCacheMaxBytes. The newest
+  figure is always kept.
+  """
+  if any(identity is None for _, identity in key[1]):
+    # the files can't be identified
+    return
+  _figures[key] = (plotFigure, estimateSize(plotFigure))
+  _figures.move_to_end(key)
+  total = sum(size for _, size in _figures.values())
+  while total > figureCacheMaxBytes and len(_figures) > 1:
+    _, (_, size) = _figures.popitem(last=False)
+    total -= size
+
+
+def estimateSize(plotFigure: PlotFigure) -> int:
+  """Estimates the memory used by the data of the figure in bytes"""
+  arrays = [plotFigure.xDataTimeNum]
+  arrays.extend(plotFigure.xDataNum.values())
+  for values in plotFigure.allPlotValues:
+    arrays.extend(values)
+  for pyramid, _ in plotFigure.plotDecimation.pyramids.values():
+    for level in pyramid.levels:
+      arrays.extend((level.x, level.min, level.mean, level.max))
+
+  seen = set()
+  size = 0
+  for array in arrays:
+    if array is None or id(array) in seen:
+      continue
+    seen.add(id(array))
+    size += np.asarray(array).nbytes
+  if plotFigure.xDataTime is not None:
+    # jd1 and jd2
+    size += len(plotFigure.xDataTime) * 16
+  return size
@@ -14,7 +14,10 @@ def createPlot(master: Union[tk.Frame, ttk.Frame], fig: Figure, canvasMaster: Un
   You have to place the canvas and toolbar yourself via `.pack()` or `.grid()`.
   To place the canvas call `canvas.get_tk_widget().pack()`
   """
+  # callbacks of the figure itself, which are kept by `detachPlot`
+  figureCids = getCids(fig.canvas)
   canvas = FigureCanvasTkAgg(fig, master=canvasMaster or master)
+  canvas.figureCids = figureCids
   canvas.draw()
   canvas.mpl_connect("key_press_event", key_press_handler)
 
@@ -22,3 +25,18 @@ def createPlot(master: Union[tk.Frame, ttk.Frame], fig: Figure, canvasMaster: Un
   toolbar.update()
 
   return canvas, toolbar
+
+
+def getCids(canvas):
+  return set(
+    cid for cids in canvas.callbacks.callbacks.values() for cid in cids
+  )
+
+
+def detachPlot(canvas: FigureCanvasTkAgg):
+  """Disconnects all callbacks connected since `createPlot`, e.g. of the
+  toolbar, so that the figure can be attached to a new canvas with
+  `createPlot` without calling the handlers of destroyed widgets
+  """
+  for cid in getCids(canvas) - getattr(canvas, "figureCids", set()):
+    canvas.mpl_disconnect(cid)
@@ -0,0 +1,53 @@
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from typing import Callable, List, Set, Tuple
+
+from src.utils.constants import panelRenderMargin
+
+
+class PanelFigure(Figure):
+  """
+  A figure of vertically stacked panels, which is shown inside a scrollable
+  frame. Only the axes in the visible area plus a margin above and below are
+  drawn, the others are left blank until they are scrolled into view. When
+  the figure is saved, all axes are drawn.
+  """
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    # returns the visible part of the figure as fractions of its height,
+    # measured from the top. When None, all axes are drawn
+    self.visibleArea: Callable[[], Tuple[float, float]] = None
+    # axes drawn by the last draw of the canvas
+    self.renderedAxes: Set[Axes] = set()
+
+  def getAxesToRender(self) -> List[Axes]:
+    if self.visibleArea is None or self.canvas.is_saving():
+      return list(self.axes)
+    top, bottom = self.visibleArea()
+    margin = (bottom - top) * panelRenderMargin
+    height = self.bbox.height
+    yTop = height * (1 - top + margin)
+    yBottom = height * (1 - bottom - margin)
+    return [
+      ax for ax in self.axes if ax.bbox.y1 >= yBottom and ax.bbox.y0 <= yTop
+    ]
+
+  def needsDraw(self) -> bool:
+    """
+    Returns True if axes were scrolled into the rendered area, which weren't
+    drawn by the last draw
+    """
+    return any(ax not in self.renderedAxes for ax in self.getAxesToRender())
+
+  def draw(self, renderer):
+    render = self.getAxesToRender()
+    hidden = [ax for ax in self.axes if ax.get_visible() and ax not in render]
+    for ax in hidden:
+      ax.set_visible(False)
+    try:
+      super().draw(renderer)
+    finally:
+      for ax in hidden:
+        ax.set_visible(True)
+    if not self.canvas.is_saving():
+      self.renderedAxes = set(render)
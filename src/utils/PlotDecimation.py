@@ -0,0 +1,151 @@
+from matplotlib.axes import Axes
+from matplotlib.lines import Line2D
+import numpy as np
+from typing import Dict, List, Tuple
+
+from src.utils.TimeSeriesPyramid import TimeSeriesPyramid
+
+
+def minMaxDecimate(
+  x: np.ndarray,
+  y: np.ndarray,
+  xmin: float,
+  xmax: float,
+  bins: int,
+  yMin: np.ndarray = None,
+  yMax: np.ndarray = None
+) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  Reduces the data between xmin and xmax to the first, minimum, maximum and
+  last value of each of the bins (M4 aggregation). When the bins correspond
+  to the pixel columns of the axes, the plotted line looks the same as with
+  the full data.
+
+  Parameters
+  ----------
+  x : np.ndarray
+      The sorted x values
+  y : np.ndarray
+      The y values
+  xmin, xmax : float
+      The visible range. One more value on each side is kept so that the line
+      continues outside of the axes
+  bins : int
+      The number of bins, usually the width of the axes in pixels
+  yMin, yMax : np.ndarray
+      Minimum and maximum of already aggregated data, e.g. from a pyramid
+      level. y is then only used for the first and last value of each bin
+
+  Returns
+  -------
+  np.ndarray, np.ndarray
+      The decimated x and y values
+  """
+  start = max(0, int(np.searchsorted(x, xmin, "left")) - 1)
+  end = min(len(x), int(np.searchsorted(x, xmax, "right")) + 1)
+  x = x[start:end]
+  y = y[start:end]
+  if yMin is None:
+    if len(x) <= 4 * bins:
+      return x, y
+    yMin = yMax = y
+  else:
+    yMin = yMin[start:end]
+    yMax = yMax[start:end]
+  if len(x) == 0:
+    return x, y
+
+  edges = np.linspace(xmin, xmax, bins + 1)[:-1]
+  starts = np.unique(np.concatenate(([0], np.searchsorted(x, edges))))
+  starts = starts[starts < len(x)]
+  ends = np.append(starts[1:], len(x)) - 1
+
+  decimatedX = np.column_stack((x[starts], x[starts], x[ends], x[ends]))
+  decimatedY = np.column_stack((
+    y[starts],
+    np.fmin.reduceat(yMin, starts),
+    np.fmax.reduceat(yMax, starts),
+    y[ends]
+  ))
+  return decimatedX.ravel(), decimatedY.ravel()
+
+
+class PlotDecimation:
+  """
+  Plots lines with only as many points as the axes have pixel columns and
+  decimates the full resolution data again whenever the x limits change
+  (zoom or pan). When a pyramid is set for a line, the coarsest level that
+  still has enough blocks in the visible range is used instead of the full
+  resolution data.
+  """
+  def __init__(self):
+    self.lines: Dict[Line2D, Tuple[np.ndarray, np.ndarray]] = {}
+    self.linesByAxes: Dict[Axes, List[Line2D]] = {}
+    self._limits: Dict[Axes, Tuple[float, float, int]] = {}
+    self.pyramids: Dict[Line2D, Tuple[TimeSeriesPyramid, int]] = {}
+
+  def plot(self, ax: Axes, x: np.ndarray, y: np.ndarray, *args,
+           **kwargs) -> List[Line2D]:
+    """
+    Same as `ax.plot(x, y, *args, **kwargs)` for a single line, but only
+    plots the decimated data. The x values have to be sorted matplotlib date
+    numbers.
+    """
+    if ax not in self.linesByAxes:
+      self.linesByAxes[ax] = []
+      ax.xaxis_date()
+      ax.callbacks.connect("xlim_changed", self.onXlimChanged)
+
+    bins = self.getBins(ax)
+    lines = ax.plot(
+      *minMaxDecimate(x, y, x[0], x[-1], bins), *args, **kwargs
+    ) if len(x) else ax.plot(x, y, *args, **kwargs)
+    for line in lines:
+      self.lines[line] = (x, y)
+      self.linesByAxes[ax].append(line)
+    return lines
+
+  def setPyramid(self, line: Line2D, pyramid: TimeSeriesPyramid, component=0):
+    """Uses the component of the pyramid for the next decimations"""
+    self.pyramids[line] = (pyramid, component)
+
+  def getBins(self, ax: Axes) -> int:
+    return max(1, int(ax.bbox.width))
+
+  def onXlimChanged(self, ax: Axes):
+    # depending on the matplotlib version, only the axes whose limits were
+    # changed by the user get this callback
+    for sibling in ax.get_shared_x_axes().get_siblings(ax):
+      self.decimate(sibling)
+
+  def decimate(self, ax: Axes):
+    if ax not in self.linesByAxes:
+      return
+    xmin, xmax = ax.get_xlim()
+    limits = (xmin, xmax, self.getBins(ax))
+    if self._limits.get(ax) == limits:
+      return
+    self._limits[ax] = limits
+
+    for line in self.linesByAxes[ax]:
+      x, y = self.lines[line]
+      if len(x):
+        line.set_data(*self.decimateLine(line, *limits))
+
+  def decimateLine(self, line: Line2D, xmin: float, xmax: float, bins: int):
+    x, y = self.lines[line]
+    if line in self.pyramids:
+      pyramid, component = self.pyramids[line]
+      count = np.searchsorted(x, xmax, "right") - np.searchsorted(x, xmin)
+      level = pyramid.chooseLevel(count, 4 * bins)
+      if level is not None:
+        return minMaxDecimate(
+          level.x,
+          level.mean[component],
+          xmin,
+          xmax,
+          bins,
+          level.min[component],
+          level.max[component]
+        )
+    return minMaxDecimate(x, y, xmin, xmax, bins)
@@ -0,0 +1,457 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from astropy.time import Time
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.dates import DateFormatter, date2num
+from matplotlib.gridspec import GridSpec
+from matplotlib.lines import Line2D
+from matplotlib.ticker import AutoMinorLocator
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+
+from src.utils import decodedData
+from src.utils.constants import requiredVariables, optionalVariables
+from src.utils.PanelFigure import PanelFigure
+from src.utils.PlotDecimation import PlotDecimation
+from src.utils.rollingStatistics import getBetaMinimum, getFieldStatistics
+from src.utils.State import State, StateSelectedVar
+from src.utils.utils import (
+  TimeRange2USDateStr, setFillValuesToNan, getCDFPath
+)
+
+pathYaxisLabels = "src/assets/possibleYaxisLabels.txt"
+isoDateFormatter = DateFormatter("%Y-%m-%d %H:%M:%S.%f")
+
+
+@dataclass
+class PlotFigure:
+  """The figure of the plot selection together with the data it shows"""
+  fig: PanelFigure
+  allPlotAxes: List[Axes]
+  plotDecimation: PlotDecimation
+  # earliest and latest time of all datasets
+  bounds: Tuple[datetime, datetime]
+  # the full resolution values of each line, in the order of the variables
+  allPlotValues: List[List[np.ndarray]]
+  # times of the first dataset, the selection snaps to them
+  xDataTime: Time
+  # xDataTime as matplotlib date numbers
+  xDataTimeNum: np.ndarray
+  # times of the samples by dataset as matplotlib date numbers
+  xDataNum: Dict[str, np.ndarray] = field(default_factory=dict)
+  # cdf path, variable, x data, y data and lines for building the pyramids
+  pyramidJobs: List[Tuple[str, str, np.ndarray, np.ndarray,
+                          List[Line2D]]] = field(default_factory=list)
+
+
+def loadYaxisLabels() -> List[str]:
+  """Returns the attribute keys that are used as Y axis labels"""
+  with open(pathYaxisLabels, "r") as file:
+    return [line.strip() for line in file]
+
+
+def getPlottedVars(state: State) -> List[StateSelectedVar]:
+  """Returns the selected variables in the order they are plotted"""
+  vars: List[StateSelectedVar] = []
+  for variableGroups in [requiredVariables, optionalVariables]:
+    for variableGroup in variableGroups:
+      if state.selectedVars[variableGroup]:
+        vars.extend(state.selectedVars[variableGroup])
+  return vars
+
+
+def buildPlotFigure(
+  state: State,
+  vars: List[StateSelectedVar],
+  possibleYaxisLabels: List[str],
+  onProgress: Callable[[str], None] = None,
+  statisticsWindow: np.timedelta64 = None
+) -> PlotFigure:
+  """
+  Reads the variables from the CDF files and plots them on an Agg figure. The
+  figure isn't attached to any Tk widget, so this can run in a worker thread.
+
+  Parameters
+  ----------
+  onProgress : Callable[[str], None]
+      Called with a status text before each dataset is loaded
+  statisticsWindow : np.timedelta64
+      Adds panels with the rolling statistics of the magnetic field (and
+      plasma beta) over windows of this duration below the data
+  """
+  # inches
+  axHeight = 1
+  titleHeight = 0.55
+  xLabelHeight = 0.7
+
+  datasetOrder = []
+  # height in inches
+  figureSubplotHeight = []
+  for var in vars:
+    if var.dataset not in datasetOrder:
+      datasetOrder.append(var.dataset)
+      figureSubplotHeight.append(0)
+    # add single axis height to last entry
+    figureSubplotHeight[-1] += axHeight
+  statisticsPanels = []
+  if statisticsWindow is not None:
+    statisticsPanels = getStatisticsPanels(state)
+    figureSubplotHeight.append(len(statisticsPanels) * axHeight)
+
+  figureTotalSubplotHeight = sum(figureSubplotHeight)
+  figureAverageSubplotHeight = (
+    figureTotalSubplotHeight / len(figureSubplotHeight)
+  )
+  figureTotalHeight = (
+    figureTotalSubplotHeight + len(figureSubplotHeight) *
+    (titleHeight + xLabelHeight)
+  )
+
+  # not using pyplot, as it isn't thread safe
+  fig = PanelFigure(figsize=(6.4, figureTotalHeight))
+  FigureCanvasAgg(fig)
+  parentGrid = GridSpec(
+    len(figureSubplotHeight),
+    1,
+    fig,
+    top=1 - (titleHeight / figureTotalHeight),
+    right=0.97,
+    bottom=xLabelHeight / figureTotalHeight,
+    left=0.15,
+    hspace=(titleHeight + xLabelHeight) / figureAverageSubplotHeight,
+    height_ratios=[i / figureTotalSubplotHeight for i in figureSubplotHeight]
+  )
+  firstAx = None
+  allPlotAxes: List[Axes] = []
+  plotDecimation = PlotDecimation()
+  pyramidJobs: List[Tuple[str, str, np.ndarray, np.ndarray,
+                          List[Line2D]]] = []
+  allPlotLines: List[List[Line2D]] = []
+  allPlotValues: List[List[np.ndarray]] = []
+  totalXmin = None
+  totalXmax = None
+  xDataTime: Time = None
+  xDataTimeNum: np.ndarray = None
+  xDataNums: Dict[str, np.ndarray] = {}
+
+  for i, dataset in enumerate(datasetOrder):
+    # set dataset title
+    title = next((d.label for d in state.datasets if d.id == dataset),
+                 "Unknown dataset")
+    if onProgress:
+      onProgress(
+        "Loading dataset {} of {}: {}".format(
+          i + 1, len(datasetOrder), title
+        )
+      )
+
+    varsToPlot = [var for var in vars if var.dataset == dataset]
+    childGridItem = parentGrid[i].subgridspec(len(varsToPlot), 1, hspace=0)
+    axs = None
+    if firstAx is None:
+      axs = childGridItem.subplots(sharex=True, squeeze=False)[:, 0]
+      firstAx = axs[0]
+    else:
+      axs = [
+        childGridItem.figure.add_subplot(childGridItem[i, 0], sharex=firstAx)
+        for i in range(len(varsToPlot))
+      ]
+    lastIndex = len(varsToPlot) - 1
+    if not isinstance(axs, (list, np.ndarray)):
+      axs = [axs]
+
+    allPlotAxes.extend(axs)
+
+    axs[0].set_title(
+      title,
+      fontdict={
+        "fontsize":
+          "large" if len(title) <= 100 else
+          ("normal" if len(title) <= 150 else "small")
+      },
+      wrap=True
+    )
+
+    cdf = state.datasetCDFInstances[dataset]
+    cdfInfo = cdf.cdf_info()
+    firstVar = next((
+      i.variable for i in varsToPlot if i.variable in cdfInfo["rVariables"]
+      or i.variable in cdfInfo["zVariables"]
+    ),
+                    None)
+    firstAttsDepend0 = (
+      cdf.varattsget(firstVar)["DEPEND_0"] if firstVar is not None else None
+    )
+    xData = decodedData.epochs(cdf, firstAttsDepend0 or "epoch")
+    xDataNum = date2num(xData.datetime64)
+    if xDataTime is None:
+      xDataTime = xData
+      xDataTimeNum = xDataNum
+    xDataNums[dataset] = xDataNum
+    totalXmin = (
+      xData[0].datetime
+      if totalXmin is None else min(totalXmin, xData[0].datetime)
+    )
+    totalXmax = (
+      xData[-1].datetime
+      if totalXmax is None else max(totalXmax, xData[-1].datetime)
+    )
+
+    axs[-1].set_xlabel(
+      "Time (UTC, {})".format(
+        TimeRange2USDateStr(xData[0].datetime, xData[-1].datetime)
+      )
+    )
+
+    for i2, (var, ax) in enumerate(zip(varsToPlot, axs)):
+      if (var.variable in cdfInfo["zVariables"]
+          or var.variable in cdfInfo["rVariables"]):
+        # copy, as the fill values are replaced in place
+        yData = np.array(decodedData.varget(cdf, var.variable))
+        yAttrs = cdf.varattsget(var.variable)
+        isVector = len(yData.shape) > 1 and yData.shape[1] > 1
+        setFillValuesToNan(yData, yAttrs)
+        if isVector:
+          fmts = ["-r", "--g", ":b"]
+          labels = ["X", "Y", "Z"]
+          lines = []
+          for dim in range(yData.shape[1]):
+            lines.extend(
+              plotDecimation.plot(
+                ax,
+                xDataNum,
+                yData[:, dim],
+                fmts[dim],
+                linewidth=1,
+                label=labels[dim]
+              )
+            )
+          allPlotLines.append(lines)
+          allPlotValues.append([
+            yData[:, dim] for dim in range(yData.shape[1])
+          ])
+          ax.legend(loc="upper right")
+          pyramidJobs.append(
+            (getCDFPath(cdf), var.variable, xDataNum, yData, lines)
+          )
+        else:
+          allPlotLines.append(
+            plotDecimation.plot(
+              ax, xDataNum, yData, "-k", linewidth=1
+            )
+          )
+          allPlotValues.append([yData])
+          pyramidJobs.append(
+            (
+              getCDFPath(cdf),
+              var.variable,
+              xDataNum,
+              yData,
+              allPlotLines[-1]
+            )
+          )
+        # yapf: disable
+        ax.set_ylabel(
+          next(
+            (yAttrs[key] for key in possibleYaxisLabels if key in yAttrs),
+            "Label not found"
+          )
+          + (
+            " [{}]".format(yAttrs["UNITS"])
+            if "UNITS" in yAttrs and str(yAttrs["UNITS"]).lower() != "na"
+            else ""
+          ),
+          wrap=True
+        )
+        # yapf: enable
+
+        # plot horizontal line at y=axlineY only when data crosses it
+        # at y=1 for plasma beta, else at y=0
+        axlineY = (1 if var in (state.selectedVars.Plasma_Beta or []) else 0)
+        if np.nanmin(yData) < axlineY and np.nanmax(yData) > axlineY:
+          ax.axhline(y=axlineY, linewidth=1, color="k")
+        if axlineY == 1:
+          ax.set_yscale("log")
+      else:
+        # variable not in data
+        ax.text(
+          0.5,
+          0.5,
+          "Variable '{}' was not found in the data".format(var.variable),
+          verticalalignment='center',
+          horizontalalignment='center',
+          transform=ax.transAxes,
+          wrap=True
+        )
+        allPlotLines.append([])
+        allPlotValues.append([])
+
+      formatAxis(ax, i2 == 0, i2 == lastIndex)
+
+  if len(statisticsPanels) > 0:
+    if onProgress:
+      onProgress("Calculating the rolling statistics")
+    axs = [
+      fig.add_subplot(item, sharex=firstAx)
+      for item in parentGrid[len(datasetOrder)].subgridspec(
+        len(statisticsPanels), 1, hspace=0
+      )
+    ]
+    allPlotAxes.extend(axs)
+    try:
+      plotStatistics(
+        state, statisticsWindow, statisticsPanels, axs, plotDecimation
+      )
+    except ValueError as e:
+      axs[0].text(
+        0.5,
+        0.5,
+        "Could not calculate the rolling statistics: {}".format(e),
+        verticalalignment="center",
+        horizontalalignment="center",
+        transform=axs[0].transAxes,
+        wrap=True
+      )
+
+  return PlotFigure(
+    fig=fig,
+    allPlotAxes=allPlotAxes,
+    plotDecimation=plotDecimation,
+    bounds=(totalXmin, totalXmax),
+    allPlotValues=allPlotValues,
+    xDataTime=xDataTime,
+    xDataTimeNum=xDataTimeNum,
+    xDataNum=xDataNums,
+    pyramidJobs=pyramidJobs
+  )
+
+
+def getStatisticsPanels(state: State) -> List[str]:
+  panels = ["magnitudeMean", "magnitudeStd", "rotation", "eigenvalueRatio"]
+  if state.selectedVars.Plasma_Beta:
+    panels.append("betaMinimum")
+  return panels
+
+
+def plotStatistics(
+  state: State,
+  window: np.timedelta64,
+  panels: List[str],
+  axs: List[Axes],
+  plotDecimation: PlotDecimation
+):
+  """Plots the rolling statistics of `src.utils.rollingStatistics`"""
+  statistics = getFieldStatistics(state, window)
+  values = {
+    "magnitudeMean": (statistics.magnitudeMean, "|B| mean [nT]"),
+    "magnitudeStd": (np.sqrt(statistics.magnitudeVariance), "|B| std [nT]"),
+    "rotation": (statistics.rotation, "Rotation [°]"),
+    "eigenvalueRatio": (statistics.eigenvalueRatio, "λ int / λ min")
+  }
+  epochs = {name: statistics.epoch for name in values}
+  if "betaMinimum" in panels:
+    epochs["betaMinimum"], betaMinimum = getBetaMinimum(state, window)
+    values["betaMinimum"] = (betaMinimum, "β min")
+
+  hours = window / np.timedelta64(1, "h")
+  axs[0].set_title(f"Rolling statistics ({hours:g} h window)")
+  axs[-1].set_xlabel("Time (UTC, center of the window)")
+  for i, (name, ax) in enumerate(zip(panels, axs)):
+    data, label = values[name]
+    plotDecimation.plot(ax, date2num(epochs[name]), data, "-k", linewidth=1)
+    ax.set_ylabel(label, wrap=True)
+    if name in ["eigenvalueRatio", "betaMinimum"]:
+      ax.set_yscale("log")
+    if name == "betaMinimum" and np.nanmin(data) < 1 < np.nanmax(data):
+      ax.axhline(y=1, linewidth=1, color="k")
+    formatAxis(ax, i == 0, i == len(axs) - 1)
+
+
+def formatAxis(ax: Axes, isFirst: bool, isLast: bool):
+  """
+  Sets the ticks of a panel, isFirst and isLast tell its position in the
+  panels of a dataset
+  """
+  ax.fmt_xdata = isoDateFormatter
+  # axes customisation
+  majorLoc = ax.xaxis.get_major_locator()
+  ticks: List[float] = majorLoc()
+  diff = ticks[1] - ticks[0]
+  possibleIntervals = [
+    1 / 24 / 60,    # 1 min
+    1 / 24 / 12,    # 5 min
+    1 / 24 / 6,    # 10 min
+    1 / 24 / 4,    # 15 min
+    1 / 24 / 2,    # 30 min
+    1 / 24,    # 1 h
+    1 / 12,    # 2 h
+    1 / 8,    # 3 h
+    1 / 4,    # 6 h
+    1 / 2,    # 12 h
+    1,    # 1 d
+    2,
+    5,
+    10
+  ]
+  multiple = 5
+  for i in possibleIntervals:
+    m = diff // i
+    if m in [2, 4, 5, 6]:
+      multiple = m
+      break
+  ax.xaxis.set_minor_locator(AutoMinorLocator(multiple))
+  ax.xaxis.set_major_formatter(DateFormatter("%d\n%H%M"))
+  if ax.get_yscale() == "linear":
+    ax.yaxis.set_minor_locator(AutoMinorLocator(5))
+  if isFirst and isLast:
+    ax.tick_params(
+      axis="x",
+      which="major",
+      direction="inout",
+      length=10,
+      bottom=True,
+      labelbottom=True
+    )
+    ax.tick_params(axis="x", which="major", direction="in", length=5, top=True)
+    ax.tick_params(
+      axis="x", which="minor", direction="inout", length=5, bottom=True
+    )
+    ax.tick_params(
+      axis="x", which="minor", direction="in", length=2.5, top=True
+    )
+  else:
+    ax.tick_params(
+      axis="x",
+      which="major",
+      direction="inout" if isLast else "in",
+      length=10 if isLast else 5,
+      bottom=True,
+      top=True,
+      labelbottom=isLast
+    )
+    ax.tick_params(
+      axis="x",
+      which="minor",
+      direction="inout" if isLast else "in",
+      length=5 if isLast else 2.5,
+      bottom=True,
+      top=True
+    )
+  ax.tick_params(
+    axis="y",
+    which="major",
+    direction="out",
+    length=10,
+    left=True,
+    right=False,
+    labelleft=True,
+  )
+  ax.tick_params(
+    axis="y",
+    which="minor",
+    direction="out",
+    length=5,
+    left=True,
+    right=False
+  )
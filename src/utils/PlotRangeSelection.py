@@ -1,9 +1,9 @@
 from matplotlib.axes import Axes
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.backend_bases import MouseButton, MouseEvent
-from matplotlib.transforms import Bbox
-from typing import List, Tuple, Callable, Union
-from datetime import datetime, timezone
+from matplotlib.dates import date2num
+from typing import Any, List, Tuple, Callable, Union
+from datetime import datetime
 from astropy.time import Time
 
 from src.utils.constants import minDragDistanceForDraggingInPlot
@@ -15,6 +15,13 @@ class PlotRangeSelection:
   """
   A start and end selection with a cursor line using blitting for faster
   redraw than replotting everything.
+
+  The lines are animated, so they are not part of a normal draw of the
+  figure. After every draw, the background of each axes is copied. When the
+  lines change, only the axes whose lines are not yet drawn at their current
+  position are restored and blitted. If visibleArea is given, axes that are
+  scrolled out of view are skipped until updateFigure is called again after
+  scrolling.
   """
   def __init__(
     self,
@@ -22,10 +29,22 @@ class PlotRangeSelection:
     canvas: FigureCanvasTkAgg,
     bounds: Tuple[datetime, datetime],
     enabled: bool = True,
+    visibleArea: Callable[[], Tuple[float, float]] = None
   ):
+    """
+    Parameters
+    ----------
+    visibleArea
+      Returns the visible part of the figure as fractions of its height,
+      measured from the top, e.g. (0.25, 0.5)
+    """
     self.axs = axs
     self.canvas = canvas
-    self.background = None
+    self.visibleArea = visibleArea
+    # background of each axes without the lines, None until the first draw
+    self.backgrounds: List[Any] = None
+    # state of the lines as they are currently drawn on each axes
+    self._drawnStates: List[Tuple] = [None] * len(axs)
     self.startLines = [self.createVline(ax, bounds, True) for ax in axs]
     self.endLines = [self.createVline(ax, bounds, True) for ax in axs]
     self.cursorLines = [self.createVline(ax, bounds, False) for ax in axs]
@@ -35,17 +54,38 @@ class PlotRangeSelection:
     self.dragStartPos = None
     self.startVisible = False
     self.endVisible = False
+    # positions as matplotlib date numbers
+    self.start: float = None
+    self.end: float = None
+    self.cursor: float = None
 
-    self._creatingBackground = False
     self._lockLines = False
 
-    self.onSelection: List[Callable[[datetime, datetime, bool], None]] = []
-
-    self.canvas.mpl_connect("draw_event", self.onDraw)
-    self.canvas.mpl_connect("motion_notify_event", self.onMouseMove)
-    self.canvas.mpl_connect("button_press_event", self.onMouseDown)
-    self.canvas.mpl_connect("button_release_event", self.onMouseUp)
-    self.canvas.mpl_connect("figure_leave_event", self.onFigureLeave)
+    self.onSelection: List[Callable[[float, float, bool], None]] = []
+
+    self._cids = [
+      self.canvas.mpl_connect("draw_event", self.onDraw),
+      self.canvas.mpl_connect("motion_notify_event", self.onMouseMove),
+      self.canvas.mpl_connect("button_press_event", self.onMouseDown),
+      self.canvas.mpl_connect("button_release_event", self.onMouseUp),
+      self.canvas.mpl_connect("figure_leave_event", self.onFigureLeave)
+    ]
+
+  def destroy(self):
+    """
+    Disconnects from the canvas and removes the lines, so that the figure can
+    be shown again with a new selection
+    """
+    for cid in self._cids:
+      self.canvas.mpl_disconnect(cid)
+    self._cids = []
+    for line in self.startLines + self.endLines + self.cursorLines:
+      line.remove()
+    self.startLines = []
+    self.endLines = []
+    self.cursorLines = []
+    self.backgrounds = None
+    self.onSelection = []
 
   def createVline(
     self, ax: Axes, bounds: Tuple[datetime, datetime], isSelection: bool
@@ -54,13 +94,23 @@ class PlotRangeSelection:
       x=bounds[0],
       color="b" if isSelection else "r",
       lw=1,
-      ls="-" if isSelection else "--"
+      ls="-" if isSelection else "--",
+      animated=True
     )
     vline.set_visible(False)
     return vline
 
   def onDraw(self, event):
-    self.createNewBackground()
+    if self.canvas.is_saving():
+      # the lines are drawn when saving, as they are visible
+      return
+    # the lines are animated and therefore not drawn yet
+    self.backgrounds = [self.canvas.copy_from_bbox(ax.bbox) for ax in self.axs]
+    state = self.getLinesState()
+    for i, visible in enumerate(self.getVisibleAxes()):
+      if visible:
+        self.drawLines(i)
+      self._drawnStates[i] = state if visible else None
 
   def setSelectionVisible(
     self, startVisible=None, endVisible=None, cursorVisible=None
@@ -81,25 +131,6 @@ class PlotRangeSelection:
 
     return needRedraw
 
-  def createNewBackground(self):
-    if self._creatingBackground:
-      # discard calls triggered from within this function
-      return
-    self._creatingBackground = True
-    linesVisible = self._lockLines
-    self.setSelectionVisible(
-      startVisible=linesVisible, endVisible=linesVisible, cursorVisible=False
-    )
-    self.canvas.draw()
-    if not linesVisible:
-      self.background = self.canvas.copy_from_bbox(self.getFullBbox())
-    self.setSelectionVisible(
-      startVisible=self.startVisible,
-      endVisible=self.endVisible,
-      cursorVisible=True
-    )
-    self._creatingBackground = False
-
   def onMouseDown(self, event: MouseEvent):
     if self.enabled is False or self._lockLines:
       return
@@ -109,8 +140,6 @@ class PlotRangeSelection:
     if not leftMouse and not rightMouse:
       return
 
-    if self.background is None:
-      self.createNewBackground()
     if event.inaxes:
       # only enable dragging with left mouse button
       x = event.xdata
@@ -121,14 +150,14 @@ class PlotRangeSelection:
           self.dragStartPos = event.x
         self.setSelectionVisible(startVisible=True)
         self.startVisible = True
-        for line in self.startLines:
-          line.set_xdata(x)
+        self.start = x
+        self.setLinesX(self.startLines, x)
 
       elif rightMouse:
         self.setSelectionVisible(endVisible=True)
         self.endVisible = True
-        for line in self.endLines:
-          line.set_xdata(x)
+        self.end = x
+        self.setLinesX(self.endLines, x)
 
       self.updateFigure()
       self.dispatchOnSelection()
@@ -148,8 +177,6 @@ class PlotRangeSelection:
     if self._lockLines:
       return
 
-    if self.background is None:
-      self.createNewBackground()
     if (self.dragStartPos and
         abs(self.dragStartPos - event.x) >= minDragDistanceForDraggingInPlot):
       self.dragging = True
@@ -160,11 +187,13 @@ class PlotRangeSelection:
     # update the line positions
     x = event.xdata
 
-    if self.dragging:
-      for line in self.endLines:
-        line.set_xdata(x)
-    for line in self.cursorLines:
-      line.set_xdata(x)
+    if x is not None:
+      if self.dragging:
+        self.end = x
+        self.setLinesX(self.endLines, x)
+      self.cursor = x
+      self.setLinesX(self.cursorLines, x)
+      self.setSelectionVisible(cursorVisible=True)
 
     self.updateFigure()
 
@@ -182,77 +211,96 @@ class PlotRangeSelection:
     if dragged:
       self.dispatchOnSelection()
 
+  def getLinesState(self) -> Tuple:
+    return (
+      self.start if self.startLines[0].get_visible() else None,
+      self.end if self.endLines[0].get_visible() else None,
+      self.cursor if self.cursorLines[0].get_visible() else None
+    )
+
+  def getVisibleAxes(self) -> List[bool]:
+    if self.visibleArea is None:
+      return [True] * len(self.axs)
+    top, bottom = self.visibleArea()
+    height = self.canvas.figure.bbox.height
+    yTop = height * (1 - top)
+    yBottom = height * (1 - bottom)
+    return [
+      bool(ax.bbox.y1 >= yBottom and ax.bbox.y0 <= yTop) for ax in self.axs
+    ]
+
+  def drawLines(self, index: int):
+    ax = self.axs[index]
+    for lines in (self.startLines, self.endLines, self.cursorLines):
+      if lines[index].get_visible():
+        ax.draw_artist(lines[index])
+
   def updateFigure(self):
-    self.canvas.restore_region(self.background)
-    for ax, start, end, cursor in zip(self.axs, self.startLines, self.endLines, self.cursorLines):
-      ax.draw_artist(cursor)
-      if self.startVisible:
-        ax.draw_artist(start)
-      if self.endVisible:
-        ax.draw_artist(end)
-    self.canvas.blit(self.getFullBbox())
-
-  def getFullBbox(self):
-    return Bbox.union([ax.bbox for ax in self.axs])
+    """Redraws the lines of all visible axes whose lines have changed"""
+    if self.backgrounds is None:
+      # creates the backgrounds in onDraw
+      self.canvas.draw()
+      return
+
+    state = self.getLinesState()
+    for i, (ax, visible) in enumerate(zip(self.axs, self.getVisibleAxes())):
+      if not visible or self._drawnStates[i] == state:
+        continue
+      self.canvas.restore_region(self.backgrounds[i])
+      self.drawLines(i)
+      self.canvas.blit(ax.bbox)
+      self._drawnStates[i] = state
 
   def lock(self):
     if self.startVisible and self.endVisible:
       self._lockLines = True
-      self.createNewBackground()
+      self.setSelectionVisible(cursorVisible=False)
+      self.updateFigure()
 
   def unlock(self):
     self._lockLines = False
     self.updateFigure()
 
+  def setLinesX(self, lines: List, x: float):
+    for line in lines:
+      line.set_xdata([x, x])
+
   def dispatchOnSelection(self):
-    secondsPerDay = 86400
-
-    start = self.startLines[0].get_xdata() if self.startVisible else None
-    end = self.endLines[0].get_xdata() if self.endVisible else None
-    if start:
-      if isinstance(start, datetime):
-        start = Time(start)
-      else:
-        start = Time(
-          datetime.fromtimestamp(start * secondsPerDay, timezone.utc)
-        )
-    if end:
-      if isinstance(end, datetime):
-        end = Time(end)
-      else:
-        end = Time(datetime.fromtimestamp(end * secondsPerDay, timezone.utc))
-    if start and end and end < start:
-      tmp = start
-      start = end
-      end = tmp
+    start = self.start if self.startVisible else None
+    end = self.end if self.endVisible else None
+    if start is not None and end is not None and end < start:
+      start, end = end, start
     for cb in self.onSelection:
       cb(start, end, self.dragging)
 
+  @staticmethod
+  def toDateNum(value: Union[float, Time, datetime, None]):
+    """Converts the value to a matplotlib date number"""
+    if isinstance(value, Time):
+      return float(date2num(value.datetime64))
+    if isinstance(value, datetime):
+      return float(date2num(value))
+    return value
+
   def setSelection(
     self,
-    start: Union[Time, datetime] = None,
-    end: Union[Time, datetime] = None
+    start: Union[float, Time, datetime] = None,
+    end: Union[float, Time, datetime] = None
   ):
-    if self.background is None:
-      self.createNewBackground()
-    if isinstance(start, (Time, datetime)):
-      time = start.datetime if isinstance(start, Time) else start
-      self.setSelectionVisible(startVisible=True)
-      self.startVisible = True
-      for line in self.startLines:
-        line.set_xdata(time)
-    else:
-      self.setSelectionVisible(startVisible=False)
-      self.startVisible = False
-
-    if isinstance(end, (Time, datetime)):
-      time = end.datetime if isinstance(end, Time) else end
-      self.setSelectionVisible(endVisible=True)
-      self.endVisible = True
-      for line in self.endLines:
-        line.set_xdata(time)
-    else:
-      self.setSelectionVisible(endVisible=False)
-      self.endVisible = False
+    """
+    Sets the start and end lines. The positions are matplotlib date numbers,
+    Time and datetime are converted. None hides the line.
+    """
+    self.start = self.toDateNum(start)
+    self.startVisible = self.start is not None
+    self.setSelectionVisible(startVisible=self.startVisible)
+    if self.startVisible:
+      self.setLinesX(self.startLines, self.start)
+
+    self.end = self.toDateNum(end)
+    self.endVisible = self.end is not None
+    self.setSelectionVisible(endVisible=self.endVisible)
+    if self.endVisible:
+      self.setLinesX(self.endLines, self.end)
 
     self.updateFigure()
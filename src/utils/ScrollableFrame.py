@@ -1,7 +1,7 @@
 import tkinter as tk
 from math import copysign
 from tkinter import ttk
-from typing import Type, Union
+from typing import Callable, List, Tuple, Type, Union
 
 from src.utils.constants import padding
 
@@ -17,12 +17,14 @@ class ScrollableFrame(tk.Frame):
   ):
     super().__init__(master, **kwargs)
     self.master = master
+    # called with the first and last visible fraction after scrolling
+    self.onScroll: List[Callable[[], None]] = []
 
     self.scrollY = tk.Scrollbar(self)
     self.scrollY.pack(side="right", fill="y")
 
     self.canvas = tk.Canvas(
-      self, height=height, width=width, yscrollcommand=self.scrollY.set,
+      self, height=height, width=width, yscrollcommand=self.onYScroll,
       highlightthickness=0
     )
     self.canvas.pack(side="left", expand=True, fill="both")
@@ -43,6 +45,28 @@ class ScrollableFrame(tk.Frame):
   def configure(self, event):
     self.canvas["scrollregion"] = self.canvas.bbox("all")
 
+  def onYScroll(self, first, last):
+    self.scrollY.set(first, last)
+    for cb in self.onScroll:
+      cb()
+
+  def getVisibleFraction(self, widget: tk.Widget) -> Tuple[float, float]:
+    """
+    Returns the visible part of a widget inside the inner frame as fractions
+    of its height, measured from the top
+    """
+    height = max(1, widget.winfo_reqheight())
+    top = self.canvas.canvasy(0) - (
+      widget.winfo_rooty() - self.innerFrame.winfo_rooty()
+    )
+    # the size is only known once the canvas is shown
+    canvasHeight = (
+      self.canvas.winfo_height()
+      if self.canvas.winfo_ismapped() else int(self.canvas["height"])
+    )
+    bottom = top + canvasHeight
+    return top / height, bottom / height
+
   def mouseWheel(self, event):
     self.canvas.yview_scroll(int(copysign(1, event.delta)) * -1, "units")
 
@@ -0,0 +1,96 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, FrozenSet, Generic, Hashable, List, Set, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+tokenRegex = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> List[str]:
+  """Splits a text into lower case alphanumeric tokens"""
+  if text is None:
+    return []
+  if isinstance(text, (list, tuple)):
+    return [token for i in text for token in tokenize(i)]
+  return tokenRegex.findall(str(text).lower())
+
+
+class SearchIndex(Generic[T]):
+  """
+  An in-memory inverted index for incremental, as-you-type searching.
+
+  Every token of the indexed texts points to the set of keys whose texts
+  contain it. A query token matches every indexed token it is a prefix of,
+  so that partially typed words already give results. The token vocabulary
+  is kept sorted to find all tokens with a given prefix by bisection.
+  """
+  def __init__(self):
+    self._postings: Dict[str, Set[T]] = {}
+    self._keys: Set[T] = set()
+    self._tokens: List[str] = None
+    self._prefixCache: Dict[str, FrozenSet[T]] = {}
+
+  def __len__(self):
+    return len(self._keys)
+
+  def add(self, key: T, *texts):
+    """Indexes all texts for the key. Texts may be strings or lists of them"""
+    for token in tokenize(list(texts)):
+      self._postings.setdefault(token, set()).add(key)
+    self._keys.add(key)
+    self._tokens = None
+    self._prefixCache.clear()
+
+  def clear(self):
+    self._postings.clear()
+    self._keys.clear()
+    self._tokens = None
+    self._prefixCache.clear()
+
+  def search(self, query: str) -> Set[T]:
+    """
+    Returns the keys matching all tokens of the query. An empty query
+    matches everything.
+    """
+    tokens = set(tokenize(query))
+    if len(tokens) == 0:
+      return set(self._keys)
+
+    result: Set[T] = None
+    # the longest tokens are usually the most selective ones
+    for token in sorted(tokens, key=len, reverse=True):
+      matches = self._prefixMatches(token)
+      result = set(matches) if result is None else result & matches
+      if len(result) == 0:
+        break
+    return result
+
+  def suggest(self, query: str, limit: int = None, among: Set[T] = None):
+    """
+    Returns the keys matching any token of the query, ranked by the number
+    of matched tokens. Only keys in `among` are considered if it is given.
+    """
+    counts = Counter()
+    for token in set(tokenize(query)):
+      matches = self._prefixMatches(token)
+      counts.update(matches if among is None else matches & among)
+    return [key for key, _ in counts.most_common(limit)]
+
+  def _prefixMatches(self, prefix: str) -> FrozenSet[T]:
+    cached = self._prefixCache.get(prefix)
+    if cached is not None:
+      return cached
+
+    if self._tokens is None:
+      self._tokens = sorted(self._postings)
+    start = bisect_left(self._tokens, prefix)
+    end = bisect_left(self._tokens, prefix + "\uffff", start)
+    matches = set()
+    for token in self._tokens[start:end]:
+      matches |= self._postings[token]
+
+    matches = frozenset(matches)
+    self._prefixCache[prefix] = matches
+    return matches
@@ -3,11 +3,12 @@ from astropy.time import Time
 from tkinter import Frame, Toplevel
 from tkinter.messagebox import showwarning
 import os.path as path
-from cdflib import cdfastropy
 from cdflib.cdfread import CDF
 import numpy as np
 
+from src.utils import decodedData
 from src.utils.importAllModels import importAllModels
+from src.utils.resampling import cadenceEpochs, resample
 from src.utils.utils import setFillValuesToNan
 
 
@@ -524,11 +525,23 @@ class State:
       cdf.close()
     self.datasetCDFInstances = None
 
-  def getData(self, dataType: str, dir: str = None, includeDate: bool = False):
+  def getData(
+    self,
+    dataType: str,
+    dir: str = None,
+    includeDate: bool = False,
+    resampleTo: Union[np.ndarray, np.timedelta64] = None,
+    method: str = "mean"
+  ):
     """
     Return the data for the direction dir.
     Returns (data: np.ndarray, date: astropy.time.Time) as a tuple if
     includeDate is True else only data
+
+    When resampleTo is a datetime64 array (e.g. the date of another variable)
+    or a cadence as timedelta64, the data is resampled onto it or onto epochs
+    with this cadence in the selection with the method of
+    `src.utils.resampling.resample`.
     """
     if self.selectedVars is None:
       raise ValueError("No variables were selected")
@@ -576,19 +589,30 @@ class State:
       raise ValueError("CDF file for magnetic field not loaded")
 
     cdf = self.datasetCDFInstances[var.dataset]
-    data = np.array(cdf.varget(var.variable))
+    # decoded once and shared with the plot page and batch runs
+    data = np.array(decodedData.varget(cdf, var.variable))
     attrs = cdf.varattsget(var.variable)
     setFillValuesToNan(data, attrs)
-    xDataAstropy = cdfastropy.convert_to_astropy(cdf.varget(attrs["DEPEND_0"] or "epoch"))
-    xData = np.array(xDataAstropy.datetime)
-    selector = self.selectionStart.datetime <= xData
-    data: np.ndarray = data[selector]
-    xDataAstropy: Time = xDataAstropy[selector]
-    xData: np.ndarray = xData[selector]
-    selector = xData <= self.selectionEnd.datetime
+    epoch = decodedData.datetime64s(cdf, attrs["DEPEND_0"] or "epoch")
+    if resampleTo is not None:
+      if isinstance(resampleTo, np.timedelta64):
+        resampleTo = cadenceEpochs(
+          self.selectionStart.datetime64,
+          self.selectionEnd.datetime64,
+          resampleTo
+        )
+      if len(data.shape) > 1 and data.shape[1] > 1 and isinstance(component, int):
+        data = data[:, component]
+      data = resample(epoch, data, resampleTo, method)
+      return (data, Time(resampleTo)) if includeDate else data
+    selector = (
+      (self.selectionStart.datetime64 <= epoch)
+      & (epoch <= self.selectionEnd.datetime64)
+    )
     data: np.ndarray = data[selector]
-    xDataAstropy: Time = xDataAstropy[selector]
-    xData: np.ndarray = xData[selector]
+    xDataAstropy: Time = decodedData.epochs(
+      cdf, attrs["DEPEND_0"] or "epoch"
+    )[selector]
     if len(data.shape) > 1 and data.shape[1] > 1 and isinstance(component, int):
       data = data[:, component]
     return (data, xDataAstropy) if includeDate else data
@@ -0,0 +1,150 @@
+import re
+from dataclasses import dataclass
+from os import path
+import numpy as np
+from typing import List, Optional
+
+from src.utils.constants import pyramidFactor, pyramidMinSamples
+
+
+@dataclass
+class PyramidLevel:
+  """
+  Aggregates of a time series. All value arrays have the shape
+  (components, len(x)). x contains the time of the first sample of each block
+  """
+  x: np.ndarray
+  min: np.ndarray
+  mean: np.ndarray
+  max: np.ndarray
+  # number of raw samples per block
+  blockSize: int
+
+
+class TimeSeriesPyramid:
+  """
+  Minimum, mean and maximum of a time series at several resolutions. Every
+  level aggregates `factor` blocks of the level below, the first level
+  aggregates `factor` raw samples.
+  """
+  def __init__(self, levels: List[PyramidLevel], factor: int = pyramidFactor):
+    self.levels = levels
+    self.factor = factor
+
+  @staticmethod
+  def build(
+    x: np.ndarray,
+    y: np.ndarray,
+    factor: int = pyramidFactor,
+    minLength: int = 1000
+  ) -> "TimeSeriesPyramid":
+    """
+    Builds the levels until a level has less than minLength blocks
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The sorted times of the samples, e.g. as matplotlib date numbers
+    y : np.ndarray
+        The samples, either 1D or 2D with the components in the second
+        dimension like it is read from the CDF file
+    """
+    values = np.asarray(y, dtype=float).reshape(len(x), -1).T
+    valid = ~np.isnan(values)
+    mins, maxs = values, values
+    sums = np.where(valid, values, 0)
+    counts = valid.astype(np.int64)
+
+    levels = []
+    blockSize = 1
+    while len(x) >= minLength * factor:
+      starts = np.arange(0, len(x), factor)
+      x = x[starts]
+      mins = np.fmin.reduceat(mins, starts, axis=1)
+      maxs = np.fmax.reduceat(maxs, starts, axis=1)
+      sums = np.add.reduceat(sums, starts, axis=1)
+      counts = np.add.reduceat(counts, starts, axis=1)
+      blockSize *= factor
+      with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+      levels.append(PyramidLevel(x, mins, means, maxs, blockSize))
+
+    return TimeSeriesPyramid(levels, factor)
+
+  def chooseLevel(self, count: int, minBlocks: int) -> Optional[PyramidLevel]:
+    """
+    Returns the coarsest level that still has more than minBlocks blocks
+    for count raw samples or None if the raw samples should be used
+    """
+    return next((
+      level for level in reversed(self.levels)
+      if count / level.blockSize > minBlocks
+    ),
+                None)
+
+  def save(self, file: str, key: np.ndarray):
+    arrays = {"key": key, "factor": self.factor}
+    for i, level in enumerate(self.levels):
+      arrays["x{}".format(i)] = level.x
+      arrays["min{}".format(i)] = level.min
+      arrays["mean{}".format(i)] = level.mean
+      arrays["max{}".format(i)] = level.max
+      arrays["blockSize{}".format(i)] = level.blockSize
+    np.savez(file, **arrays)
+
+  @staticmethod
+  def load(file: str, key: np.ndarray) -> Optional["TimeSeriesPyramid"]:
+    """Returns the saved pyramid or None when the key doesn't match"""
+    with np.load(file) as data:
+      if not np.array_equal(data["key"], key):
+        return None
+      levels = []
+      i = 0
+      while "x{}".format(i) in data:
+        levels.append(
+          PyramidLevel(
+            data["x{}".format(i)],
+            data["min{}".format(i)],
+            data["mean{}".format(i)],
+            data["max{}".format(i)],
+            int(data["blockSize{}".format(i)])
+          )
+        )
+        i += 1
+      return TimeSeriesPyramid(levels, int(data["factor"]))
+
+
+def getPyramid(cdfPath: str, variable: str, x: np.ndarray,
+               y: np.ndarray) -> Optional[TimeSeriesPyramid]:
+  """
+  Loads the pyramid of the variable stored next to the CDF file or builds
+  and stores it if the CDF file has changed. Returns None for short time
+  series, which don't need a pyramid.
+  """
+  if len(x) < pyramidMinSamples:
+    return None
+
+  file = "{}.{}.pyramid.npz".format(
+    cdfPath, re.sub(r"[/\\:*?\"<>|]", "_", variable)
+  )
+  stat = None
+  try:
+    stat = np.array([path.getmtime(cdfPath), path.getsize(cdfPath)])
+  except OSError:
+    pass
+
+  if stat is not None and path.isfile(file):
+    try:
+      pyramid = TimeSeriesPyramid.load(file, stat)
+      if pyramid is not None:
+        return pyramid
+    except (OSError, ValueError, KeyError):
+      pass
+
+  pyramid = TimeSeriesPyramid.build(x, y)
+  if stat is not None:
+    try:
+      pyramid.save(file, stat)
+    except OSError:
+      pass
+  return pyramid
@@ -0,0 +1,484 @@
+from functools import partial
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, List, Set, Tuple
+
+
+class _Item:
+  __slots__ = ("parent", "children", "options", "open")
+
+  def __init__(self, parent: str, options: dict):
+    # None when the item is detached
+    self.parent = parent
+    self.children: List[str] = []
+    self.open = bool(options.pop("open", False))
+    self.options = options
+
+
+class VirtualTreeview(ttk.Treeview):
+  """
+  A ttk.Treeview that keeps all of its items in python and only inserts the
+  rows into the tk widget that are currently visible.
+
+  Inserting, deleting, moving and filtering items only changes the python
+  model, the tk widget is updated once when tk is idle. The parents of the
+  first visible row are always shown at the top so that it is clear to which
+  parent the visible rows belong.
+
+  Supports the part of the ttk.Treeview API that is used by the pages. The
+  vertical scrolling is handled by the widget itself, so the scrollbar has to
+  be passed with `yscrollcommand` and has to call `yview`.
+  """
+
+  # these events are handled by the widget and dispatched to the handlers
+  # registered with `bind` afterwards
+  _managedSequences = (
+    "<<TreeviewSelect>>",
+    "<<TreeviewOpen>>",
+    "<<TreeviewClose>>",
+    "<Up>",
+    "<Down>",
+    "<Prior>",
+    "<Next>",
+    "<Home>",
+    "<End>",
+    "<MouseWheel>",
+    "<Button-4>",
+    "<Button-5>"
+  )
+
+  def __init__(self, master=None, **kwargs):
+    self._yscrollcommand: Callable[[float, float], None] = kwargs.pop(
+      "yscrollcommand", None
+    )
+    super().__init__(master, **kwargs)
+
+    self._items: Dict[str, _Item] = {"": _Item(None, {"open": True})}
+    self._counter = 0
+    # flattened list of all rows that are visible when scrolling through
+    # the whole tree, None when it has to be recomputed
+    self._rows: List[str] = None
+    self._rowIndex: Dict[str, int] = {}
+    # index into self._rows of the first shown row
+    self._first = 0
+    # items that are currently inserted into the tk widget
+    self._materialized: Set[str] = set()
+    self._placeholders: List[str] = []
+    self._selection: Tuple[str, ...] = ()
+    self._focus = ""
+    self._forcedSelectEvents = 0
+    self._reappliedSelectEvents = 0
+    self._refreshPending = False
+    self._handlers: Dict[str, List[Callable]] = {}
+
+    super().bind("<<TreeviewSelect>>", self._onSelect)
+    super().bind("<<TreeviewOpen>>", partial(self._onOpenClose, True))
+    super().bind("<<TreeviewClose>>", partial(self._onOpenClose, False))
+    actions = {
+      "<Up>": partial(self._moveFocus, -1),
+      "<Down>": partial(self._moveFocus, 1),
+      "<Prior>": partial(self.yview_scroll, -1, tk.PAGES),
+      "<Next>": partial(self.yview_scroll, 1, tk.PAGES),
+      "<Home>": partial(self.yview_moveto, 0),
+      "<End>": partial(self.yview_moveto, 1),
+      "<MouseWheel>": None,
+      "<Button-4>": partial(self.yview_scroll, -1, tk.UNITS),
+      "<Button-5>": partial(self.yview_scroll, 1, tk.UNITS),
+    }
+    for sequence, action in actions.items():
+      super().bind(sequence, partial(self._onKeyOrWheel, sequence, action))
+
+  # ---------------------------------------------------------------------------
+  # widget options and events
+
+  def configure(self, cnf=None, **kw):
+    if isinstance(cnf, dict):
+      kw = {**cnf, **kw}
+      cnf = None
+    if "yscrollcommand" in kw:
+      self._yscrollcommand = kw.pop("yscrollcommand")
+      self._updateScrollbar()
+      if len(kw) == 0:
+        return None
+    res = super().configure(cnf, **kw)
+    if "height" in kw:
+      self._invalidate(False)
+    return res
+
+  config = configure
+
+  def cget(self, key):
+    if key == "yscrollcommand":
+      return self._yscrollcommand
+    return super().cget(key)
+
+  __getitem__ = cget
+
+  def bind(self, sequence=None, func=None, add=None):
+    if sequence not in self._managedSequences or func is None:
+      return super().bind(sequence, func, add)
+    handlers = self._handlers.setdefault(sequence, [])
+    if not add:
+      handlers.clear()
+    handlers.append(func)
+    return sequence
+
+  def _dispatch(self, sequence: str, event):
+    for handler in list(self._handlers.get(sequence, [])):
+      if handler(event) == "break":
+        return "break"
+    return None
+
+  def _onSelect(self, event):
+    if self._forcedSelectEvents > 0:
+      # a selection change made through selection_set
+      self._forcedSelectEvents -= 1
+      return self._dispatch("<<TreeviewSelect>>", event)
+
+    selection = super().selection()
+    shown = tuple(i for i in self._selection if i in self._materialized)
+    if set(selection) == set(shown) and (
+        self._reappliedSelectEvents > 0 or len(selection) == 0):
+      # the selection was only reapplied after the rows have been refreshed or
+      # a selected row was removed because it was scrolled out of view
+      self._reappliedSelectEvents = max(0, self._reappliedSelectEvents - 1)
+      return None
+    self._selection = tuple(selection)
+    self._focus = super().focus()
+    return self._dispatch("<<TreeviewSelect>>", event)
+
+  def _onOpenClose(self, isOpen: bool, event):
+    item = super().focus()
+    if item in self._items:
+      self._items[item].open = isOpen
+      self._invalidate()
+      self._refresh()
+    return self._dispatch(
+      "<<TreeviewOpen>>" if isOpen else "<<TreeviewClose>>", event
+    )
+
+  def _onKeyOrWheel(self, sequence: str, action: Callable, event):
+    # the default bindings of the treeview would scroll the tk widget itself,
+    # so they are always replaced
+    if self._dispatch(sequence, event) == "break":
+      return "break"
+    if action is None:
+      self.yview_scroll(-1 if event.delta > 0 else 1, tk.UNITS)
+    else:
+      action()
+    return "break"
+
+  def _moveFocus(self, step: int):
+    rows = self._visibleRows()
+    if len(rows) == 0:
+      return
+    current = self._focus or next(iter(self._selection), "")
+    if current in self._rowIndex:
+      index = max(0, min(len(rows) - 1, self._rowIndex[current] + step))
+    else:
+      index = self._first
+    item = rows[index]
+    self.focus(item)
+    self.see(item)
+    if str(self.cget("selectmode")) != tk.NONE:
+      self.selection_set(item)
+
+  # ---------------------------------------------------------------------------
+  # scrolling
+
+  def yview(self, *args):
+    if len(args) == 0:
+      return self._fractions()
+    if args[0] == tk.MOVETO:
+      self.yview_moveto(float(args[1]))
+    elif args[0] == tk.SCROLL:
+      self.yview_scroll(int(args[1]), args[2])
+    return None
+
+  def yview_moveto(self, fraction: float):
+    self._first = int(round(float(fraction) * len(self._visibleRows())))
+    self._refresh()
+
+  def yview_scroll(self, number: int, what: str):
+    if what == tk.PAGES:
+      number *= max(1, self._height() - 1)
+    self._first += int(number)
+    self._refresh()
+
+  def see(self, item: str):
+    if item not in self._items:
+      return
+    parent = self._items[item].parent
+    while parent:
+      if not self._items[parent].open:
+        self._items[parent].open = True
+        self._invalidate()
+      parent = self._items[parent].parent
+    self._visibleRows()
+    if item not in self._rowIndex:
+      # the item is detached
+      return
+    index = self._rowIndex[item]
+    height = self._height()
+    if index < self._first:
+      self._first = index
+    else:
+      # the sticky parents of the first row take up some of the rows
+      while self._first < index and index >= (
+          self._first + height - len(self._ancestors(self._rows[self._first]))):
+        self._first += 1
+    self._refresh()
+
+  def _fractions(self) -> Tuple[float, float]:
+    total = len(self._visibleRows())
+    if total == 0:
+      return 0.0, 1.0
+    return (
+      self._first / total, min(1.0, (self._first + self._height()) / total)
+    )
+
+  def _updateScrollbar(self):
+    if self._yscrollcommand is not None:
+      self._yscrollcommand(*self._fractions())
+
+  def _height(self) -> int:
+    return max(1, int(str(super().cget("height"))))
+
+  # ---------------------------------------------------------------------------
+  # items
+
+  def insert(self, parent: str, index, iid: str = None, **kw) -> str:
+    if iid is None:
+      self._counter += 1
+      iid = "V{:X}".format(self._counter)
+      while iid in self._items:
+        self._counter += 1
+        iid = "V{:X}".format(self._counter)
+    elif iid in self._items:
+      raise tk.TclError("Item {} already exists".format(iid))
+    if parent not in self._items:
+      raise tk.TclError("Item {} not found".format(parent))
+    self._items[iid] = _Item(parent, kw)
+    self._attach(iid, parent, index)
+    self._invalidate()
+    return iid
+
+  def delete(self, *items):
+    for item in items:
+      if item not in self._items or item == "":
+        continue
+      self._detach(item)
+      stack = [item]
+      while stack:
+        current = stack.pop()
+        node = self._items.pop(current)
+        stack.extend(node.children)
+        if current in self._materialized:
+          self._materialized.discard(current)
+          if super().exists(current):
+            super().delete(current)
+      if self._focus not in self._items:
+        self._focus = ""
+    self._selection = tuple(i for i in self._selection if i in self._items)
+    self._invalidate()
+
+  def detach(self, *items):
+    for item in items:
+      self._detach(item)
+    self._invalidate()
+
+  def move(self, item: str, parent: str, index):
+    self._detach(item)
+    self._attach(item, parent, index)
+    self._invalidate()
+
+  reattach = move
+
+  def set_children(self, item: str, *newchildren):
+    node = self._items[item]
+    keep = set(newchildren)
+    for child in node.children:
+      if child not in keep:
+        self._items[child].parent = None
+    for child in newchildren:
+      oldParent = self._items[child].parent
+      if oldParent is not None and oldParent != item:
+        self._items[oldParent].children.remove(child)
+      self._items[child].parent = item
+    node.children = list(newchildren)
+    self._invalidate()
+
+  def get_children(self, item: str = None) -> Tuple[str, ...]:
+    return tuple(self._items[item or ""].children)
+
+  def exists(self, item: str) -> bool:
+    return item in self._items
+
+  def parent(self, item: str) -> str:
+    return self._items[item].parent or ""
+
+  def index(self, item: str) -> int:
+    parent = self._items[item].parent
+    if parent is None:
+      return 0
+    return self._items[parent].children.index(item)
+
+  def item(self, item: str, option: str = None, **kw):
+    node = self._items[item]
+    if option is not None:
+      if option == "open":
+        return node.open
+      return node.options.get(option, "")
+    if len(kw) == 0:
+      return {**node.options, "open": node.open}
+
+    if "open" in kw:
+      isOpen = bool(kw.pop("open"))
+      if isOpen != node.open:
+        node.open = isOpen
+        self._invalidate()
+    node.options.update(kw)
+    if item in self._materialized and len(kw):
+      super().item(item, **kw)
+    return None
+
+  def focus(self, item: str = None):
+    if item is None:
+      return self._focus
+    self._focus = item
+    if item in self._materialized:
+      super().focus(item)
+    return None
+
+  def selection(self) -> Tuple[str, ...]:
+    return self._selection
+
+  def selection_set(self, *items):
+    if len(items) == 1 and isinstance(items[0], (list, tuple)):
+      items = tuple(items[0])
+    items = tuple(i for i in items if i in self._items)
+    if items == self._selection:
+      return
+    self._selection = items
+    self._forcedSelectEvents += 1
+    self._applySelection()
+    self.event_generate("<<TreeviewSelect>>", when="tail")
+
+  def selection_add(self, *items):
+    self.selection_set(self._selection + tuple(items))
+
+  def selection_remove(self, *items):
+    self.selection_set(*(i for i in self._selection if i not in items))
+
+  def _detach(self, item: str):
+    node = self._items.get(item)
+    if node is None or node.parent is None:
+      return
+    self._items[node.parent].children.remove(item)
+    node.parent = None
+
+  def _attach(self, item: str, parent: str, index):
+    children = self._items[parent].children
+    if index == tk.END or int(index) >= len(children):
+      children.append(item)
+    else:
+      children.insert(max(0, int(index)), item)
+    self._items[item].parent = parent
+
+  # ---------------------------------------------------------------------------
+  # materializing
+
+  def _invalidate(self, structure: bool = True):
+    """Schedules a refresh of the shown rows"""
+    if structure:
+      self._rows = None
+    if not self._refreshPending:
+      self._refreshPending = True
+      self.after_idle(self._refresh)
+
+  def _visibleRows(self) -> List[str]:
+    if self._rows is None:
+      rows = []
+      stack = list(reversed(self._items[""].children))
+      while stack:
+        item = stack.pop()
+        rows.append(item)
+        node = self._items[item]
+        if node.open and node.children:
+          stack.extend(reversed(node.children))
+      self._rows = rows
+      self._rowIndex = {item: i for i, item in enumerate(rows)}
+    return self._rows
+
+  def _ancestors(self, item: str) -> List[str]:
+    ancestors = []
+    parent = self._items[item].parent
+    while parent:
+      ancestors.append(parent)
+      parent = self._items[parent].parent
+    ancestors.reverse()
+    return ancestors
+
+  def _refresh(self):
+    """Inserts the rows that should be shown and removes all other ones"""
+    self._refreshPending = False
+    if not self.winfo_exists():
+      return
+    rows = self._visibleRows()
+    height = self._height()
+    self._first = max(0, min(self._first, len(rows) - height))
+
+    # one more row than shown, so that an open parent in the last row already
+    # has its first child inserted and is drawn as opened
+    window = rows[self._first:self._first + height + 1]
+    if len(window):
+      ancestors = self._ancestors(window[0])
+      if len(ancestors):
+        window = ancestors + window[:len(window) - len(ancestors)]
+    wanted = set(window)
+
+    for item in self._placeholders:
+      if super().exists(item):
+        super().delete(item)
+    self._placeholders = []
+
+    for item in list(self._materialized):
+      if item not in wanted:
+        self._materialized.discard(item)
+        if super().exists(item):
+          super().delete(item)
+    # items that were moved to another parent in the meantime could have been
+    # deleted together with their previous parent
+    self._materialized = {
+      item for item in self._materialized if super().exists(item)
+    }
+
+    childrenByParent: Dict[str, List[str]] = {}
+    for item in window:
+      node = self._items[item]
+      if item not in self._materialized:
+        super().insert(node.parent, tk.END, iid=item, **node.options)
+        self._materialized.add(item)
+      super().item(item, open=node.open)
+      childrenByParent.setdefault(node.parent, []).append(item)
+      if node.children and not node.open:
+        # give the closed parent a hidden child so that it can be opened
+        placeholder = "{}\x1fplaceholder".format(item)
+        super().insert(item, tk.END, iid=placeholder)
+        self._placeholders.append(placeholder)
+    for parent, children in childrenByParent.items():
+      if parent and not self._items[parent].open:
+        continue
+      super().set_children(parent, *children)
+
+    self._applySelection()
+    if self._focus in self._materialized:
+      super().focus(self._focus)
+    super().yview_moveto(0)
+    self._updateScrollbar()
+
+  def _applySelection(self):
+    shown = tuple(i for i in self._selection if i in self._materialized)
+    if set(super().selection()) != set(shown):
+      self._reappliedSelectEvents += 1
+      super().selection_set(shown)
@@ -0,0 +1,325 @@
+"""
+Runs models on the events of a catalog. The events go through the stages
+lookup (data file URLs), download, decode, fit and export, each in its own
+thread. The stages are connected by bounded queues, so that the download of
+the next events overlaps the fit of the current one.
+
+The catalog is a CSV file with the columns
+
+observatory
+    Name of the observatory
+datasets
+    Dataset ids separated by ";"
+variables
+    Selected variables separated by ";" as "Category=dataset/variable" or
+    "Category=dataset/variable/Bfield", e.g.
+    "Magnetic Field=AC_H0_MFI/BGSEc/vector". The categories are the keys of
+    `StateSelectedVars`
+selectionStart, selectionEnd
+    ISO dates of the flux rope
+startDate, endDate (optional)
+    ISO dates of the downloaded data. Default: the selection with
+    batchDataMargin days before and after
+"""
+import csv
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+import os.path as path
+import re
+from astropy.time import Time, TimeDelta
+from queue import Queue
+from threading import Thread
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from . import decodedData
+from .constants import batchDataMargin, batchQueueSize
+from .headless import (
+  getDatasetVariables,
+  getFileDescription,
+  getModelFileName,
+  loadCDF,
+  runModel,
+  saveModelResults
+)
+from .State import Model, State, StateSelectedVars
+
+requiredColumns = [
+  "observatory", "datasets", "variables", "selectionStart", "selectionEnd"
+]
+
+
+@dataclass
+class BatchEvent:
+  id: str
+  state: State
+  # row in the catalog file, only for messages
+  row: int
+  # dataset id: file descriptions from CDAS
+  fileDescriptions: Dict[str, List[Dict[str, Any]]] = field(
+    default_factory=dict
+  )
+  # model name: fitted instance
+  instances: Dict[str, Model] = field(default_factory=dict)
+  # model name: error
+  modelErrors: Dict[str, str] = field(default_factory=dict)
+  # paths of the written results
+  results: List[str] = field(default_factory=list)
+  error: str = None
+
+
+def parseVariables(text: str) -> Dict[str, List[Dict[str, str]]]:
+  selectedVars: Dict[str, List[Dict[str, str]]] = {}
+  for entry in filter(None, (i.strip() for i in text.split(";"))):
+    category, _, variable = entry.partition("=")
+    category = category.strip()
+    parts = variable.strip().split("/")
+    if category not in StateSelectedVars.keys or len(parts) not in [2, 3]:
+      raise ValueError(f"Invalid variable \"{entry}\"")
+    selectedVars.setdefault(category, []).append({
+      "dataset": parts[0],
+      "variable": parts[1],
+      "Bfield": parts[2] if len(parts) == 3 else None
+    })
+  return selectedVars
+
+
+def getEventId(row: Dict[str, str]) -> str:
+  """
+  Identifies the event in the checkpoint and the names of its results. It
+  depends only on the values of the event, so that it doesn't change when
+  rows of the catalog are inserted, removed or sorted.
+  """
+  values = [
+    (row.get(column) or "").strip() for column in requiredColumns +
+    ["startDate", "endDate"]
+  ]
+  digest = hashlib.sha256(json.dumps(values).encode()).hexdigest()[:8]
+  return "_".join(
+    re.sub(r"\W+", "-", (row[column] or "").strip()).strip("-")
+    for column in ["observatory", "selectionStart", "selectionEnd"]
+  ) + "_" + digest
+
+
+def readCatalog(catalogPath: str) -> List[BatchEvent]:
+  """Reads the events of the catalog or raises a ValueError"""
+  with open(catalogPath, "r", newline="") as file:
+    reader = csv.DictReader(file)
+    missing = [i for i in requiredColumns if i not in (reader.fieldnames or [])]
+    if len(missing) > 0:
+      raise ValueError(f"The catalog has no column(s) {', '.join(missing)}")
+    rows = list(reader)
+
+  margin = TimeDelta(batchDataMargin, format="jd")
+  events = []
+  for index, row in enumerate(rows):
+    try:
+      selectionStart = Time(row["selectionStart"].strip())
+      selectionEnd = Time(row["selectionEnd"].strip())
+      datasets = [i.strip() for i in row["datasets"].split(";") if i.strip()]
+      state = State({
+        "observatory": row["observatory"].strip(),
+        "startDate": (
+          Time(row["startDate"].strip()) if row.get("startDate") else
+          selectionStart - margin
+        ).iso,
+        "endDate": (
+          Time(row["endDate"].strip()) if row.get("endDate") else
+          selectionEnd + margin
+        ).iso,
+        "datasets": [{"id": i, "label": i} for i in datasets],
+        "selectedVars": parseVariables(row["variables"]),
+        "selectionStart": selectionStart.iso,
+        "selectionEnd": selectionEnd.iso
+      })
+    except ValueError as e:
+      raise ValueError(f"Row {index + 2} of the catalog: {e}")
+    if state.selectedVars is None or state.datasets is None:
+      raise ValueError(f"Row {index + 2} of the catalog: invalid values")
+    event = BatchEvent(getEventId(row), state, index + 2)
+    # rows with the same values would write the same results
+    if all(i.id != event.id for i in events):
+      events.append(event)
+  return events
+
+
+def loadCheckpoint(checkpointPath: str) -> Dict[str, Dict[str, Any]]:
+  """Returns event id: {results, error} of the finished events"""
+  if checkpointPath is None or not path.isfile(checkpointPath):
+    return {}
+  with open(checkpointPath, "r") as file:
+    return json.load(file).get("events", {})
+
+
+def saveCheckpoint(checkpointPath: str, events: Dict[str, Dict[str, Any]]):
+  # written to a temporary file first, so that an interruption doesn't
+  # leave a broken checkpoint
+  temporaryPath = checkpointPath + ".tmp"
+  with open(temporaryPath, "w") as file:
+    json.dump({"events": events}, file, indent=2)
+  os.replace(temporaryPath, checkpointPath)
+
+
+def lookupStage(event: BatchEvent):
+  for dataset, variables in getDatasetVariables(event.state).items():
+    fileDescription = getFileDescription(event.state, dataset, variables)
+    event.fileDescriptions[dataset] = (
+      fileDescription
+      if isinstance(fileDescription, list) else [fileDescription]
+    )
+
+
+def downloadStage(event: BatchEvent):
+  event.state.datasetCDFInstances = {}
+  for dataset, fileDescriptions in event.fileDescriptions.items():
+    # like on the download page, the last file of a dataset is used, so
+    # only that one is loaded
+    event.state.datasetCDFInstances[dataset] = loadCDF(fileDescriptions[-1])
+
+
+def decodeStage(event: BatchEvent):
+  """Decodes the selected variables into the cache used by State.getData"""
+  for selectedVars in event.state.selectedVars.values():
+    for var in selectedVars:
+      cdf = event.state.datasetCDFInstances[var.dataset]
+      attrs = cdf.varattsget(var.variable)
+      decodedData.varget(cdf, var.variable)
+      decodedData.epochs(cdf, attrs["DEPEND_0"] or "epoch")
+
+
+def runStage(
+  name: str,
+  function: Callable[[BatchEvent], None],
+  inQueue: Queue,
+  outQueue: Queue
+):
+  """
+  Processes the events of inQueue until it gets None. Events that failed in
+  an earlier stage are passed on unchanged.
+  """
+  while True:
+    event: BatchEvent = inQueue.get()
+    if event is None:
+      outQueue.put(None)
+      return
+    if event.error is None:
+      try:
+        function(event)
+      except Exception as e:
+        event.error = f"{name}: {e}"
+    outQueue.put(event)
+
+
+def runBatch(
+  catalogPath: str,
+  modelTypes: List[Type[Model]],
+  outputDir: str,
+  checkpointPath: str = None,
+  retryFailed: bool = False,
+  onStatus: Callable[[str], None] = print,
+  configure: Callable[[Model, str], None] = None
+) -> List[Tuple[str, str, str]]:
+  """
+  Runs the models on the events of the catalog and writes the results to
+  outputDir/EVENT.MODEL.json/npz. Events that are finished according to the
+  checkpoint are skipped, the checkpoint is updated after each event.
+  Returns (event and model, result path, error) of the processed events.
+
+  Parameters
+  ----------
+  configure : Callable[[Model, str], None]
+      Called with each model instance and the base path of its results
+      before it runs
+  """
+  events = readCatalog(catalogPath)
+  finished = loadCheckpoint(checkpointPath)
+  pending = [
+    event for event in events if event.id not in finished or
+    (retryFailed and finished[event.id]["error"] is not None)
+  ]
+  onStatus(
+    f"{len(events) - len(pending)} of {len(events)} events already finished"
+  )
+
+  def getBasePath(event: BatchEvent, modelType: Type[Model]) -> str:
+    return path.join(outputDir, f"{event.id}.{getModelFileName(modelType)}")
+
+  def fitStage(event: BatchEvent):
+    for modelType in modelTypes:
+      instance, error = runModel(
+        modelType,
+        event.state,
+        lambda progress, status: None,
+        None if configure is None else
+        lambda instance: configure(instance, getBasePath(event, modelType))
+      )
+      if error is None:
+        event.instances[modelType.name] = instance
+      else:
+        event.modelErrors[modelType.name] = str(error)
+
+  def exportStage(event: BatchEvent):
+    try:
+      for modelType in modelTypes:
+        if modelType.name in event.instances:
+          event.results += saveModelResults(
+            event.instances[modelType.name], getBasePath(event, modelType)
+          )
+    finally:
+      event.instances = {}
+      event.state.closeCDFFiles()
+
+  stages = [
+    ("lookup", lookupStage),
+    ("download", downloadStage),
+    ("decode", decodeStage),
+    ("fit", fitStage),
+    ("export", exportStage)
+  ]
+  queues = [Queue(maxsize=batchQueueSize) for _ in range(len(stages) + 1)]
+  for i, (name, function) in enumerate(stages):
+    Thread(
+      target=runStage,
+      args=(name, function, queues[i], queues[i + 1]),
+      daemon=True
+    ).start()
+
+  def feed():
+    for event in pending:
+      queues[0].put(event)
+    queues[0].put(None)
+
+  Thread(target=feed, daemon=True).start()
+
+  results = []
+  done = len(events) - len(pending)
+  while True:
+    event: BatchEvent = queues[-1].get()
+    if event is None:
+      break
+    done += 1
+    errors = [f"{model}: {error}" for model, error in event.modelErrors.items()]
+    if event.error is not None:
+      errors.insert(0, event.error)
+    finished[event.id] = {
+      "results": event.results,
+      "error": "; ".join(errors) if len(errors) > 0 else None
+    }
+    if checkpointPath is not None:
+      saveCheckpoint(checkpointPath, finished)
+    onStatus(
+      f"[{done}/{len(events)}] row {event.row} {event.id}: "
+      + (finished[event.id]["error"] or "done")
+    )
+
+    if event.error is not None:
+      event.state.closeCDFFiles()
+      results.append((event.id, None, event.error))
+    for modelType in modelTypes:
+      name = f"{event.id} [{modelType.name}]"
+      if modelType.name in event.modelErrors:
+        results.append((name, None, event.modelErrors[modelType.name]))
+      elif event.error is None:
+        results.append((name, getBasePath(event, modelType) + ".json", None))
+  return results
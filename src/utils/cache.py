@@ -1,9 +1,10 @@
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Thread
 from typing import List, Callable, Any, TypeVar, Generic, Union
 
-from .constants import requestMaxRetries, cacheFolder
+from .constants import requestMaxRetries, maxParallelRequests, cacheFolder
 
 globalCache = {}
 
@@ -23,7 +24,9 @@ class Cache(Generic[T]):
     onError: Callable[[], Any] = None,
     beforeRequest: Callable[[], Any] = None,
     processResponse: Callable[[TOptList], TOptList] = None,
-    reload: bool = False
+    reload: bool = False,
+    parallel: bool = False,
+    onPartialResponse: Callable[[int, T], None] = None
   ) -> None:
     """
     Gets the data from either the cache synchronously or loads it
@@ -51,6 +54,14 @@ class Cache(Generic[T]):
     reload
       When False (default), tries to read from cache and then executes the
       requests if reading failed. When True ignores the cache.
+    parallel
+      When True, the requests are executed concurrently instead of one after
+      another. The responses are still passed in the order of the requests to
+      processResponse and onDone
+    onPartialResponse
+      Called with the index of the request and its response as soon as a
+      single request has finished (new thread, may be called concurrently).
+      Not called when the data was loaded from cache
     """
     global globalCache
     wasNoList = False
@@ -58,24 +69,51 @@ class Cache(Generic[T]):
       requests = [requests]
       wasNoList = True
 
-    def load():
-      responses = []
-      for request in requests:
-        res = None
+    def execute(index: int):
+      res = None
+      err = False
+      for i in range(requestMaxRetries):
         err = False
-        for i in range(requestMaxRetries):
-          err = False
-          try:
-            res = request()
-            break
-          except Exception as e:
-            err = e
-
-        if err and onError:
-          onError(err)
-          return
-
-        responses.append(res)
+        try:
+          res = requests[index]()
+          break
+        except Exception as e:
+          err = e
+
+      if err and onError:
+        raise err
+      if onPartialResponse:
+        onPartialResponse(index, res)
+      return res
+
+    def loadSequential():
+      return [execute(i) for i in range(len(requests))]
+
+    def loadParallel():
+      responses = [None] * len(requests)
+      with ThreadPoolExecutor(
+          max_workers=max(1, min(maxParallelRequests, len(requests)))
+      ) as executor:
+        futures = {
+          executor.submit(execute, i): i
+          for i in range(len(requests))
+        }
+        try:
+          for future in as_completed(futures):
+            responses[futures[future]] = future.result()
+        except Exception:
+          for future in futures:
+            future.cancel()
+          raise
+      return responses
+
+    def load():
+      try:
+        responses = loadParallel() if parallel else loadSequential()
+      except Exception as e:
+        if onError:
+          onError(e)
+        return
 
       if len(responses) == 1 and wasNoList:
         responses = responses[0]
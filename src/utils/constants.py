@@ -8,9 +8,56 @@ from dataclasses import dataclass
 padding = 6
 navigationButtonInnerPadding = 8
 requestCheckInterval = 250    # ms
+cursorUpdateInterval = 16    # ms, about one frame
 requestMaxRetries = 1
+maxParallelRequests = 4
 doubleClickTime = 500    # ms
 minDragDistanceForDraggingInPlot = 10    # px, set to `0` to disable
+# number of blocks aggregated into one block of the next pyramid level
+pyramidFactor = 4
+# time series with less samples are plotted without pyramid
+pyramidMinSamples = 100000
+# memory for decoded CDF variables shared between figures of the same file
+decodedDataMaxBytes = 256 * 1024 * 1024
+# fraction of the visible height, which is drawn above and below the visible
+# panels of a PanelFigure
+panelRenderMargin = 0.5
+# memory for plot figures kept to show them again when revisiting the page
+figureCacheMaxBytes = 512 * 1024 * 1024
+# events a stage of the batch pipeline can be ahead of the next one
+batchQueueSize = 2
+# days of data downloaded before and after the selection of a catalog event
+batchDataMargin = 0.5
+# samples of each window of the flux rope scan, the data is averaged onto them
+scanSamples = 64
+# degrees between the orientations that are tried by the flux rope scan
+scanAngleStep = 5
+# windows fitted at once, limits the memory to about 3 * 8 bytes * chunk *
+# (360 / scanAngleStep)^2
+scanWindowsPerChunk = 256
+# windows with less valid values are skipped
+scanMinValidFraction = 0.5
+scanMaxCandidates = 10
+# defaults of the flux rope scan on the plot page
+scanDefaultWindow = 12    # hours
+scanDefaultStride = 30    # minutes
+# default window of the rolling statistics panels on the plot page
+statisticsDefaultWindow = 1    # hours
+# the orientation of the minimum variance analysis is used as initial
+# orientation of the models when the intermediate to minimum eigenvalue ratio
+# is at least this
+mvaMinEigenvalueRatio = 2
+# degrees searched around the initial orientation, a tenth of the full circle
+# so that a tenth of the points keeps the resolution
+mvaAngleRange = 36
+# degrees between the orientations tried to match the eigenvectors
+mvaAngleStep = 1
+# the result of the previous run of a model is used as initial guess when the
+# selections overlap by at least this fraction of the longer one
+warmStartMinOverlap = 0.5
+# fraction of the search ranges and points that is searched around the
+# previous result
+warmStartRangeFraction = 0.1
 cacheFolder = "./cache/"
 cacheFolderNotFolder = False
 try:
@@ -35,6 +82,19 @@ optionalVariables = [
   "Temperature"
 ]
 
+# words that are searched in the variable names and descriptions to suggest
+# variables for each of the variables above
+variableSuggestionTerms = {
+  "Magnetic Field": "magnetic field imf bgse bgsm bfield",
+  "Plasma Beta": "plasma beta",
+  "Plasma Pressure": "plasma pressure",
+  "Particle Density": "density proton ion",
+  "Particle Speed": "speed velocity bulk flow",
+  "Temperature": "temperature thermal"
+}
+# max number of variables highlighted as suggestion per variable
+maxVariableSuggestions = 5
+
 @dataclass
 class ImageCheckbox:
   empty: tk.PhotoImage = None
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from os import path
+from threading import Lock
+from astropy.time import Time
+import cdflib
+import numpy as np
+from typing import Any, Callable, Hashable, Union
+
+from .constants import decodedDataMaxBytes
+from .utils import getCDFPath
+
+# milliseconds from 0000-01-01 (CDF_EPOCH) to 1970-01-01
+cdfEpochUnixOffset = 62167219200000
+
+# least recently used first, the values are (data, size in bytes)
+_data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+_lock = Lock()
+
+
+def getKey(cdf, variable: str, kind: str) -> Hashable:
+  """
+  Identifies the variable by the path and modification time of the file,
+  so that the CDF instances of different sessions share the decoded data
+  """
+  cdfPath = getCDFPath(cdf)
+  try:
+    mtime = path.getmtime(cdfPath)
+  except OSError:
+    mtime = None
+  return (cdfPath, mtime, variable, kind)
+
+
+def _get(key: Hashable):
+  with _lock:
+    if key not in _data:
+      return None
+    _data.move_to_end(key)
+    return _data[key][0]
+
+
+def _put(key: Hashable, data, size: int):
+  with _lock:
+    _data[key] = (data, size)
+    _data.move_to_end(key)
+    total = sum(size for _, size in _data.values())
+    while total > decodedDataMaxBytes and len(_data) > 1:
+      _, (_, removedSize) = _data.popitem(last=False)
+      total -= removedSize
+
+
+def varget(cdf, variable: str) -> np.ndarray:
+  """
+  Same as `cdf.varget(variable)`, but keeps the data of recently read
+  variables. The returned array is shared, so copy it before modifying it.
+  """
+  key = getKey(cdf, variable, "data")
+  data = _get(key)
+  if data is None:
+    data = np.asarray(cdf.varget(variable))
+    _put(key, data, data.nbytes)
+  return data
+
+
+def epochs(cdf, variable: str) -> Time:
+  """
+  Reads the epoch variable and converts it to an astropy Time like
+  `cdflib.cdfastropy.convert_to_astropy`. CDF_EPOCH values are converted
+  with numpy instead of astropy, which is a lot faster for long time series.
+  """
+  key = getKey(cdf, variable, "epochs")
+  time = _get(key)
+  if time is None:
+    values = varget(cdf, variable)
+    if values.dtype == np.float64:
+      time = Time(
+        datetime64s(cdf, variable), format="datetime64", precision=9
+      )
+    else:
+      time = cdflib.cdfastropy.convert_to_astropy(values)
+    _put(key, time, len(time) * 16)
+  return time
+
+
+def datetime64s(cdf, variable: str) -> np.ndarray:
+  """Reads the epoch variable as datetime64[ns] array"""
+  key = getKey(cdf, variable, "datetime64")
+  times = _get(key)
+  if times is None:
+    values = varget(cdf, variable)
+    if values.dtype == np.float64:
+      times = cdfEpochToDatetime64(values)
+    else:
+      times = epochs(cdf, variable).datetime64.astype("datetime64[ns]")
+    _put(key, times, times.nbytes)
+  return times
+
+
+def derived(
+  cdf,
+  variable: str,
+  kind: str,
+  compute: Callable[[], Any],
+  getSize: Callable[[Any], int]
+):
+  """
+  Returns the value computed from the variable, e.g. statistics over its
+  data. It is kept together with the decoded data and computed only if it
+  isn't cached. kind identifies the value and its parameters.
+  """
+  key = getKey(cdf, variable, kind)
+  value = _get(key)
+  if value is None:
+    value = compute()
+    _put(key, value, getSize(value))
+  return value
+
+
+def cdfEpochToDatetime64(values: Union[np.ndarray, float]) -> np.ndarray:
+  """Converts CDF_EPOCH values (ms since 0000-01-01) to datetime64[ns]"""
+  # rounded to microseconds, which float64 can represent exactly for the
+  # time since 1970
+  micros = np.round(
+    (np.asarray(values, dtype=np.float64) - cdfEpochUnixOffset) * 1000
+  )
+  return micros.astype(np.int64).astype("datetime64[us]").astype(
+    "datetime64[ns]"
+  )
+
+
+def datetime64ToCdfEpoch(values: np.ndarray) -> np.ndarray:
+  """Converts datetime64 values to CDF_EPOCH (ms since 0000-01-01)"""
+  micros = np.asarray(values).astype("datetime64[us]").astype(np.int64)
+  return micros / 1000 + cdfEpochUnixOffset
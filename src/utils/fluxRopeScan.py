@@ -0,0 +1,195 @@
+"""
+Slides windows over the whole downloaded interval and fits the Lundquist
+model to each of them to find flux rope candidates.
+
+The magnetic field is resampled once onto a common grid with scanSamples
+samples per window, so that all windows are views into the same array. For
+each orientation of the angle grid, the rotated model field with B0 = 1 is
+precomputed (the bases). The best B0 of a window and orientation has a closed
+form, so the misfit of all windows and orientations is computed with two
+matrix products per chunk of windows.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+import numpy as np
+from typing import Callable, List, Tuple
+
+from .constants import (
+  scanAngleStep,
+  scanMaxCandidates,
+  scanMinValidFraction,
+  scanSamples,
+  scanWindowsPerChunk
+)
+from .resampling import cadenceEpochs
+from .State import State
+
+
+@dataclass
+class ScanResult:
+  # datetime64 of the first and last sample of each window
+  start: np.ndarray
+  end: np.ndarray
+  # normalized squared difference of model and data like the Lundquist
+  # model, NaN for windows with too few samples
+  misfit: np.ndarray
+  B0: np.ndarray
+  theta: np.ndarray
+  phi: np.ndarray
+  # indices of the best windows that don't overlap, best first
+  candidates: List[int] = field(default_factory=list)
+
+
+def rotationMatrices(theta: np.ndarray, phi: np.ndarray) -> np.ndarray:
+  """
+  Returns the matrices of `src.models.Lundquist.utils.rotation` for the
+  angles in degrees with shape (len(theta), 3, 3)
+  """
+  theta = np.radians(theta)
+  phi = np.radians(phi)
+  ct, st = np.cos(theta), np.sin(theta)
+  cp, sp = np.cos(phi), np.sin(phi)
+  zeros = np.zeros_like(theta)
+  # yapf: disable
+  return np.stack([
+    np.stack([ct, st, zeros], axis=-1),
+    np.stack([-cp * st, cp * ct, sp], axis=-1),
+    np.stack([sp * st, -sp * ct, cp], axis=-1)
+  ], axis=-2)
+  # yapf: enable
+
+
+@lru_cache(maxsize=4)
+def getBases(samples: int, angleStep: float) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  Returns the angles (theta, phi) of the grid with shape (n, 2) and the
+  rotated Lundquist field with B0 = 1 at samples points through the axis for
+  each of them, flattened to shape (n, samples * 3). The arrays are shared.
+  """
+  import scipy.special
+  r = np.linspace(-1, 1, samples)
+  # Br is 0, so only Bphi and Bz are rotated
+  unitField = np.stack([
+    scipy.special.j1(2.41 * r), scipy.special.j0(2.41 * r)
+  ])
+  angles = np.arange(0, 360, angleStep)
+  theta, phi = (i.ravel() for i in np.meshgrid(angles, angles, indexing="ij"))
+  matrices = rotationMatrices(theta, phi)[:, :, 1:]
+  bases = np.einsum("aij,jn->ani", matrices, unitField)
+  return np.stack([theta, phi], axis=-1), bases.reshape(len(theta), -1)
+
+
+def fitWindows(
+  windows: np.ndarray, angleStep: float = scanAngleStep
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+  """
+  Fits the Lundquist model to each window at once
+
+  Parameters
+  ----------
+  windows : np.ndarray
+      The magnetic field with shape (windows, samples, 3), NaN for missing
+      values
+
+  Returns
+  -------
+  misfit, B0, theta, phi : np.ndarray
+      The best fit of each window. The misfit is NaN for windows with less
+      than scanMinValidFraction valid values
+  """
+  angles, bases = getBases(windows.shape[1], angleStep)
+  data = windows.reshape(len(windows), -1)
+  valid = ~np.isnan(data)
+  data = np.where(valid, data, 0)
+  dataSquared = np.sum(data**2, axis=1)
+  dataModel = data @ bases.T
+  # only the samples with data count for the norm of the model
+  modelSquared = valid.astype(float) @ (bases**2).T
+  B0 = np.clip(
+    np.divide(
+      dataModel,
+      modelSquared,
+      out=np.zeros_like(dataModel),
+      where=modelSquared > 0
+    ),
+    0,
+    None
+  )
+  residual = dataSquared[:, None] - 2 * B0 * dataModel + B0**2 * modelSquared
+  best = np.argmin(residual, axis=1)
+  rows = np.arange(len(windows))
+  misfit = np.full(len(windows), np.nan)
+  enough = (np.mean(valid, axis=1) >= scanMinValidFraction) & (dataSquared > 0)
+  misfit[enough] = residual[rows, best][enough] / dataSquared[enough]
+  return misfit, B0[rows, best], angles[best, 0], angles[best, 1]
+
+
+def getCandidates(
+  start: np.ndarray, end: np.ndarray, misfit: np.ndarray, count: int
+) -> List[int]:
+  """Returns the indices of the best windows that don't overlap each other"""
+  candidates: List[int] = []
+  for i in np.argsort(misfit):
+    if len(candidates) >= count or np.isnan(misfit[i]):
+      break
+    if all(end[i] < start[j] or start[i] > end[j] for j in candidates):
+      candidates.append(int(i))
+  return candidates
+
+
+def scanState(
+  state: State,
+  duration: np.timedelta64,
+  stride: np.timedelta64,
+  onProgress: Callable[[float], None] = None,
+  isCanceled: Callable[[], bool] = None
+) -> ScanResult:
+  """
+  Scans the downloaded interval of the state with windows of duration every
+  stride. The stride is rounded to a multiple of the sample spacing.
+  Returns None when canceled.
+  """
+  duration = np.timedelta64(duration, "ns")
+  spacing = duration // (scanSamples - 1)
+  if spacing <= np.timedelta64(0, "ns"):
+    raise ValueError("The window is too short")
+  step = max(1, int(round(np.timedelta64(stride, "ns") / spacing)))
+  grid = cadenceEpochs(
+    state.startDate.datetime64, state.endDate.datetime64, spacing
+  )
+  if len(grid) < scanSamples:
+    raise ValueError("The window is longer than the downloaded data")
+
+  # decoded once and averaged over the bins of the grid for all windows
+  components = [
+    state.getData("mag", dir, resampleTo=grid, method="mean")
+    for dir in ["x", "y", "z"]
+  ]
+  if any(i is None for i in components):
+    raise ValueError("Not all magnetic field components found")
+  data = np.stack(components, axis=-1)
+  windows = np.lib.stride_tricks.sliding_window_view(
+    data, scanSamples, axis=0
+  )[::step]
+  starts = np.arange(0, len(grid) - scanSamples + 1, step)
+
+  results = []
+  for chunk in range(0, len(windows), scanWindowsPerChunk):
+    if isCanceled is not None and isCanceled():
+      return None
+    if onProgress is not None:
+      onProgress(chunk / len(windows))
+    # sliding_window_view puts the window axis last
+    results.append(
+      fitWindows(
+        np.swapaxes(windows[chunk:chunk + scanWindowsPerChunk], 1, 2)
+      )
+    )
+  misfit, B0, theta, phi = (np.concatenate(i) for i in zip(*results))
+  result = ScanResult(
+    grid[starts], grid[starts + scanSamples - 1], misfit, B0, theta, phi
+  )
+  result.candidates = getCandidates(
+    result.start, result.end, misfit, scanMaxCandidates
+  )
+  return result
@@ -0,0 +1,218 @@
+"""
+The steps of the GUI pages without Tk: downloading the data files of a
+session and running models on it
+"""
+from astropy.time import TimezoneInfo
+from astropy.units import hour as unitHour
+from dataclasses import asdict, is_dataclass
+import json
+import numpy as np
+import os.path as path
+import re
+from threading import Event
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from . import CDFCache
+from .constants import cdas
+from .importAllModels import importAllModels
+from .State import Model, State
+
+# attributes of the model instances that are not results
+ignoredModelAttributes = {"canceled", "hasResults", "hasSettings"}
+
+
+def getDatasetVariables(state: State) -> Dict[str, List[str]]:
+  """Returns the selected variables of each dataset like the download page"""
+  datasetVariables = {}
+  for dataset in state.datasets:
+    variables = [
+      v.variable
+      for var in state.selectedVars.values()
+      for v in var
+      if v.dataset == dataset.id
+    ]
+    if len(variables) > 0:
+      datasetVariables[dataset.id] = variables
+  return datasetVariables
+
+
+def getFileDescription(
+  state: State, dataset: str, variables: List[str]
+) -> Dict[str, Any]:
+  """Asks CDAS for the data file of the dataset in the time range of state"""
+  utcTimezone = TimezoneInfo(utc_offset=0 * unitHour)
+  status, result = cdas.get_data_file(
+    dataset,
+    variables,
+    state.startDate.to_datetime(timezone=utcTimezone),
+    state.endDate.to_datetime(timezone=utcTimezone)
+  )
+  if not 200 <= status < 300:
+    raise RuntimeError(f"Could not get the data file of {dataset}: {status}")
+  return result["FileDescription"]
+
+
+def loadCDF(fileDescription: Dict[str, Any]):
+  """
+  Same as `CDFCache.get`, but waits for the download and returns the CDF or
+  raises the error
+  """
+  done = Event()
+  result = {}
+
+  def onDone(fromCache, cdf):
+    result["cdf"] = cdf
+    done.set()
+
+  def onError(error):
+    result["error"] = error
+    done.set()
+
+  CDFCache.get(fileDescription, onDone, onError)
+  done.wait()
+  if "error" in result:
+    error = result["error"]
+    raise error if isinstance(error, Exception) else RuntimeError(str(error))
+  return result["cdf"]
+
+
+def ensureCDFFiles(state: State, onStatus: Callable[[str], None] = print):
+  """
+  Downloads the data files of the datasets in state that are not loaded yet
+  """
+  if state.datasetCDFInstances is None:
+    state.datasetCDFInstances = {}
+  for dataset, variables in getDatasetVariables(state).items():
+    if dataset in state.datasetCDFInstances:
+      continue
+    onStatus(f"Downloading {dataset}")
+    fileDescription = getFileDescription(state, dataset, variables)
+    if not isinstance(fileDescription, list):
+      fileDescription = [fileDescription]
+    # like on the download page, the last file of a dataset is used, so
+    # only that one is loaded
+    state.datasetCDFInstances[dataset] = loadCDF(fileDescription[-1])
+
+
+def getModels(names: List[str] = None) -> List[Type[Model]]:
+  """Returns the models with the names or raises a ValueError"""
+  models = importAllModels()
+  if names is None:
+    return models
+  byName = {model.name: model for model in models}
+  missing = [name for name in names if name not in byName]
+  if len(missing) > 0:
+    raise ValueError(
+      "Unknown model(s) {}. Available: {}".format(
+        ", ".join(missing), ", ".join(byName)
+      )
+    )
+  return [byName[name] for name in names]
+
+
+def runModel(
+  modelType: Type[Model],
+  state: State,
+  onStatus: Callable[[float, str], None],
+  configure: Callable[[Model], None] = None
+) -> Tuple[Model, str]:
+  """
+  Runs the model in the calling thread and returns the instance and the error
+  description or None
+
+  Parameters
+  ----------
+  onStatus : Callable[[float, str], None]
+      The statusCallback of the model
+  configure : Callable[[Model], None]
+      Called with the instance before it runs, e.g. to change its settings
+  """
+  instance = modelType()
+  canRun = instance.canRun()
+  if canRun != True:
+    return instance, canRun
+  if hasattr(instance, "initSettings"):
+    instance.initSettings(state)
+  if configure is not None:
+    configure(instance)
+
+  result = {}
+  try:
+    instance.run(
+      state.copy(),
+      onStatus,
+      lambda: result.setdefault("done", True),
+      lambda error: result.setdefault("error", str(error))
+    )
+  except Exception as e:
+    result.setdefault("error", str(e))
+  if "error" in result:
+    return instance, result["error"]
+  if "done" not in result:
+    return instance, "The model stopped without result"
+  return instance, None
+
+
+def getModelResults(
+  instance: Model
+) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+  """
+  Returns the values (JSON serializable) and arrays that the model stored on
+  its instance, e.g. the fitted parameters and the modeled field. Attributes
+  like figures and widgets are skipped. Dataclasses and dicts are flattened
+  to "name.field".
+  """
+  values = {}
+  arrays = {}
+
+  def add(name: str, value):
+    if is_dataclass(value) and not isinstance(value, type):
+      add(name, asdict(value))
+    elif isinstance(value, dict):
+      for key, val in value.items():
+        add(f"{name}.{key}", val)
+    elif isinstance(value, np.generic):
+      values[name] = value.item()
+    elif value is None or isinstance(value, (bool, int, float, str)):
+      values[name] = value
+    elif isinstance(value, (set, frozenset)):
+      values[name] = sorted(value, key=str)
+    elif isinstance(value, (np.ndarray, list, tuple)):
+      array = np.asarray(value)
+      if array.dtype.kind in "biufcSUM":
+        arrays[name] = array
+
+  for name, value in vars(instance).items():
+    if not name.startswith("_") and name not in ignoredModelAttributes:
+      add(name, value)
+  return values, arrays
+
+
+def getModelFileName(modelType: Type[Model]) -> str:
+  return re.sub(r"\W+", "_", modelType.name).strip("_")
+
+
+def saveModelResults(instance: Model, basePath: str) -> List[str]:
+  """
+  Writes the results of the model to basePath.json and the arrays to
+  basePath.npz and returns the written paths
+  """
+  values, arrays = getModelResults(instance)
+  values["model"] = instance.name
+  written = [basePath + ".json"]
+  with open(basePath + ".json", "w") as file:
+    json.dump(values, file, indent=2, default=str)
+  if len(arrays) > 0:
+    np.savez(basePath + ".npz", **arrays)
+    written.append(basePath + ".npz")
+  return written
+
+
+def getResultBasePath(
+  sessionPath: str, outputDir: str, modelType: Type[Model]
+) -> str:
+  name = path.splitext(path.basename(sessionPath))[0]
+  return path.join(
+    outputDir or path.dirname(sessionPath),
+    f"{name}.{getModelFileName(modelType)}"
+  )
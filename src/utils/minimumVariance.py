@@ -0,0 +1,126 @@
+"""
+Minimum variance analysis (MVA) of the magnetic field in the selection. For
+a flux rope, the field rotates in the plane of the maximum and intermediate
+variance direction, and the axis of the rope is about the intermediate
+variance direction.
+"""
+from dataclasses import dataclass
+import numpy as np
+from typing import Any, Tuple
+
+from .constants import mvaAngleRange, mvaAngleStep, mvaMinEigenvalueRatio
+from .fluxRopeScan import rotationMatrices
+
+
+@dataclass
+class MinimumVariance:
+  # minimum, intermediate and maximum eigenvalue of the covariance matrix
+  eigenvalues: np.ndarray
+  # unit eigenvectors as columns in the order of the eigenvalues. The
+  # intermediate one points along the mean field, the maximum one from the
+  # field at the start of the selection to the field at its end
+  eigenvectors: np.ndarray
+  intermediateToMinimum: float
+  maximumToIntermediate: float
+  # number of samples without NaN
+  samples: int
+
+  @property
+  def axis(self) -> np.ndarray:
+    """The estimated axis of the flux rope"""
+    return self.eigenvectors[:, 1]
+
+  @property
+  def wellDetermined(self) -> bool:
+    """True when the axis can be told apart from the minimum direction"""
+    return self.intermediateToMinimum >= mvaMinEigenvalueRatio
+
+
+def minimumVariance(
+  Bx: np.ndarray, By: np.ndarray, Bz: np.ndarray
+) -> MinimumVariance:
+  """
+  Calculates the eigenvalues and eigenvectors of the covariance matrix of
+  the field. Samples with a NaN component are left out. Raises a ValueError
+  for less than 3 samples.
+  """
+  field = np.stack([Bx, By, Bz], axis=-1)
+  field = field[~np.isnan(field).any(axis=1)]
+  if len(field) < 3:
+    raise ValueError("The minimum variance analysis needs at least 3 samples")
+  eigenvalues, eigenvectors = np.linalg.eigh(np.cov(field.T, bias=True))
+
+  # the sign of eigenvectors is arbitrary
+  if np.dot(np.mean(field, axis=0), eigenvectors[:, 1]) < 0:
+    eigenvectors[:, 1] *= -1
+  # the mean of each fifth of the samples, as single samples are noisy
+  edge = max(1, len(field) // 5)
+  change = np.mean(field[-edge:], axis=0) - np.mean(field[:edge], axis=0)
+  if np.dot(change, eigenvectors[:, 2]) < 0:
+    eigenvectors[:, 2] *= -1
+  # right-handed
+  eigenvectors[:, 0] = np.cross(eigenvectors[:, 1], eigenvectors[:, 2])
+
+  def ratio(numerator: float, denominator: float) -> float:
+    return float(numerator / denominator) if denominator > 0 else np.inf
+
+  return MinimumVariance(
+    eigenvalues=eigenvalues,
+    eigenvectors=eigenvectors,
+    intermediateToMinimum=ratio(eigenvalues[1], eigenvalues[0]),
+    maximumToIntermediate=ratio(eigenvalues[2], eigenvalues[1]),
+    samples=len(field)
+  )
+
+
+def getModelAngles(
+  mva: MinimumVariance, axialComponent: int, rotatingComponent: int
+) -> Tuple[float, float]:
+  """
+  Returns theta and phi in degrees, for which the `rotation` of the models
+  turns their axial field component along the axis and the component that
+  changes its sign across the rope along the maximum variance direction.
+  The angles are searched on a grid of mvaAngleStep degrees, as the rotation
+  of the models can't turn to every frame.
+
+  Parameters
+  ----------
+  axialComponent, rotatingComponent : int
+      Index of the components in the frame of the model (0: r, 1: phi, 2: z)
+  """
+  angles = np.arange(0, 360, mvaAngleStep)
+  theta, phi = (i.ravel() for i in np.meshgrid(angles, angles, indexing="ij"))
+  matrices = rotationMatrices(theta, phi)
+  score = (
+    matrices[:, :, axialComponent] @ mva.eigenvectors[:, 1]
+    + matrices[:, :, rotatingComponent] @ mva.eigenvectors[:, 2]
+  )
+  best = np.argmax(score)
+  return float(theta[best]), float(phi[best])
+
+
+def applyWarmStart(
+  settings: Any,
+  mva: MinimumVariance,
+  axialComponent: int,
+  rotatingComponent: int
+) -> bool:
+  """
+  Sets the initial orientation of the model settings to the orientation of
+  the MVA and narrows the angle search to mvaAngleRange with a tenth of the
+  points, if the MVA is well determined. Returns whether it was applied.
+
+  Parameters
+  ----------
+  settings
+      Settings of a model with initialTheta, initialPhi, angleRange and
+      nPointsAngles
+  """
+  if not mva.wellDetermined:
+    return False
+  settings.initialTheta, settings.initialPhi = getModelAngles(
+    mva, axialComponent, rotatingComponent
+  )
+  settings.angleRange = mvaAngleRange
+  settings.nPointsAngles = max(2, settings.nPointsAngles // 10)
+  return True
@@ -0,0 +1,119 @@
+import numpy as np
+
+# name: description
+methods = {
+  "mean": "Average of the values in the bin around each new epoch",
+  "nearest": "Value at the nearest epoch",
+  "linear": "Linear interpolation between the neighbouring epochs"
+}
+
+
+def cadenceEpochs(
+  start: np.datetime64, end: np.datetime64, cadence: np.timedelta64
+) -> np.ndarray:
+  """Returns the datetime64 epochs from start to end (inclusive) every cadence"""
+  start = np.datetime64(start, "ns")
+  cadence = np.timedelta64(cadence, "ns")
+  if cadence <= np.timedelta64(0, "ns"):
+    raise ValueError("The cadence has to be positive")
+  count = int((np.datetime64(end, "ns") - start) // cadence) + 1
+  return start + np.arange(max(0, count)) * cadence
+
+
+def getBinEdges(epochs: np.ndarray) -> np.ndarray:
+  """
+  Returns the len(epochs) + 1 edges of the bins around the sorted epochs as
+  nanoseconds. The edges are halfway between neighbouring epochs.
+  """
+  epochs = epochs.astype("datetime64[ns]").astype(np.int64)
+  if len(epochs) == 1:
+    return np.array([np.iinfo(np.int64).min, np.iinfo(np.int64).max])
+  halfSteps = np.diff(epochs) // 2
+  return np.concatenate((
+    [epochs[0] - halfSteps[0]],
+    epochs[:-1] + halfSteps,
+    [epochs[-1] + halfSteps[-1]]
+  ))
+
+
+def resample(
+  epoch: np.ndarray,
+  data: np.ndarray,
+  newEpochs: np.ndarray,
+  method: str = "mean"
+) -> np.ndarray:
+  """
+  Resamples the data from its epoch onto new epochs. The first axis of data
+  is the time, all other axes are resampled at once.
+
+  Parameters
+  ----------
+  epoch : np.ndarray
+      The sorted datetime64 epoch of data
+  data : np.ndarray
+      NaN marks missing values
+  newEpochs : np.ndarray
+      The sorted datetime64 epochs to resample onto, e.g. from
+      `cadenceEpochs` or of another dataset
+  method : str
+      One of `methods`. New epochs without data in their bin (mean) or
+      outside of epoch (nearest, linear) are NaN
+
+  Returns
+  -------
+  np.ndarray
+      The data with len(newEpochs) records as float
+  """
+  if method not in methods:
+    raise ValueError(
+      f"The accepted methods are [{', '.join(methods)}], but got {method}"
+    )
+  data = np.asarray(data, dtype=float)
+  result = np.full((len(newEpochs), ) + data.shape[1:], np.nan)
+  if len(epoch) == 0 or len(newEpochs) == 0:
+    return result
+  x = epoch.astype("datetime64[ns]").astype(np.int64)
+  newX = newEpochs.astype("datetime64[ns]").astype(np.int64)
+
+  if method == "mean":
+    edges = getBinEdges(newEpochs)
+    starts = np.searchsorted(x, edges[:-1], "left")
+    counts = np.diff(np.append(starts, np.searchsorted(x, edges[-1], "left")))
+    # reduceat sums from each start to the next one, the values after the
+    # last bin are cut off and a zero record is appended so that starts at
+    # the end of the data are valid indices
+    valid = ~np.isnan(data)
+    end = starts[-1] + counts[-1]
+    padding = np.zeros((1, ) + data.shape[1:])
+    sums = np.add.reduceat(
+      np.concatenate((np.where(valid, data, 0)[:end], padding)), starts
+    )
+    validCounts = np.add.reduceat(
+      np.concatenate((valid[:end].astype(int), padding)), starts
+    )
+    # reduceat returns the value at the start for empty bins
+    validCounts[counts == 0] = 0
+    hasData = validCounts > 0
+    result[hasData] = sums[hasData] / validCounts[hasData]
+    return result
+
+  inside = (newX >= x[0]) & (newX <= x[-1])
+  newX = newX[inside]
+  right = np.clip(np.searchsorted(x, newX, "left"), 1, len(x) - 1)
+  left = right - 1
+  if len(x) == 1:
+    result[inside] = data[0]
+  elif method == "nearest":
+    nearest = np.where(newX - x[left] <= x[right] - newX, left, right)
+    result[inside] = data[nearest]
+  else:
+    span = x[right] - x[left]
+    weight = np.divide(
+      newX - x[left], span, out=np.zeros(len(newX)), where=span > 0
+    )
+    weight = weight.reshape((-1, ) + (1, ) * (data.ndim - 1))
+    interpolated = data[left] * (1 - weight) + data[right] * weight
+    # exact matches keep their value even if the neighbour is NaN
+    interpolated = np.where(weight == 0, data[left], interpolated)
+    result[inside] = np.where(weight == 1, data[right], interpolated)
+  return result
@@ -0,0 +1,99 @@
+"""
+Results of the models stored as compressed NPZ files in cacheFolder/results,
+so that running a model again on the same data with the same settings, also
+after reopening a session, doesn't fit again.
+
+A result is identified by a hash of the model name and version, its settings,
+the selection and the selected variables of the required categories with the
+identity of the files they are read from. The file of a dataset is replaced
+when CDAS has a newer version of it, which changes its identity.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+from os import path
+from pathlib import Path
+import numpy as np
+from typing import Any, Optional, Type, TypeVar
+
+from .constants import cacheFolder
+from .State import State
+from .utils import getFileIdentity
+
+resultsFolder = cacheFolder + "results/"
+
+T = TypeVar("T")
+
+
+def getKey(state: State, model: Any, settings: Any) -> Optional[str]:
+  """
+  Returns the key of the result of the model with the settings (a
+  dataclass) on the selection of the state or None when the files can't be
+  identified
+  """
+  variables = []
+  for category in model.requiredVariables:
+    for var in state.selectedVars[category] or []:
+      identity = getFileIdentity(state.datasetCDFInstances[var.dataset])
+      if identity is None:
+        return None
+      variables.append([var.dataset, var.variable, var.Bfield, *identity])
+  description = {
+    "model": model.name,
+    "version": model.version,
+    "settings": dataclasses.asdict(settings),
+    "selection": [state.selectionStart.iso, state.selectionEnd.iso],
+    "variables": variables
+  }
+  return hashlib.sha256(
+    json.dumps(description, sort_keys=True, default=str).encode()
+  ).hexdigest()
+
+
+def getFile(key: str) -> str:
+  return resultsFolder + key + ".npz"
+
+
+def hasResult(key: Optional[str]) -> bool:
+  return key is not None and path.isfile(getFile(key))
+
+
+def loadResult(key: Optional[str], resultType: Type[T]) -> Optional[T]:
+  """
+  Returns the stored result as instance of the dataclass resultType or None
+  """
+  if not hasResult(key):
+    return None
+  try:
+    with np.load(getFile(key)) as data:
+      return resultType(
+        **{
+          # numbers are stored as arrays without dimensions
+          field.name: (
+            data[field.name].item()
+            if data[field.name].ndim == 0 else data[field.name]
+          )
+          for field in dataclasses.fields(resultType)
+        }
+      )
+  except (OSError, ValueError, KeyError, TypeError):
+    return None
+
+
+def saveResult(key: Optional[str], result: Any):
+  """
+  Stores the result, a dataclass of numbers and arrays. Errors are ignored,
+  as the result can be computed again.
+  """
+  if key is None:
+    return
+  try:
+    Path(resultsFolder).mkdir(parents=True, exist_ok=True)
+    # written to a temporary file first, so that an interruption doesn't
+    # leave a broken result
+    temporaryFile = resultsFolder + key + ".tmp.npz"
+    np.savez_compressed(temporaryFile, **dataclasses.asdict(result))
+    os.replace(temporaryFile, getFile(key))
+  except (OSError, ValueError):
+    pass
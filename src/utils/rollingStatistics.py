@@ -0,0 +1,203 @@
+"""
+Statistics over a window that slides sample by sample over regularly spaced
+data. Sums are taken from cumulative sums and minima from the van Herk/Gil-
+Werman algorithm, so the cost doesn't depend on the window length. The
+results have len(data) - window + 1 records, one for each window position.
+NaN marks missing values, which are ignored.
+"""
+from dataclasses import dataclass
+import numpy as np
+from typing import Tuple
+
+from . import decodedData
+from .resampling import cadenceEpochs
+from .State import State, StateSelectedVar
+
+
+@dataclass
+class FieldStatistics:
+  # datetime64 of the center of each window
+  epoch: np.ndarray
+  magnitudeMean: np.ndarray
+  magnitudeVariance: np.ndarray
+  # angle in degrees between the field at the start and end of the window
+  rotation: np.ndarray
+  # intermediate to minimum eigenvalue of the minimum variance analysis
+  eigenvalueRatio: np.ndarray
+
+  @property
+  def nbytes(self) -> int:
+    return sum(i.nbytes for i in vars(self).values())
+
+
+def windowSums(data: np.ndarray, window: int) -> np.ndarray:
+  """Sums of the values in each window, NaN counts as 0"""
+  cumulative = np.cumsum(np.where(np.isnan(data), 0, data), axis=0)
+  cumulative = np.concatenate((np.zeros((1, ) + data.shape[1:]), cumulative))
+  return cumulative[window:] - cumulative[:-window]
+
+
+def rollingMean(data: np.ndarray, window: int) -> np.ndarray:
+  counts = windowSums((~np.isnan(data)).astype(float), window)
+  sums = windowSums(data, window)
+  return np.divide(
+    sums, counts, out=np.full_like(sums, np.nan), where=counts > 0
+  )
+
+
+def rollingVariance(data: np.ndarray, window: int) -> np.ndarray:
+  # shifted by the mean, so that the difference of the sums doesn't lose
+  # the precision of the variance
+  data = data - np.nanmean(data, axis=0)
+  return rollingMean(data**2, window) - rollingMean(data, window)**2
+
+
+def rollingCovariance(data: np.ndarray, window: int) -> np.ndarray:
+  """
+  Covariance matrices of the components of data with shape (records,
+  components) for each window
+  """
+  data = data - np.nanmean(data, axis=0)
+  mean = rollingMean(data, window)
+  products = rollingMean(data[:, :, None] * data[:, None, :], window)
+  return products - mean[:, :, None] * mean[:, None, :]
+
+
+def rollingMinimum(data: np.ndarray, window: int) -> np.ndarray:
+  """
+  Minimum of each window after van Herk and Gil-Werman: the data is split
+  into blocks of the window length and the running minimum from the start
+  and from the end of each block is taken. Every window covers the end of
+  one block and the start of the next one.
+  """
+  length = len(data)
+  blocks = -(-length // window)
+  padded = np.full((blocks * window, ) + data.shape[1:], np.nan)
+  padded[:length] = data
+  # a view with the blocks as first axis
+  blocked = padded.reshape((blocks, window) + data.shape[1:])
+  fromStart = np.fmin.accumulate(blocked, axis=1).reshape(padded.shape)
+  fromEnd = np.fmin.accumulate(blocked[:, ::-1], axis=1)[:, ::-1]
+  fromEnd = fromEnd.reshape(padded.shape)
+  return np.fmin(fromEnd[:length - window + 1], fromStart[window - 1:length])
+
+
+def rotationAngle(data: np.ndarray, window: int) -> np.ndarray:
+  """Angle in degrees between the vectors at the first and last sample"""
+  start = data[:len(data) - window + 1]
+  end = data[window - 1:]
+  cosine = np.sum(start * end, axis=1) / (
+    np.linalg.norm(start, axis=1) * np.linalg.norm(end, axis=1)
+  )
+  return np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+
+
+def eigenvalueRatio(covariance: np.ndarray) -> np.ndarray:
+  """
+  Intermediate to minimum eigenvalue of each covariance matrix, NaN if the
+  minimum eigenvalue isn't positive
+  """
+  result = np.full(len(covariance), np.nan)
+  valid = ~np.isnan(covariance).any(axis=(1, 2))
+  eigenvalues = np.linalg.eigvalsh(covariance[valid])
+  result[valid] = np.divide(
+    eigenvalues[:, 1],
+    eigenvalues[:, 0],
+    out=np.full(len(eigenvalues), np.nan),
+    where=eigenvalues[:, 0] > 0
+  )
+  return result
+
+
+def getGrid(
+  state: State, var: StateSelectedVar, window: np.timedelta64
+) -> Tuple[np.ndarray, int]:
+  """
+  Returns the epochs with the median cadence of the variable over the
+  downloaded interval and the number of samples in the window
+  """
+  cdf = state.datasetCDFInstances[var.dataset]
+  attrs = cdf.varattsget(var.variable)
+  epoch = decodedData.datetime64s(cdf, attrs["DEPEND_0"] or "epoch")
+  if len(epoch) < 2:
+    raise ValueError(f"{var.variable} has less than two records")
+  cadence = np.median(np.diff(epoch))
+  window = int(round(np.timedelta64(window, "ns") / cadence))
+  grid = cadenceEpochs(
+    state.startDate.datetime64, state.endDate.datetime64, cadence
+  )
+  if window < 2 or window > len(grid):
+    raise ValueError(
+      "The window has to contain at least two samples of the downloaded data"
+    )
+  return grid, window
+
+
+def getCenters(grid: np.ndarray, window: int) -> np.ndarray:
+  return grid[:len(grid) - window + 1] + (grid[window - 1] - grid[0]) // 2
+
+
+def getFieldStatistics(
+  state: State, window: np.timedelta64
+) -> FieldStatistics:
+  """
+  Returns the statistics of the magnetic field over the downloaded interval.
+  They are kept with the decoded data of the field.
+  """
+  vars = state.selectedVars.Magnetic_Field
+  if not vars:
+    raise ValueError("No magnetic field selected")
+  grid, samples = getGrid(state, vars[0], window)
+
+  def compute() -> FieldStatistics:
+    components = [
+      state.getData("mag", dir, resampleTo=grid, method="mean")
+      for dir in ["x", "y", "z"]
+    ]
+    if any(i is None for i in components):
+      raise ValueError("Not all magnetic field components found")
+    field = np.stack(components, axis=-1)
+    magnitude = np.linalg.norm(field, axis=1)
+    return FieldStatistics(
+      epoch=getCenters(grid, samples),
+      magnitudeMean=rollingMean(magnitude, samples),
+      magnitudeVariance=rollingVariance(magnitude, samples),
+      rotation=rotationAngle(field, samples),
+      eigenvalueRatio=eigenvalueRatio(rollingCovariance(field, samples))
+    )
+
+  kind = "rolling statistics {} {} {} {}".format(
+    [var.variable for var in vars], samples, grid[0], grid[-1]
+  )
+  return decodedData.derived(
+    state.datasetCDFInstances[vars[0].dataset],
+    vars[0].variable,
+    kind,
+    compute,
+    lambda statistics: statistics.nbytes
+  )
+
+
+def getBetaMinimum(
+  state: State, window: np.timedelta64
+) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  Returns the center of each window and the minimum of the plasma beta in
+  it. They are kept with the decoded data of the plasma beta.
+  """
+  vars = state.selectedVars.Plasma_Beta
+  if not vars:
+    raise ValueError("No plasma beta selected")
+  grid, samples = getGrid(state, vars[0], window)
+
+  def compute() -> Tuple[np.ndarray, np.ndarray]:
+    beta = state.getData("beta", resampleTo=grid, method="mean")
+    return getCenters(grid, samples), rollingMinimum(beta, samples)
+
+  return decodedData.derived(
+    state.datasetCDFInstances[vars[0].dataset],
+    vars[0].variable,
+    f"rolling minimum {samples} {grid[0]} {grid[-1]}",
+    compute,
+    lambda result: result[0].nbytes + result[1].nbytes
+  )
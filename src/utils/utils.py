@@ -3,12 +3,15 @@ import numpy as np
 import tkinter as tk
 from tkinter import ttk
 import json
+from os import path
 from typing import List, Dict, Tuple, Union
 import webbrowser
 import re
 import platform
 from astropy.time import Time
 
+from src.utils.VirtualTreeview import VirtualTreeview
+
 
 
 def intersection(a, b):
@@ -39,7 +42,9 @@ def scrollableTreeview(
   title: str = None,
   button: Union[str, List[str]] = None,
   unpackButtons: bool = False,
-  noXScrollbar: bool = False
+  noXScrollbar: bool = False,
+  search: bool = False,
+  virtual: bool = False
 ) -> Union[Tuple[ttk.Frame, ttk.Treeview],
            Tuple[ttk.Frame, ttk.Treeview, ttk.Button],
            Tuple[ttk.Frame, ttk.Treeview, List[ttk.Button]]]:
@@ -63,6 +68,15 @@ def scrollableTreeview(
       If this is True then no horizontal scrollbar will be added. Useful when
       the treeview won't have any additional columns.
       Default: False
+  search : bool
+      If this is True then a search entry is added between the title and the
+      treeview. It is available as `treeview.searchEntry` and its text
+      variable as `treeview.searchVar`.
+      Default: False
+  virtual : bool
+      If this is True then a VirtualTreeview is created, which only inserts
+      the visible rows into the widget. Use it for long lists.
+      Default: False
 
   Returns
   -------
@@ -76,7 +90,7 @@ def scrollableTreeview(
   f = ttk.Frame(master)
   scrollbarX = None if noXScrollbar else ttk.Scrollbar(f, orient=tk.HORIZONTAL)
   scrollbarY = ttk.Scrollbar(f)
-  tv = ttk.Treeview(
+  tv = (VirtualTreeview if virtual else ttk.Treeview)(
     f, selectmode=tk.BROWSE, height=20, yscrollcommand=scrollbarY.set
   )
   if scrollbarX:
@@ -105,15 +119,26 @@ def scrollableTreeview(
     label = ttk.Label(f, text=title)
     label.grid(column=1, row=1)
 
-  tv.grid(column=1, row=2, sticky="nsew")
-  scrollbarY.grid(column=2, row=2, sticky="ns")
+  row = 2
+  if search:
+    searchFrame = ttk.Frame(f)
+    searchFrame.grid(column=1, row=row, columnspan=2, sticky="we")
+    ttk.Label(searchFrame, text="Search:").pack(side="left")
+    tv.searchVar = tk.StringVar(f)
+    tv.searchEntry = ttk.Entry(searchFrame, textvariable=tv.searchVar)
+    tv.searchEntry.pack(side="left", fill="x", expand=True)
+    row += 1
+
+  tv.grid(column=1, row=row, sticky="nsew")
+  scrollbarY.grid(column=2, row=row, sticky="ns")
+  row += 1
   if scrollbarX:
-    scrollbarX.grid(column=1, row=3, sticky="we")
+    scrollbarX.grid(column=1, row=row, sticky="we")
+  row += 1
 
   res = f, tv
 
   if button:
-    row = 4
     btns = tuple()
     wasList = True
     if not isinstance(button, list):
@@ -363,6 +388,26 @@ def ensureOnScreen(root: tk.Tk):
     root.geometry("+{}+{}".format(left, top))
 
 
+def getCDFPath(cdf) -> str:
+  """Returns the path of the file the cdflib.CDF instance was read from"""
+  return str(
+    cdf.file.as_posix()
+    if cdf.compressed_file is None else cdf.compressed_file.as_posix()
+  )
+
+
+def getFileIdentity(cdf) -> Union[Tuple[str, float, int], None]:
+  """
+  Returns the path, modification time and size of the file the cdflib.CDF
+  instance was read from or None when it can't be read
+  """
+  cdfPath = getCDFPath(cdf)
+  try:
+    return cdfPath, path.getmtime(cdfPath), path.getsize(cdfPath)
+  except OSError:
+    return None
+
+
 def setFillValuesToNan(data: np.ndarray, cdfAttrs: dict):
   if "FILLVAL" in cdfAttrs:
     data[data == cdfAttrs["FILLVAL"][0]] = np.nan
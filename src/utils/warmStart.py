@@ -0,0 +1,89 @@
+"""
+Search ranges of the fitted parameters of the models. Without an initial
+value the whole range is searched. With one, e.g. from the result of the
+previous run when the selection was only shifted a bit, the search is
+narrowed to the surroundings of it. A minimum on the edge of a narrowed
+range means that the search has to start anew.
+"""
+import numpy as np
+
+from .constants import warmStartMinOverlap
+from .State import State
+from .utils import getCDFPath
+
+
+def getParameterRange(
+  low: float,
+  high: float,
+  points: int,
+  initial: float = None,
+  rangeFraction: float = 1.0
+) -> np.ndarray:
+  """
+  Returns the values of a parameter that are tried by the models. Without an
+  initial value or for rangeFraction >= 1, all values from low to high are
+  tried, otherwise rangeFraction of the range centered on initial and shifted
+  to stay within low and high.
+  """
+  if initial is None or rangeFraction >= 1:
+    return np.linspace(low, high, points)
+  width = (high - low) * rangeFraction
+  start = min(max(initial - width / 2, low), high - width)
+  return np.linspace(start, start + width, points)
+
+
+def getAngleRange(
+  initial: float, angleRange: float, points: int
+) -> np.ndarray:
+  """
+  Returns the angles that are tried by the models, centered on initial. For
+  angleRange >= 360, all angles from 0 to 360 are tried like without an
+  initial angle.
+  """
+  if angleRange >= 360:
+    return np.linspace(0, 360, points)
+  return np.linspace(
+    initial - angleRange / 2, initial + angleRange / 2, points
+  ) % 360
+
+
+def canWarmStart(previous: State, state: State) -> bool:
+  """
+  True when both states select the same magnetic field from the same files
+  and their selections overlap by at least warmStartMinOverlap of the longer
+  one
+  """
+  previousVars = previous.selectedVars.Magnetic_Field
+  if not previousVars or previousVars != state.selectedVars.Magnetic_Field:
+    return False
+  for var in previousVars:
+    previousCDF = previous.datasetCDFInstances.get(var.dataset)
+    cdf = state.datasetCDFInstances.get(var.dataset)
+    if (previousCDF is None or cdf is None
+        or getCDFPath(previousCDF) != getCDFPath(cdf)):
+      return False
+  overlap = (
+    min(previous.selectionEnd, state.selectionEnd)
+    - max(previous.selectionStart, state.selectionStart)
+  ).jd
+  length = max(
+    (previous.selectionEnd - previous.selectionStart).jd,
+    (state.selectionEnd - state.selectionStart).jd
+  )
+  return length > 0 and overlap / length >= warmStartMinOverlap
+
+
+def isOnEdge(
+  value: float, values: np.ndarray, low: float = None, high: float = None
+) -> bool:
+  """
+  True when value is the first or last of the searched values and that isn't
+  the bound low or high of the whole range. The minimum may then lie outside
+  of a narrowed search.
+  """
+  return bool(
+    (np.isclose(value, values[0]) and
+     (low is None or not np.isclose(values[0], low)))
+    or (np.isclose(value, values[-1]) and
+        (high is None or not np.isclose(values[-1], high)))
+  )